@@ -2,4 +2,7 @@
 Gitask
 
 A CLI tool to streamline your workflow by integrating with your PMT and VCS.
-"""
\ No newline at end of file
+"""
+
+from gitask.errors import BackendError, BackendTimeoutError, GitaskError, InvalidTransitionError
+from gitask.session import Session
@@ -0,0 +1,163 @@
+import fcntl
+import json
+import os
+import tempfile
+import threading
+import time
+
+from gitask.config.config import Config
+from gitask.scope import get_singleton
+
+
+class MetadataCache:
+    """
+    Local cache of remote metadata (ticket keys, transitions, statuses, open pull requests, review loads
+    and project ids).
+
+    The cache is shared between the foreground commands and the background prefetch process,
+    so every write re-reads the file and replaces it atomically, holding a file lock against concurrent writers.
+    """
+    CACHE_FILE_NAME = "metadata.json"
+    CACHE_LOCK_FILE_NAME = "metadata.lock"
+    BRANCHES_SECTION = "branches"
+    ISSUES_SECTION = "issues"
+    REVIEW_LOADS_SECTION = "review_loads"
+    PROJECTS_SECTION = "projects"
+    FETCHED_AT_KEY = "fetched_at"
+
+    def __new__(cls):
+        return get_singleton(cls, MetadataCache.__init_cache)
+
+    def __init_cache(self):
+        config = Config()
+        self.cache_path = os.path.join(config.cache_dir, MetadataCache.CACHE_FILE_NAME)
+        self.ttl = config.cache_ttl
+        self.cache_data = self.__read()
+        self.lock = threading.Lock()
+
+    def __read(self):
+        """Read the cache file, ignoring a missing or corrupted file."""
+        try:
+            with open(self.cache_path, 'r') as cache_file:
+                return json.load(cache_file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def __write(self):
+        """Atomically replace the cache file with the in-memory data."""
+        cache_dir = os.path.dirname(self.cache_path)
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, prefix=".metadata-")
+        try:
+            with os.fdopen(fd, 'w') as tmp_file:
+                json.dump(self.cache_data, tmp_file)
+            os.replace(tmp_path, self.cache_path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def __get(self, section, key, ttl):
+        entry = self.cache_data.get(section, {}).get(key)
+        if entry is None:
+            return None
+
+        ttl = self.ttl if ttl is None else ttl
+        if time.time() - entry.get(MetadataCache.FETCHED_AT_KEY, 0) > ttl:
+            return None
+
+        return entry
+
+    def __update(self, section, values_by_key):
+        if Config().plan:
+            # Writes aren't performed in plan mode, so their results must not be cached
+            return
+
+        cache_dir = os.path.dirname(self.cache_path)
+        os.makedirs(cache_dir, exist_ok=True)
+        # The thread lock serializes this process' writers, the file lock other processes' (e.g. a prefetch)
+        with self.lock, open(os.path.join(cache_dir, MetadataCache.CACHE_LOCK_FILE_NAME), 'w') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            self.cache_data = self.__read()
+            for key, values in values_by_key.items():
+                if values is None:
+                    self.cache_data.get(section, {}).pop(key, None)
+                else:
+                    entry = self.cache_data.setdefault(section, {}).setdefault(key, {})
+                    entry.update(values)
+                    entry[MetadataCache.FETCHED_AT_KEY] = time.time()
+            self.__write()
+
+    def get_branch(self, branch, ttl=None):
+        """
+        Get the cached metadata of a git branch.
+
+        :param branch: The git branch name.
+        :param ttl: Maximum age in seconds, defaults to the configured cache TTL.
+        :return: The cached entry, or None if missing or stale.
+        """
+        return self.__get(MetadataCache.BRANCHES_SECTION, branch, ttl)
+
+    def get_all_branches(self):
+        """Get the cached metadata of all git branches, including stale entries."""
+        return dict(self.cache_data.get(MetadataCache.BRANCHES_SECTION, {}))
+
+    def set_branch(self, branch, **values):
+        """Store metadata (e.g. ticket, pull_request) of a git branch."""
+        self.__update(MetadataCache.BRANCHES_SECTION, {branch: values})
+
+    def remove_branches(self, branches):
+        """Drop the cached metadata of many git branches in a single cache write, e.g. of deleted branches."""
+        self.__update(MetadataCache.BRANCHES_SECTION, {branch: None for branch in branches})
+
+    def get_issue(self, issue_key, ttl=None):
+        """
+        Get the cached metadata of an issue.
+
+        :param issue_key: The key of the issue.
+        :param ttl: Maximum age in seconds, defaults to the configured cache TTL.
+        :return: The cached entry, or None if missing or stale.
+        """
+        return self.__get(MetadataCache.ISSUES_SECTION, issue_key, ttl)
+
+    def get_all_issues(self):
+        """Get the cached metadata of all issues, including stale entries."""
+        return dict(self.cache_data.get(MetadataCache.ISSUES_SECTION, {}))
+
+    def set_issue(self, issue_key, **values):
+        """Store metadata (e.g. status, transitions) of an issue."""
+        self.__update(MetadataCache.ISSUES_SECTION, {issue_key: values})
+
+    def set_issues(self, values_by_issue_key):
+        """Store the metadata of many issues in a single cache write."""
+        self.__update(MetadataCache.ISSUES_SECTION, values_by_issue_key)
+
+    def get_review_load(self, username, ttl=None):
+        """
+        Get the cached number of open review requests of a user.
+
+        :param username: The VCS username.
+        :param ttl: Maximum age in seconds, defaults to the configured cache TTL.
+        :return: The cached entry, or None if missing or stale.
+        """
+        return self.__get(MetadataCache.REVIEW_LOADS_SECTION, username, ttl)
+
+    def set_review_loads(self, values_by_username):
+        """Store the open review request counts (e.g. open_reviews) of many users in a single cache write."""
+        self.__update(MetadataCache.REVIEW_LOADS_SECTION, values_by_username)
+
+    def get_project(self, project_key, ttl=None):
+        """
+        Get the cached metadata of a VCS project.
+
+        :param project_key: The server URL and project path.
+        :param ttl: Maximum age in seconds, defaults to the configured cache TTL.
+        :return: The cached entry, or None if missing or stale.
+        """
+        return self.__get(MetadataCache.PROJECTS_SECTION, project_key, ttl)
+
+    def set_project(self, project_key, **values):
+        """Store metadata (e.g. id) of a VCS project."""
+        self.__update(MetadataCache.PROJECTS_SECTION, {project_key: values})
+
+    def invalidate_issue(self, issue_key):
+        """Drop the cached metadata of an issue, e.g. after its status changed."""
+        self.__update(MetadataCache.ISSUES_SECTION, {issue_key: None})
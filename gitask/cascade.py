@@ -0,0 +1,55 @@
+from gitask.config.config import Config
+from gitask.utils import get_status_groups
+
+SUBTASKS_CASCADE = "subtasks"
+LINKS_CASCADE_PREFIX = "links:"
+
+
+def parse_cascade(value):
+    """
+    Parse a --cascade value, e.g. "subtasks,links:blocks".
+
+    :param value: Comma-separated "subtasks" and "links:<link type>" items.
+    :return: A tuple of whether subtasks are included and the list of link types.
+    """
+    include_subtasks = False
+    link_types = []
+    for item in value.split(","):
+        item = item.strip()
+        if item == SUBTASKS_CASCADE:
+            include_subtasks = True
+        elif item.startswith(LINKS_CASCADE_PREFIX) and item[len(LINKS_CASCADE_PREFIX):].strip():
+            link_types.append(item[len(LINKS_CASCADE_PREFIX):].strip())
+        elif item:
+            raise ValueError(f"Invalid cascade '{item}', expected '{SUBTASKS_CASCADE}' or '{LINKS_CASCADE_PREFIX}<type>'.")
+
+    return include_subtasks, link_types
+
+
+def get_cascade_levels(graph, root_key):
+    """
+    Order the issues of an issue graph so that children close before their parents: each level only
+    holds issues whose children are in the previous levels, so the issues of a level can be closed concurrently.
+    Issues already in a done status are left out.
+
+    :param graph: A dict of issue key to {"status", "children"}, as returned by get_issue_graph.
+    :param root_key: The key of the root issue.
+    :return: A list of levels, each a list of issue keys, from the deepest issues to the root issue.
+    """
+    depths = {root_key: 0}
+    frontier = [root_key]
+    # An issue reachable at several depths is closed with the deepest level, the graph depth bounds the walk
+    for depth in range(1, len(graph) + 1):
+        frontier = list(dict.fromkeys(child for key in frontier for child in graph[key]["children"] if child in graph))
+        if not frontier:
+            break
+        for child in frontier:
+            depths[child] = depth
+
+    status_groups = get_status_groups()
+    levels = [[] for _ in range(max(depths.values()) + 1)]
+    for key, depth in depths.items():
+        if status_groups.get(graph[key]["status"].lower()) != Config.DONE_PROP_NAME:
+            levels[depth].append(key)
+
+    return [sorted(level) for level in reversed(levels) if level]
@@ -0,0 +1,253 @@
+import hashlib
+import os
+import pickle
+import re
+import subprocess
+
+from gitask.config.config import Config
+
+CODEOWNERS_LOCATIONS = ("CODEOWNERS", ".github/CODEOWNERS", ".gitlab/CODEOWNERS", "docs/CODEOWNERS")
+SECTION_PATTERN = re.compile(r"^\^?\[(?P<name>[^\]]+)\](?:\[\d+\])?(?P<owners>.*)$")
+GLOB_CHARS = set("*?[")
+MATCHER_CACHE_VERSION = 3
+
+
+def _split_unescaped(line):
+    """Split a CODEOWNERS line on whitespace, keeping escaped spaces in paths."""
+    return [part.replace("\\ ", " ") for part in re.split(r"(?<!\\)\s+", line.strip()) if part]
+
+
+def _glob_to_regex(pattern):
+    """Translate a gitignore-style glob (without its anchoring slashes) to a regex source."""
+    regex = ""
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if pattern.startswith("**/", i):
+            regex += "(?:.*/)?"
+            i += 3
+            continue
+        if pattern.startswith("**", i):
+            regex += ".*"
+            i += 2
+            continue
+        if char == "*":
+            regex += "[^/]*"
+        elif char == "?":
+            regex += "[^/]"
+        elif char == "[":
+            end = pattern.find("]", i + 1)
+            if end == -1:
+                regex += re.escape(char)
+            else:
+                regex += "[" + pattern[i + 1:end].replace("\\", "\\\\") + "]"
+                i = end
+        else:
+            regex += re.escape(char)
+        i += 1
+    return regex
+
+
+class CodeOwnersRule:
+    """A single CODEOWNERS rule, indexed by the literal parts of its pattern."""
+
+    def __init__(self, index, section, pattern, owners):
+        self.index = index
+        self.section = section
+        self.owners = owners
+
+        excluded = pattern.startswith("!")
+        if excluded:
+            # GitLab exclusion patterns: matching paths have no owners in the section
+            pattern = pattern[1:]
+            self.owners = []
+
+        directory_only = pattern.endswith("/")
+        # Like gitignore, a pattern with a leading or middle slash is relative to the repository root
+        self.anchored = pattern.startswith("/") or "/" in pattern.strip("/")
+        pattern = pattern.strip("/")
+        self.pattern = pattern
+
+        if not pattern:
+            # "/" owns the whole repository
+            self.anchored = True
+            self.regex_source = "^.*$"
+        else:
+            prefix = "" if self.anchored else "(?:.*/)?"
+            # A glob in the last segment only matches its own level (docs/* doesn't own docs/a/b.md),
+            # while a literal name also owns the directory's contents
+            if directory_only:
+                suffix = "/.*"
+            elif GLOB_CHARS & set(pattern.split("/")[-1]):
+                suffix = ""
+            else:
+                suffix = "(?:/.*)?"
+            self.regex_source = f"^{prefix}{_glob_to_regex(pattern)}{suffix}$"
+        self.regex = None
+
+        segments = pattern.split("/") if pattern else []
+        self.literal_prefix = []
+        for segment in segments:
+            if GLOB_CHARS & set(segment):
+                break
+            self.literal_prefix.append(segment)
+
+    def matches(self, path):
+        if self.regex is None:
+            # Compiled lazily: only candidate rules of the matched paths are ever compiled
+            self.regex = re.compile(self.regex_source)
+        return self.regex.match(path) is not None
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state["regex"] = None
+        return state
+
+
+class CodeOwners:
+    """
+    CODEOWNERS matcher supporting GitHub and GitLab syntax, including GitLab sections.
+
+    Rules are indexed by their literal parts, so matching a path only evaluates the few rules that can
+    match it, instead of every rule: anchored rules by their literal leading directories, and
+    unanchored rules by their file extension or literal name. The highest-indexed matching rule
+    wins in each section, and the owners of all sections are combined.
+    """
+
+    def __init__(self, rules):
+        self.rules = rules
+        self.anchored_index = {}
+        self.extension_index = {}
+        self.name_index = {}
+        self.generic_rules = []
+
+        for rule in rules:
+            if rule.anchored:
+                self.anchored_index.setdefault(tuple(rule.literal_prefix), []).append(rule)
+            elif re.fullmatch(r"\*\.[^*?\[/]+", rule.pattern):
+                self.extension_index.setdefault(rule.pattern[1:], []).append(rule)
+            elif rule.literal_prefix and len(rule.literal_prefix) == 1 and "/" not in rule.pattern:
+                self.name_index.setdefault(rule.pattern, []).append(rule)
+            else:
+                self.generic_rules.append(rule)
+
+    @staticmethod
+    def parse(content):
+        """Parse the content of a CODEOWNERS file."""
+        rules = []
+        section = None
+        section_owners = []
+
+        for line in content.splitlines():
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+
+            section_match = SECTION_PATTERN.match(line)
+            if section_match:
+                section = section_match.group("name").lower()
+                section_owners = _split_unescaped(section_match.group("owners"))
+                continue
+
+            pattern, *owners = _split_unescaped(line)
+            # An inline comment runs to the end of the line
+            comment_start = next((i for i, owner in enumerate(owners) if owner.startswith("#")), len(owners))
+            owners = owners[:comment_start]
+            rules.append(CodeOwnersRule(len(rules), section, pattern, owners or section_owners))
+
+        return CodeOwners(rules)
+
+    @staticmethod
+    def load(repo_root):
+        """
+        Load the CODEOWNERS file of a repository.
+        The parsed and indexed matcher is cached per file path and modification time.
+
+        :param repo_root: The root directory of the repository.
+        :return: The CodeOwners matcher, or None if the repository has no CODEOWNERS file.
+        """
+        for location in CODEOWNERS_LOCATIONS:
+            path = os.path.join(repo_root, location)
+            if os.path.isfile(path):
+                break
+        else:
+            return None
+
+        stat = os.stat(path)
+        cache_key = hashlib.sha1(f"{MATCHER_CACHE_VERSION}:{os.path.abspath(path)}:{stat.st_mtime_ns}:{stat.st_size}"
+                                 .encode('utf-8')).hexdigest()
+        cache_path = os.path.join(Config().cache_dir, "codeowners", f"{cache_key}.pickle")
+
+        try:
+            with open(cache_path, "rb") as cache_file:
+                return pickle.load(cache_file)
+        except (OSError, pickle.PickleError, EOFError, AttributeError):
+            pass
+
+        with open(path, "r") as codeowners_file:
+            code_owners = CodeOwners.parse(codeowners_file.read())
+
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with open(cache_path, "wb") as cache_file:
+            pickle.dump(code_owners, cache_file)
+
+        return code_owners
+
+    def __candidate_rules(self, path):
+        segments = path.split("/")
+        candidates = list(self.generic_rules)
+        for depth in range(len(segments) + 1):
+            candidates.extend(self.anchored_index.get(tuple(segments[:depth]), []))
+        for segment in segments:
+            candidates.extend(self.name_index.get(segment, []))
+
+        name = segments[-1]
+        dot = name.find(".")
+        while dot != -1:
+            candidates.extend(self.extension_index.get(name[dot:], []))
+            dot = name.find(".", dot + 1)
+
+        return candidates
+
+    def get_path_owners(self, path):
+        """
+        Get the owners of a path: the owners of the last matching rule of each section.
+
+        :param path: The file path, relative to the repository root.
+        :return: A list of owners.
+        """
+        owners = []
+        matched_sections = set()
+        for rule in sorted(self.__candidate_rules(path), key=lambda r: r.index, reverse=True):
+            if rule.section in matched_sections or not rule.matches(path):
+                continue
+            matched_sections.add(rule.section)
+            owners.extend(owner for owner in rule.owners if owner not in owners)
+
+        return owners
+
+    def get_owners(self, paths):
+        """
+        Get the owners of many paths.
+
+        :param paths: The file paths, relative to the repository root.
+        :return: A list of owners, ordered by the number of paths they own.
+        """
+        owned_paths_count = {}
+        for path in paths:
+            for owner in self.get_path_owners(path):
+                owned_paths_count[owner] = owned_paths_count.get(owner, 0) + 1
+
+        return sorted(owned_paths_count, key=lambda owner: -owned_paths_count[owner])
+
+
+def get_changed_files(target_branch, source_branch="HEAD", repo_root=None):
+    """Get the files changed on the source branch since it forked from the target branch."""
+    output = subprocess.check_output(["git", "diff", "--name-only", "--no-renames", f"{target_branch}...{source_branch}"],
+                                     cwd=repo_root)
+    return output.decode('utf-8').splitlines()
+
+
+def get_repo_root():
+    """Get the root directory of the current git repository."""
+    return subprocess.check_output(["git", "rev-parse", "--show-toplevel"]).strip().decode('utf-8')
@@ -1,43 +1,75 @@
 import functools
+import os
+import subprocess
+import time
 
 import click
 
+from gitask.cache import MetadataCache
+from gitask.cascade import get_cascade_levels, parse_cascade
+from gitask.codeowners import CodeOwners, get_changed_files, get_repo_root
 from gitask.config.config import Config
 from gitask.config.config_utils import setup_autocomplete, interactive_setup
+from gitask.description import fetch_ticket_details, list_commits, render_description, validate_template
+from gitask.doctor import run_doctor
+from gitask.hooks import run_hook
+from gitask.metrics import MetricsStore, export_openmetrics, get_latency_stats
 from gitask.pmt.pmt_factory import get_pmt
+from gitask.picker import TicketPicker
 from gitask.pmt.project_management_tool import PMToolInterface
-from gitask.utils import Utils
+from gitask.prefetch import install_git_hooks, run_prefetch
+from gitask.reconcile import plan_status_changes
+from gitask.repos import find_repos, get_repo_branch, get_repo_project
+from gitask.reviewers import pick_pool_reviewer
+from gitask.report import ChangelogStore, print_report, sync_changelogs
+from gitask.scope import ContextThreadPoolExecutor
+from gitask.stack import get_branch_stack
+from gitask.utils import Utils, percentile
 from gitask.vcs.vcs_factory import get_vcs
 from gitask.vcs.version_control_tool import VCSInterface
+from gitask.watch import WatchList, run_watcher
+from gitask.webhooks import WebhookProcessor, replay_deliveries, serve
 
 
 def with_hooks(action_name):
     def decorator(func):
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            utils = Utils()
             config = Config()
             hooks = config.hooks
 
-            # Pass the command parameters (args and kwargs) to the hook scripts
+            # Pass the command parameters (args and kwargs, without the Commands instance) to the hook scripts
             command_params = {}
-            if args:
-                command_params['args'] = list(args)
+            if args[1:]:
+                command_params['args'] = list(args[1:])
             if kwargs:
                 command_params.update(kwargs)
 
+            # Commands acting on a given ticket rather than the current branch's one pass it as issue_key
+            issue_key = kwargs.get('issue_key')
+
             if action_name in hooks and 'pre' in hooks[action_name]:
-                utils.run_hook_script(hooks[action_name]['pre'], command_params)
+                run_hook(action_name, 'pre', hooks[action_name]['pre'], command_params, issue_key)
 
             result = func(*args, **kwargs)
 
             if action_name in hooks and 'post' in hooks[action_name]:
-                utils.run_hook_script(hooks[action_name]['post'], command_params)
+                run_hook(action_name, 'post', hooks[action_name]['post'], command_params, issue_key)
 
             return result
         return wrapper
     return decorator
 
+
+PICKER_PAGE_SIZE = 100
+STACK_MAX_WORKERS = 8
+REPOS_MAX_WORKERS = 8
+CASCADE_MAX_WORKERS = 8
+SYNC_MAX_WORKERS = 8
+STATS_PERCENTILES = (50, 95, 99)
+AUTO_REVIEWER = "auto"
+
+
 class Commands:
     """
     Commands class to handle all the main commands.
@@ -51,22 +83,119 @@ class Commands:
 
 
     @staticmethod
-    def configure(auto_complete):
+    def configure(auto_complete, git_hooks):
         """
         Configure Gitask with the necessary settings.
 
         This function handles the configuration of Gitask.
         If the `auto_complete` flag is set, it will only set up autocompletion.
+        If the `git_hooks` flag is set, it will only install the prefetch git hooks in the current repository.
         Otherwise, it will run the interactive setup to configure all relevant data for Gitask.
 
         :param auto_complete: Flag to indicate if only autocompletion should be set up.
+        :param git_hooks: Flag to indicate if only the prefetch git hooks should be installed.
         """
         if auto_complete:
             setup_autocomplete()
             return
 
+        if git_hooks:
+            click.echo("🔗 Installing gitask prefetch git hooks:")
+            install_git_hooks()
+            return
+
         interactive_setup()
 
+    @staticmethod
+    def doctor():
+        """
+        Diagnose the configuration and the connectivity to the configured backends.
+
+        :return: True if no check failed.
+        """
+        return run_doctor()
+
+    @staticmethod
+    def prefetch():
+        """Warm the local metadata cache for the current branch's ticket."""
+        run_prefetch()
+
+    @staticmethod
+    def report(since, query):
+        """
+        Report how long tickets sit in each status, and the review turnaround per reviewer.
+
+        The status changelogs are kept in a local cache and only the tickets updated since the last
+        report of the same query are fetched.
+
+        :param since: Only tickets updated since this datetime are reported.
+        :param query: The search query selecting the reported tickets, defaults to the configured report query.
+        """
+        query = query or Config().report_query or ""
+        since_timestamp = since.timestamp()
+
+        store = ChangelogStore()
+        fetched = sync_changelogs(get_pmt(), store, query, since_timestamp)
+        click.echo(f"Fetched {fetched} updated tickets.")
+        print_report(store, query, since_timestamp)
+
+    @staticmethod
+    def stats(days, export_path):
+        """
+        Show the latency percentiles of each remote operation and hook over the last days,
+        from the timings recorded by every gitask invocation.
+
+        :param days: The number of days to report.
+        :param export_path: Optional path of an OpenMetrics text file to write the statistics to.
+        """
+        store = MetricsStore()
+        since = time.time() - days * 86400
+        operation_stats = get_latency_stats(store.read(since))
+        if not operation_stats:
+            click.echo(f"No operations recorded in the last {days} days.")
+            return
+
+        percentile_headers = "".join(f"{'p' + str(p):>10}" for p in STATS_PERCENTILES)
+        click.echo(f"{'Backend':<16}{'Operation':<32}{'Count':>7}{'Errors':>8}{percentile_headers}{'Avg KB':>9}")
+        for (backend, operation), stats in sorted(operation_stats.items(),
+                                                  key=lambda item: -percentile(item[1]["latencies"], 95)):
+            latencies = stats["latencies"]
+            values = "".join(f"{percentile(latencies, p) * 1000:>8.0f}ms" for p in STATS_PERCENTILES)
+            click.echo(f"{backend[:15]:<16}{operation[:31]:<32}{len(latencies):>7}{stats['errors']:>8}{values}"
+                       f"{stats['bytes'] / len(latencies) / 1024:>9.1f}")
+
+        if export_path:
+            export_openmetrics(store, export_path, since)
+            click.echo(f"Exported to {export_path}")
+
+    @staticmethod
+    def serve_webhooks(host, port, max_workers, replay_paths, dry_run):
+        """
+        Serve GitLab merge request and GitHub pull_request webhooks, moving the tickets of opened pull requests
+        to In Review status and of merged ones to Done status.
+
+        :param host: The address to listen on.
+        :param port: The port to listen on.
+        :param max_workers: The maximum number of tickets transitioned concurrently.
+        :param replay_paths: Recorded deliveries to process instead of serving.
+        :param dry_run: Flag to only log the transitions.
+        """
+        secret = Config().webhook_secret
+        if not secret:
+            raise ValueError(f"No webhook secret defined, set the {Config.WEBHOOK_SECRET_ENV_VAR} environment variable.")
+        if not Config().current_ticket_accepts_branch:
+            # Events are about any branch, never the checked-out one of the server
+            raise ValueError(f"Webhook events need the ticket of their branch: set "
+                             f"'{Config.CURRENT_TICKET_ACCEPTS_BRANCH_PROP_NAME}' once the current ticket script "
+                             f"resolves the branch given as its first argument.")
+
+        processor = WebhookProcessor(None if dry_run else get_pmt(), secret, max_workers, dry_run)
+        if replay_paths:
+            replay_deliveries(processor, replay_paths)
+            processor.close()
+        else:
+            serve(processor, host, port)
+
     @with_hooks('open')
     def move_to_to_do(self):
         """Move the current ticket to To Do status."""
@@ -79,61 +208,492 @@ class Commands:
         click.echo(f"'{to_do_status}' transition succeeded")
 
     @with_hooks('start-working')
-    def move_to_in_progress(self):
-        """Move the current ticket to In Progress status."""
+    def move_to_in_progress(self, issue_key=None):
+        """
+        Move a ticket to In Progress status.
+
+        :param issue_key: The ticket to move, defaults to the current ticket.
+        """
 
         # Validate that the in progress status is configured
-        if self.config.in_progress_status is None or self.config.in_progress_statuses.length == 0:
+        if not self.config.in_progress_statuses:
             raise ValueError("No in progress statuses configured")
 
         # Step 1: Get current ticket
-        issue_key = self.utils.get_current_ticket()
+        if issue_key is None:
+            issue_key = self.utils.get_current_ticket()
 
         # Step 2: Update ticket status
         in_progress_status = self.pmt.find_valid_status_transition(issue_key, self.config.in_progress_statuses)
         self.pmt.update_ticket_status(issue_key, in_progress_status)
         click.echo(f"'{in_progress_status}' transition succeeded")
 
+    def pick_and_start_working(self):
+        """
+        Pick a to-do ticket interactively, create and check out its branch,
+        and move it to In Progress status.
+        """
+        ticket = TicketPicker(self.pmt.iter_todo_tickets(PICKER_PAGE_SIZE)).pick()
+        if ticket is None:
+            click.echo("No ticket picked.")
+            return
+
+        branch = self.utils.get_ticket_branch_name(ticket["key"], ticket["summary"])
+        if self.config.plan:
+            click.echo(f"Would check out branch '{branch}'.")
+        else:
+            self.utils.checkout_new_git_branch(branch)
+            # The picked ticket is the current ticket of the new branch, no need to run the current-ticket script
+            MetadataCache().set_branch(branch, ticket=ticket["key"])
+
+        self.move_to_in_progress(issue_key=ticket["key"])
+
     @with_hooks('submit-to-review')
-    def move_to_in_review(self, title, reviewer, target_branch, pr_only_flag):
+    def move_to_in_review(self, title, reviewer, target_branch, pr_only_flag, stack_flag=False, reviewer_pool=None,
+                          repo_patterns=None):
         """
         Move the current ticket to In Review status and create a pull request.
 
         :param title: The title of the pull request.
-        :param reviewer: The username of the reviewer.
+        :param reviewer: The username of the reviewer, or 'auto' to request reviews from the changes' code owners.
         :param target_branch: The target branch for the pull request.
         :param pr_only_flag: Flag to create only the pull request.
+        :param stack_flag: Flag to submit the whole stack of branches the current branch belongs to.
+        :param reviewer_pool: A reviewer group to pick the member with the fewest open reviews from, instead of reviewer.
+        :param repo_patterns: Paths or glob patterns of repositories to create a pull request in, for a ticket
+            spanning many repositories, instead of the current repository.
         """
+        if bool(reviewer) == bool(reviewer_pool):
+            raise ValueError("Exactly one of --reviewer and --reviewer-pool is required.")
+        if self.config.pull_request_template:
+            validate_template(self.config.pull_request_template)
+        if reviewer_pool:
+            reviewer = pick_pool_reviewer(self.vcs, reviewer_pool)
+
+        if stack_flag and repo_patterns:
+            raise ValueError("--stack and --repos can't be used together.")
+
+        if stack_flag:
+            self.__submit_stack_to_review(title, reviewer, target_branch, pr_only_flag)
+            return
+
+        if repo_patterns:
+            self.__submit_repos_to_review(title, reviewer, target_branch, pr_only_flag, repo_patterns)
+            return
+
         if not pr_only_flag:
-            # Validate that the in review status is configured
-            if self.config.in_review_statuses is None or self.config.in_review_statuses.length == 0:
-                raise ValueError("No in review statuses configured")
-        
-            issue_key = self.utils.get_current_ticket()  # Step 1: Get current ticket
-            user = self.pmt.get_user_by_username(reviewer)  # Step 2: Get reviewer user object
-
-            # Step 3: Update git branch and reviewer
-            if self.config.git_branch_field is not None and self.config.git_branch_field.length > 0:
-                self.pmt.update_git_branch(issue_key, self.config.git_branch_field)
-                
-            if self.config.reviewer_field is not None and self.config.reviewer_field.length > 0:
-                self.pmt.update_reviewer(issue_key, self.config.reviewer_field, user)
-
-            # Step 4: Update ticket status
-            in_review_status = self.pmt.find_valid_status_transition(issue_key, self.config.in_review_statuses)
-            self.pmt.update_ticket_status(issue_key, in_review_status)
-            click.echo(f"'{in_review_status}' transition succeeded.")
+            self.__validate_in_review_statuses()
+
+        current_branch = self.utils.get_current_git_branch()
+        issue_key = None if pr_only_flag else self.utils.get_branch_ticket(current_branch)  # Step 1: Get current ticket
+
+        with ContextThreadPoolExecutor(max_workers=1) as executor:
+            # The description is built while the reviewers are resolved
+            description_future = executor.submit(self.__get_branch_description, current_branch, target_branch)
+
+            reviewer = self.__get_reviewers(reviewer, target_branch)
+            user = None
+            if not pr_only_flag:
+                user = self.pmt.get_user_by_username(self.__get_main_reviewer(reviewer))  # Step 2: Get reviewer user
+
+            # Awaited before any remote write, so a failure doesn't leave the ticket In Review without a PR
+            description = description_future.result()
+
+        if not pr_only_flag:
+            # Step 3 & 4: Update git branch, reviewer and ticket status
+            self.__submit_ticket_to_review(issue_key, user)
 
         # Step 5: Create MR
-        self.utils.create_pull_request(self.vcs, title, reviewer, target_branch=target_branch)
+        self.utils.create_pull_request(self.vcs, title, reviewer, current_branch, target_branch, description)
+
+    def __get_ticket_details(self, branch):
+        """
+        Get the details of a branch's ticket for its pull request description.
+
+        :return: The ticket details, or None without template, or if the ticket can't be resolved or fetched.
+        """
+        if not self.config.pull_request_template:
+            return None
+
+        try:
+            issue_key = self.utils.get_branch_ticket(branch)
+        except (ValueError, subprocess.CalledProcessError) as e:
+            click.echo(f"{branch}: no pull request description, failed to get the ticket: {e}", err=True)
+            return None
+        return fetch_ticket_details(self.pmt, issue_key, self.config.acceptance_criteria_field)
+
+    def __get_description(self, ticket, target_branch, source_branch="HEAD", repo_path=None):
+        """
+        Build the description of a pull request from the configured template, its ticket and its commits.
+
+        :param ticket: The ticket details, or None.
+        :param target_branch: The target branch of the pull request.
+        :param source_branch: The source branch of the pull request.
+        :param repo_path: The repository, defaults to the current one.
+        :return: The description, or None without template or ticket details.
+        """
+        if not self.config.pull_request_template or ticket is None:
+            return None
+        return render_description(self.config.pull_request_template, ticket,
+                                  list_commits(target_branch, source_branch, repo_path))
+
+    def __get_branch_description(self, branch, target_branch):
+        """Build the description of a branch's pull request in the current repository."""
+        return self.__get_description(self.__get_ticket_details(branch), target_branch, branch)
+
+    def __get_reviewers(self, reviewer, target_branch, source_branch="HEAD", repo_root=None, vcs=None):
+        """
+        Resolve the reviewers of a pull request.
+        With 'auto', the files changed since the source branch forked from the target branch are matched against
+        the repository's CODEOWNERS file, and their owners are resolved to VCS users.
+
+        :param reviewer: The reviewer username, or 'auto'.
+        :param target_branch: The target branch of the pull request.
+        :param source_branch: The source branch of the pull request.
+        :param repo_root: The root directory of the repository, defaults to the current repository.
+        :param vcs: The VCS object of the repository's project, defaults to the configured project.
+        :return: The reviewer username, or a list of reviewer usernames.
+        """
+        if reviewer != AUTO_REVIEWER:
+            return reviewer
+
+        repo_root = repo_root or get_repo_root()
+        code_owners = CodeOwners.load(repo_root)
+        if code_owners is None:
+            raise ValueError(f"No CODEOWNERS file found in the repository {repo_root}.")
+
+        owners = code_owners.get_owners(get_changed_files(target_branch, source_branch, repo_root))
+        reviewers = (vcs or self.vcs).resolve_code_owners(owners)
+        if not reviewers:
+            raise ValueError(f"No code owners found for the changes of '{source_branch}' against '{target_branch}'")
+
+        click.echo(f"Reviewers from CODEOWNERS: {', '.join(reviewers)}")
+        return reviewers
+
+    @staticmethod
+    def __get_main_reviewer(reviewer):
+        """Get the reviewer stored in the ticket's reviewer field: the top code owner when there are many."""
+        return reviewer[0] if isinstance(reviewer, list) else reviewer
+
+    def __validate_in_review_statuses(self):
+        """Validate that the in review status is configured."""
+        if not self.config.in_review_statuses:
+            raise ValueError("No in review statuses configured")
+
+    def __submit_ticket_to_review(self, issue_key, user, branch=None):
+        """
+        Update the git branch and reviewer fields of a ticket, and move it to In Review status.
+
+        :param issue_key: The key of the ticket.
+        :param user: The user object of the reviewer.
+        :param branch: The git branch of the ticket, defaults to the current git branch.
+        """
+        if self.config.git_branch_field:
+            self.pmt.update_git_branch(issue_key, self.config.git_branch_field, branch)
+
+        if self.config.reviewer_field:
+            self.pmt.update_reviewer(issue_key, self.config.reviewer_field, user)
+
+        in_review_status = self.pmt.find_valid_status_transition(issue_key, self.config.in_review_statuses)
+        self.pmt.update_ticket_status(issue_key, in_review_status)
+        click.echo(f"{issue_key}: '{in_review_status}' transition succeeded.")
+
+    def __submit_stack_to_review(self, title, reviewer, target_branch, pr_only_flag):
+        """
+        Create or retarget the pull request of every branch in the current branch's stack, each against
+        its parent branch, and move all the stack's tickets to In Review status.
+        All pull requests and tickets are handled concurrently.
+
+        :param title: The title of the current branch's pull request, other layers get the default title.
+        :param reviewer: The username of the reviewer.
+        :param target_branch: The branch the bottom of the stack is based on.
+        :param pr_only_flag: Flag to create only the pull requests.
+        """
+        current_branch = self.utils.get_current_git_branch()
+        stack = get_branch_stack(target_branch, current_branch)
+        click.echo("Stack: " + " → ".join([target_branch] + [branch for branch, _ in stack]))
+
+        # With 'auto', each layer is reviewed by the code owners of its own changes
+        reviewers_by_branch = {branch: self.__get_reviewers(reviewer, parent, branch) for branch, parent in stack}
+
+        with ContextThreadPoolExecutor(max_workers=STACK_MAX_WORKERS) as executor:
+            futures = {}
+            for branch, parent in stack:
+                layer_title = title if branch == current_branch else ""
+                # Only a created pull request gets a description, a retargeted one keeps its own
+                get_description = functools.partial(self.__get_branch_description, branch, parent)
+                future = executor.submit(self.utils.create_or_update_pull_request, self.vcs, layer_title,
+                                         reviewers_by_branch[branch], branch, parent, get_description)
+                futures[future] = f"pull request of '{branch}'"
+
+            if not pr_only_flag:
+                self.__validate_in_review_statuses()
+
+                # Branches of the same ticket are transitioned once, with the bottom-most branch
+                branches_by_ticket = {}
+                for branch, _ in stack:
+                    branches_by_ticket.setdefault(self.utils.get_branch_ticket(branch), branch)
+
+                users = {}
+                for issue_key, branch in branches_by_ticket.items():
+                    main_reviewer = self.__get_main_reviewer(reviewers_by_branch[branch])
+                    if main_reviewer not in users:
+                        users[main_reviewer] = self.pmt.get_user_by_username(main_reviewer)
+
+                    future = executor.submit(self.__submit_ticket_to_review, issue_key, users[main_reviewer], branch)
+                    futures[future] = f"ticket '{issue_key}'"
+
+            failures = []
+            for future, description in futures.items():
+                try:
+                    future.result()
+                except Exception as e:
+                    # Keep collecting the other layers
+                    failures.append(description)
+                    click.echo(f"{description}: {e}", err=True)
+
+        if failures:
+            raise RuntimeError(f"Failed to submit {len(failures)} of {len(futures)} stack operations: "
+                               + ", ".join(failures))
+
+    def __get_repo_submission(self, repo_path, reviewer, target_branch, pr_only_flag):
+        """Get the branch, project VCS object, reviewers and ticket of a repository to submit."""
+        branch = get_repo_branch(repo_path)
+        vcs = self.vcs.for_project(get_repo_project(repo_path))
+        reviewers = self.__get_reviewers(reviewer, target_branch, branch, repo_path, vcs)
+        issue_key = None if pr_only_flag else self.utils.get_branch_ticket(branch)
+        return branch, vcs, reviewers, issue_key
+
+    def __create_repo_pull_request(self, repo_path, vcs, title, reviewers, branch, target_branch, ticket_future=None):
+        if title == "":
+            title = f"Merge {branch} into {target_branch}"
+        # The shared ticket is fetched once for all the repositories, otherwise each branch resolves its own
+        ticket = ticket_future.result() if ticket_future else self.__get_ticket_details(branch)
+        description = self.__get_description(ticket, target_branch, branch, repo_path)
+        pr_link = vcs.create_pull_request(branch, target_branch, title, reviewers, description)
+        click.echo(f"{os.path.basename(repo_path)}: {pr_link}")
+        return pr_link
+
+    def __submit_repos_to_review(self, title, reviewer, target_branch, pr_only_flag, repo_patterns):
+        """
+        Create a pull request in each of many repositories for a ticket spanning them, and move the ticket
+        to In Review status once. Each repository's project is derived from its remote, and its source branch
+        is its current branch. The repositories are inspected, and the pull requests and ticket are handled,
+        concurrently.
+
+        :param title: The title of the pull requests.
+        :param reviewer: The username of the reviewer, or 'auto' for each repository's code owners.
+        :param target_branch: The target branch of the pull requests.
+        :param pr_only_flag: Flag to create only the pull requests.
+        :param repo_patterns: Paths or glob patterns of the repositories.
+        """
+        repos = find_repos(repo_patterns)
+        if not repos:
+            raise ValueError(f"No git repository matches {', '.join(repo_patterns)}.")
+
+        if not pr_only_flag:
+            self.__validate_in_review_statuses()
+
+        with ContextThreadPoolExecutor(max_workers=REPOS_MAX_WORKERS) as executor:
+            submissions = dict(zip(repos, executor.map(
+                lambda repo: self.__get_repo_submission(repo, reviewer, target_branch, pr_only_flag), repos)))
+
+            issue_keys = {issue_key for _, _, _, issue_key in submissions.values()}
+            if not pr_only_flag and len(issue_keys) > 1:
+                raise ValueError(f"The repositories' branches belong to different tickets: "
+                                 f"{', '.join(sorted(issue_keys))}.")
+
+            ticket_future = None
+            if not pr_only_flag:
+                # Submitted before the pull requests waiting for it, so it can't starve behind them
+                ticket_future = executor.submit(self.__get_ticket_details, submissions[repos[0]][0])
+
+            futures = {}
+            for repo, (branch, vcs, reviewers, _) in submissions.items():
+                future = executor.submit(self.__create_repo_pull_request, repo, vcs, title, reviewers, branch,
+                                         target_branch, ticket_future)
+                futures[future] = f"pull request of {os.path.basename(repo)}"
+
+            if not pr_only_flag:
+                # The ticket is updated once, with the first repository's branch and reviewer
+                branch, _, reviewers, issue_key = submissions[repos[0]]
+
+                def submit_ticket():
+                    user = self.pmt.get_user_by_username(self.__get_main_reviewer(reviewers))
+                    self.__submit_ticket_to_review(issue_key, user, branch)
+
+                futures[executor.submit(submit_ticket)] = f"ticket '{issue_key}'"
+
+            failures = []
+            for future, description in futures.items():
+                try:
+                    future.result()
+                except Exception as e:
+                    # Keep collecting the other repositories
+                    failures.append(description)
+                    click.echo(f"{description}: {e}", err=True)
+
+        if failures:
+            raise RuntimeError(f"Failed {len(failures)} of {len(futures)} operations: " + ", ".join(failures))
+        click.echo(f"Submitted {len(repos)} repositories to review.")
 
     @with_hooks('done')
-    def move_to_done(self):
-        """Move the current ticket to Done status."""
+    def move_to_done(self, issue_key=None, cascade=None):
+        """
+        Move a ticket to Done status.
+
+        :param issue_key: The ticket to move, defaults to the current ticket.
+        :param cascade: Also close the related issues first: comma-separated 'subtasks' and 'links:<link type>'.
+        """
         # Step 1: Get current ticket
-        issue_key = self.utils.get_current_ticket()
+        if issue_key is None:
+            issue_key = self.utils.get_current_ticket()
+
+        if cascade:
+            self.__close_cascade(issue_key, cascade)
+            return
 
         # Step 2: Update ticket status
+        self.__transition_to_done(issue_key)
+
+    def __transition_to_done(self, issue_key):
         done_status = self.pmt.find_valid_status_transition(issue_key, self.config.done_statuses)
         self.pmt.update_ticket_status(issue_key, done_status)
-        click.echo(f"'{done_status}' transition succeeded.")
+        click.echo(f"{issue_key}: '{done_status}' transition succeeded.")
+
+    def __close_cascade(self, issue_key, cascade):
+        """
+        Move a ticket and its related issues to Done status, children before their parents.
+
+        The issue graph comes from a single search, with the issues' transitions, so each level of the graph
+        is closed concurrently with one request per issue.
+
+        :param issue_key: The key of the root ticket.
+        :param cascade: Comma-separated 'subtasks' and 'links:<link type>'.
+        """
+        include_subtasks, link_types = parse_cascade(cascade)
+        graph = self.pmt.get_issue_graph(issue_key, include_subtasks, link_types)
+        levels = get_cascade_levels(graph, issue_key)
+        click.echo(f"{issue_key}: {len(graph) - 1} related issues, "
+                   f"{sum(len(level) for level in levels)} issues to close in {len(levels)} levels.")
+
+        with ContextThreadPoolExecutor(max_workers=CASCADE_MAX_WORKERS) as executor:
+            for level in levels:
+                futures = {executor.submit(self.__transition_to_done, key): key for key in level}
+                failures = []
+                for future, key in futures.items():
+                    try:
+                        future.result()
+                    except Exception as e:
+                        # Keep collecting the other issues of the level
+                        failures.append(key)
+                        click.echo(f"{key}: {e}", err=True)
+
+                if failures:
+                    raise RuntimeError(f"Failed to close {', '.join(failures)}, their parent issues were left open.")
+
+    def __on_pull_request_merged(self, branch, entry):
+        # A failed transition is reported by the watcher, which keeps the pull request watched to retry it
+        self.move_to_done(issue_key=entry["ticket"])
+
+    def move_to_done_when_merged(self):
+        """Wait for the current branch's pull request to be merged, then move the current ticket to Done status."""
+        branch = self.utils.get_current_git_branch()
+        issue_key = self.utils.get_current_ticket()
+
+        cached_branch = MetadataCache().get_branch(branch)
+        pull_request = cached_branch.get("pull_request") if cached_branch else None
+        if pull_request is None:
+            pull_request = self.vcs.find_open_pull_request(branch)
+        if pull_request is None:
+            raise ValueError(f"No open pull request found for branch '{branch}'.")
+
+        with WatchList.edit() as watch_list:
+            watch_list.add(branch, issue_key, pull_request)
+
+        click.echo(f"⏳ Waiting for {pull_request} to be merged...")
+        if not run_watcher(self.vcs, self.__on_pull_request_merged, until_branch=branch):
+            click.echo("Another gitask watch process is running: "
+                       f"it will move {issue_key} to done when the pull request is merged.")
+
+    def watch(self, once):
+        """
+        Watch all open pull requests of the current user, moving their tickets to Done status when merged.
+
+        :param once: Poll only once instead of until all watched pull requests are merged or closed.
+        """
+        pull_requests = self.vcs.list_my_open_pull_requests()
+        issue_keys = {}
+        for branch in pull_requests:
+            try:
+                issue_keys[branch] = self.utils.get_branch_ticket(branch)
+            except (subprocess.CalledProcessError, ValueError) as e:
+                click.echo(f"{branch}: not watched, failed to get its ticket: {e}", err=True)
+
+        with WatchList.edit() as watch_list:
+            for branch, issue_key in issue_keys.items():
+                if branch not in watch_list.pull_requests:
+                    watch_list.add(branch, issue_key, pull_requests[branch])
+            watched_count = len(watch_list.pull_requests)
+
+        click.echo(f"⏳ Watching {watched_count} pull requests...")
+        if not run_watcher(self.vcs, self.__on_pull_request_merged, once=once):
+            click.echo("Another gitask watch process is already running.")
+
+    def sync_status(self, dry_run, assume_yes, lookback_days):
+        """
+        Reconcile the ticket statuses with the state of their branches and pull requests:
+        tickets with an open pull request go to In Review, merged ones to Done, and in-progress tickets whose
+        branches were deleted without a pull request back to To Do.
+        The planned transitions are shown first, then applied concurrently.
+
+        :param dry_run: Flag to only show the planned transitions.
+        :param assume_yes: Flag to apply the planned transitions without confirmation.
+        :param lookback_days: Only pull requests updated in this number of days are considered.
+        """
+        changes, errors, deleted_branches = plan_status_changes(self.pmt, self.vcs, lookback_days)
+
+        for issue_key, error in errors:
+            click.echo(f"{issue_key}: skipped, {error}", err=True)
+
+        if not changes:
+            click.echo("All ticket statuses are in sync.")
+            if not dry_run and not self.config.plan:
+                self.__prune_deleted_branches(deleted_branches, {issue_key for issue_key, _ in errors})
+            return
+
+        for change in changes:
+            click.echo(f"{change.issue_key}: '{change.current_status}' → '{change.transition}' ({change.reason})")
+
+        # In plan mode, the transitions are only recorded in the plan, so there's nothing to confirm
+        plan = self.config.plan
+        if dry_run or not (plan or assume_yes or click.confirm(f"Apply {len(changes)} transitions?")):
+            return
+
+        with ContextThreadPoolExecutor(max_workers=SYNC_MAX_WORKERS) as executor:
+            futures = {executor.submit(self.pmt.update_ticket_status, change.issue_key, change.transition): change
+                       for change in changes}
+
+            failures = []
+            for future, change in futures.items():
+                try:
+                    future.result()
+                    outcome = "planned" if plan else "succeeded"
+                    click.echo(f"{change.issue_key}: '{change.transition}' transition {outcome}.")
+                except Exception as e:
+                    # Keep applying the other transitions
+                    failures.append(change.issue_key)
+                    click.echo(f"{change.issue_key}: {e}", err=True)
+
+        if not plan:
+            self.__prune_deleted_branches(deleted_branches, set(failures) | {issue_key for issue_key, _ in errors})
+        if failures:
+            raise RuntimeError(f"Failed to apply {len(failures)} of {len(changes)} transitions: " + ", ".join(failures))
+
+    @staticmethod
+    def __prune_deleted_branches(deleted_branches, unreconciled_issue_keys):
+        """Drop the cached deleted branches whose tickets are reconciled, so later syncs don't reconsider them."""
+        reconciled = [branch for branch, issue_key in deleted_branches.items()
+                      if issue_key not in unreconciled_issue_keys]
+        if reconciled:
+            MetadataCache().remove_branches(reconciled)
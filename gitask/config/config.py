@@ -1,5 +1,10 @@
+import fnmatch
 import json
 import os
+from urllib.parse import urlsplit
+
+from gitask.repos import get_remote_url, get_resolved_remote_url, parse_remote_url
+from gitask.scope import get_singleton
 
 
 class Config:
@@ -9,6 +14,15 @@ class Config:
     PMT_URL_ENV_VAR = "GITASK_PMT_URL"
     GIT_TOKEN_ENV_VAR = "GITASK_GIT_TOKEN"
     GIT_URL_ENV_VAR = "GITASK_GIT_URL"
+    CACHE_DIR_ENV_VAR = "GITASK_CACHE_DIR"
+    WEBHOOK_SECRET_ENV_VAR = "GITASK_WEBHOOK_SECRET"
+    DEFAULT_CACHE_DIR = "~/.cache/gitask"
+    DEFAULT_CACHE_TTL = 900
+    DEFAULT_TIMEOUT = 60
+    DEFAULT_RETRY_BUDGET = 3
+    DEFAULT_BRANCH_TEMPLATE = "{key}-{summary}"
+    DEFAULT_PULL_REQUEST_TEMPLATE = ("[{key}]({link}): {summary}\n\n{acceptance_criteria}\n\n"
+                                     "### Commits\n\n{commits}")
     PMT_TYPE_PROP_NAME = "pmt-type"
     VCS_TYPE_PROP_NAME = "vcs-type"
     GIT_PROJECT_PROP_NAME = "git-project"
@@ -19,38 +33,111 @@ class Config:
     REVIEWER_FIELD_PROP_NAME = "reviewer-field"
     GIT_BRANCH_FIELD_PROP_NAME = "git-branch-field"
     CURRENT_TICKET_PROP_NAME = "current-ticket"
+    CURRENT_TICKET_ACCEPTS_BRANCH_PROP_NAME = "current-ticket-accepts-branch"
     HOOKS_PROP_NAME = "hooks"
+    CACHE_TTL_PROP_NAME = "cache-ttl"
+    TIMEOUT_PROP_NAME = "timeout"
+    RETRY_BUDGET_PROP_NAME = "retry-budget"
+    HEDGE_AFTER_PROP_NAME = "hedge-after"
+    PICKER_QUERY_PROP_NAME = "picker-query"
+    BRANCH_TEMPLATE_PROP_NAME = "branch-template"
+    REPORT_QUERY_PROP_NAME = "report-query"
+    FORCE_HOOKS_PROP_NAME = "force-hooks"
+    METRICS_TEXTFILE_PROP_NAME = "metrics-textfile"
+    PLAN_PROP_NAME = "plan"
+    REMOTES_PROP_NAME = "remotes"
+    PULL_REQUEST_TEMPLATE_PROP_NAME = "pull-request-template"
+    ACCEPTANCE_CRITERIA_FIELD_PROP_NAME = "acceptance-criteria-field"
+    GITHUB_HOST = "github.com"
 
 
-    _instance = None
-
     def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super(Config, cls).__new__(cls)
-            cls._instance.__load_config()
-        return cls._instance
+        return get_singleton(cls, Config.__load_config)
+
+    @staticmethod
+    def from_dict(config_data, environ=None):
+        """
+        Create a configuration from a dict instead of the config file, independent of the process-wide one.
+
+        :param config_data: The configuration values, as in the config file.
+        :param environ: The environment variables (tokens, URLs, cache directory), defaults to the process environment.
+        :return: The Config object.
+        """
+        config = object.__new__(Config)
+        config.config_data = dict(config_data)
+        config.environ = dict(os.environ if environ is None else environ)
+        config.config_path = None
+        config.load_error = None
+        return config
 
     def __load_config(self):
         """Load configuration from the config file or environment variables."""
+        self.environ = os.environ
         config_path = os.getenv(Config.CONFIG_FILE, os.path.expanduser(Config.DEFAULT_CONFIG_FILE))
+        self.config_path = config_path
+        # Kept so that `gitask doctor` can report why the configuration is empty
+        self.load_error = None
 
         try:
             with open(config_path, 'r') as config_file:
                 self.config_data = json.load(config_file)
         except FileNotFoundError:
-            print(f"Error: Configuration file not found at {config_path}")
+            self.load_error = f"Configuration file not found at {config_path}"
+            print(f"Error: {self.load_error}")
             self.config_data = {}  # Set to an empty dict to avoid attribute errors
-        except json.JSONDecodeError:
+        except json.JSONDecodeError as e:
+            self.load_error = f"Configuration file is not a valid JSON: {e}"
             print("Error: Configuration file is not a valid JSON.")
             self.config_data = {}
 
+        self.__apply_remote_config(os.getcwd())
+
+    def __get_vcs_host(self):
+        if (self.vcs_type or "").lower() == "github":
+            return Config.GITHUB_HOST
+        return urlsplit(self.git_url).hostname if self.git_url else None
+
+    def __apply_remote_config(self, repo_path):
+        """
+        Use the project of the current repository's origin remote, when it's hosted on the configured VCS server,
+        instead of the configured git-project, and apply the first matching per-remote overrides.
+        The remote is read from the repository's git config file, git only resolves it when it isn't on the VCS server,
+        e.g. rewritten by a url.<base>.insteadOf of the global git config.
+
+        :param repo_path: A path in the current repository.
+        """
+        try:
+            host, project = parse_remote_url(get_remote_url(repo_path))
+        except (OSError, ValueError):
+            return
+
+        vcs_host = self.__get_vcs_host()
+        if vcs_host and host != vcs_host:
+            try:
+                host, project = parse_remote_url(get_resolved_remote_url(repo_path))
+            except (OSError, ValueError):
+                pass
+
+        if host == vcs_host:
+            self.config_data[Config.GIT_PROJECT_PROP_NAME] = project
+
+        # Overrides are matched against the project path or the host and project path, e.g. "group/*"
+        for pattern, overrides in self.config_data.get(Config.REMOTES_PROP_NAME, {}).items():
+            if fnmatch.fnmatchcase(project, pattern) or fnmatch.fnmatchcase(f"{host}/{project}", pattern):
+                self.config_data.update(overrides)
+                break
+
+    def override(self, prop_name, value):
+        """Override a configuration value for the current invocation (e.g. from a command line option)."""
+        self.config_data[prop_name] = value
+
     @property
     def pmt_token(self):
-        return os.getenv(Config.PMT_TOKEN_ENV_VAR)
+        return self.environ.get(Config.PMT_TOKEN_ENV_VAR)
 
     @property
     def pmt_url(self):
-        return os.getenv(Config.PMT_URL_ENV_VAR)
+        return self.environ.get(Config.PMT_URL_ENV_VAR)
 
     @property
     def pmt_type(self):
@@ -62,11 +149,11 @@ class Config:
 
     @property
     def git_token(self):
-        return os.getenv(Config.GIT_TOKEN_ENV_VAR)
+        return self.environ.get(Config.GIT_TOKEN_ENV_VAR)
 
     @property
     def git_url(self):
-        return os.getenv(Config.GIT_URL_ENV_VAR)
+        return self.environ.get(Config.GIT_URL_ENV_VAR)
 
     @property
     def git_proj(self):
@@ -100,6 +187,67 @@ class Config:
     def current_ticket_script(self):
         return self.config_data.get(Config.CURRENT_TICKET_PROP_NAME)
 
+    @property
+    def current_ticket_accepts_branch(self):
+        return self.config_data.get(Config.CURRENT_TICKET_ACCEPTS_BRANCH_PROP_NAME, False)
+
     @property
     def hooks(self):
         return self.config_data.get(Config.HOOKS_PROP_NAME, {})
+
+    @property
+    def webhook_secret(self):
+        return self.environ.get(Config.WEBHOOK_SECRET_ENV_VAR)
+
+    @property
+    def cache_dir(self):
+        return os.path.expanduser(self.environ.get(Config.CACHE_DIR_ENV_VAR, Config.DEFAULT_CACHE_DIR))
+
+    @property
+    def cache_ttl(self):
+        return self.config_data.get(Config.CACHE_TTL_PROP_NAME, Config.DEFAULT_CACHE_TTL)
+
+    @property
+    def timeout(self):
+        return self.config_data.get(Config.TIMEOUT_PROP_NAME, Config.DEFAULT_TIMEOUT)
+
+    @property
+    def retry_budget(self):
+        return self.config_data.get(Config.RETRY_BUDGET_PROP_NAME, Config.DEFAULT_RETRY_BUDGET)
+
+    @property
+    def hedge_after(self):
+        return self.config_data.get(Config.HEDGE_AFTER_PROP_NAME)
+
+    @property
+    def picker_query(self):
+        return self.config_data.get(Config.PICKER_QUERY_PROP_NAME)
+
+    @property
+    def branch_template(self):
+        return self.config_data.get(Config.BRANCH_TEMPLATE_PROP_NAME, Config.DEFAULT_BRANCH_TEMPLATE)
+
+    @property
+    def pull_request_template(self):
+        return self.config_data.get(Config.PULL_REQUEST_TEMPLATE_PROP_NAME, Config.DEFAULT_PULL_REQUEST_TEMPLATE)
+
+    @property
+    def acceptance_criteria_field(self):
+        return self.config_data.get(Config.ACCEPTANCE_CRITERIA_FIELD_PROP_NAME)
+
+    @property
+    def report_query(self):
+        return self.config_data.get(Config.REPORT_QUERY_PROP_NAME)
+
+    @property
+    def force_hooks(self):
+        return self.config_data.get(Config.FORCE_HOOKS_PROP_NAME, False)
+
+    @property
+    def metrics_textfile(self):
+        value = self.config_data.get(Config.METRICS_TEXTFILE_PROP_NAME)
+        return os.path.expanduser(value) if value else None
+
+    @property
+    def plan(self):
+        return self.config_data.get(Config.PLAN_PROP_NAME, False)
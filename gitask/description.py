@@ -0,0 +1,93 @@
+import re
+import subprocess
+
+import click
+
+MAX_LISTED_COMMITS = 50
+MAX_COMMIT_SUBJECT_LENGTH = 120
+MAX_DESCRIPTION_LENGTH = 20000
+TRUNCATED_SUFFIX = "\n\n_(truncated)_"
+
+
+class _TemplateValues(dict):
+    def __missing__(self, key):
+        raise ValueError(f"Unknown placeholder '{{{key}}}' in the pull request template.")
+
+
+def validate_template(template):
+    """
+    Check that a pull request description template renders, before any remote write depends on it.
+
+    :raises ValueError: If the template is invalid, e.g. has an unknown placeholder.
+    """
+    try:
+        template.format_map(_TemplateValues(key="", summary="", acceptance_criteria="", link="", commits=""))
+    except (ValueError, AttributeError, IndexError, KeyError) as e:
+        raise ValueError(f"Invalid pull request template: {e}") from e
+
+
+def fetch_ticket_details(pmt, issue_key, acceptance_criteria_field=None):
+    """
+    Fetch the details of a ticket for its pull request description.
+    A failure only drops the description, it doesn't fail the pull request.
+
+    :return: The ticket details, or None if they couldn't be fetched.
+    """
+    try:
+        return pmt.get_ticket_details(issue_key, acceptance_criteria_field)
+    except Exception as e:
+        click.echo(f"{issue_key}: no pull request description, failed to fetch the ticket: {e}", err=True)
+        return None
+
+
+def list_commits(target_branch, source_branch="HEAD", repo_path=None):
+    """
+    List the commits of the source branch since its merge base with the target branch, as Markdown list items.
+    The git log output is parsed as it's streamed, so only the listed commits are kept in memory,
+    the others are only counted.
+
+    :param target_branch: The target branch of the pull request.
+    :param source_branch: The source branch of the pull request.
+    :param repo_path: The repository, defaults to the current one.
+    :return: The commit list, or an empty string if the commits couldn't be listed.
+    """
+    process = subprocess.Popen(["git", "log", "--no-merges", "--format=%h %s", f"{target_branch}..{source_branch}"],
+                               stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, cwd=repo_path)
+    lines = []
+    count = 0
+    with process.stdout:
+        for raw_line in process.stdout:
+            count += 1
+            if count <= MAX_LISTED_COMMITS:
+                line = raw_line.decode('utf-8', errors='replace').rstrip("\n")
+                lines.append(f"- {line[:MAX_COMMIT_SUBJECT_LENGTH]}")
+
+    if process.wait() != 0:
+        return ""
+
+    if count > MAX_LISTED_COMMITS:
+        lines.append(f"- _… and {count - MAX_LISTED_COMMITS} more commits_")
+    return "\n".join(lines)
+
+
+def render_description(template, ticket, commits):
+    """
+    Render the pull request description template, capped in size.
+
+    :param template: The template, with {key}, {summary}, {acceptance_criteria}, {link} and {commits} placeholders.
+    :param ticket: The ticket details, or None.
+    :param commits: The commit list.
+    :return: The description, or None without ticket details.
+    """
+    if ticket is None:
+        return None
+
+    values = _TemplateValues(key=ticket["key"], summary=ticket["summary"],
+                             acceptance_criteria=ticket["acceptance_criteria"] or "", link=ticket["link"],
+                             commits=commits)
+    # Empty values leave blank lines behind
+    description = re.sub(r"\n{3,}", "\n\n", template.format_map(values)).strip()
+
+    if len(description) > MAX_DESCRIPTION_LENGTH:
+        description = description[:MAX_DESCRIPTION_LENGTH - len(TRUNCATED_SUFFIX)] + TRUNCATED_SUFFIX
+    return description
@@ -0,0 +1,383 @@
+import base64
+import http.client
+import json
+import os
+import socket
+import ssl
+import time
+from urllib.parse import quote, urlsplit
+
+import click
+import requests
+
+from gitask.config.config import Config
+from gitask.pmt.github_pmt import get_github_api_url
+from gitask.scope import ContextThreadPoolExecutor
+from gitask.utils import Utils
+
+STATUS_OK = "OK"
+STATUS_WARN = "WARN"
+STATUS_FAIL = "FAIL"
+STATUS_COLORS = {STATUS_OK: "green", STATUS_WARN: "yellow", STATUS_FAIL: "red"}
+
+PROBE_TIMEOUT_SECONDS = 10
+MAX_PROBE_BODY_SIZE = 1024 * 1024
+# Durations above these thresholds are reported as warnings
+PHASE_THRESHOLDS = {"dns": 0.1, "tcp": 0.3, "proxy": 0.5, "tls": 0.5, "first byte": 1.5}
+SCRIPT_THRESHOLD = 0.5
+
+REQUIRED_GITHUB_SCOPES = {"repo"}
+REQUIRED_GITLAB_SCOPES = {"api"}
+
+# Configuration values: (expected types, required, allowed values compared case-insensitively)
+CONFIG_SCHEMA = {
+    Config.PMT_TYPE_PROP_NAME: ((str,), True, ("jira", "github")),
+    Config.VCS_TYPE_PROP_NAME: ((str,), True, ("gitlab", "github")),
+    Config.GIT_PROJECT_PROP_NAME: ((str,), True, None),
+    Config.CURRENT_TICKET_PROP_NAME: ((str,), True, None),
+    Config.CURRENT_TICKET_ACCEPTS_BRANCH_PROP_NAME: ((bool,), False, None),
+    Config.TO_DO_PROP_NAME: ((list,), True, None),
+    Config.IN_PROGRESS_PROP_NAME: ((list,), False, None),
+    Config.IN_REVIEW_PROP_NAME: ((list,), False, None),
+    Config.DONE_PROP_NAME: ((list,), True, None),
+    Config.REVIEWER_FIELD_PROP_NAME: ((str,), False, None),
+    Config.GIT_BRANCH_FIELD_PROP_NAME: ((str,), False, None),
+    Config.HOOKS_PROP_NAME: ((dict,), False, None),
+    Config.CACHE_TTL_PROP_NAME: ((int, float), False, None),
+    Config.TIMEOUT_PROP_NAME: ((int, float), False, None),
+    Config.RETRY_BUDGET_PROP_NAME: ((int,), False, None),
+    Config.HEDGE_AFTER_PROP_NAME: ((int, float), False, None),
+    Config.PICKER_QUERY_PROP_NAME: ((str,), False, None),
+    Config.BRANCH_TEMPLATE_PROP_NAME: ((str,), False, None),
+    Config.REPORT_QUERY_PROP_NAME: ((str,), False, None),
+    Config.FORCE_HOOKS_PROP_NAME: ((bool,), False, None),
+    Config.METRICS_TEXTFILE_PROP_NAME: ((str,), False, None),
+    Config.REMOTES_PROP_NAME: ((dict,), False, None),
+    Config.PULL_REQUEST_TEMPLATE_PROP_NAME: ((str,), False, None),
+    Config.ACCEPTANCE_CRITERIA_FIELD_PROP_NAME: ((str,), False, None),
+}
+
+
+class Check:
+    """The outcome of a single doctor check."""
+
+    def __init__(self, name, status, detail):
+        self.name = name
+        self.status = status
+        self.detail = detail
+
+
+class ProbeResponse:
+    """The timed phases and response of an HTTP probe."""
+
+    def __init__(self):
+        self.phases = []
+        self.status_code = None
+        self.headers = {}
+        self.body = b""
+        self.error = None
+
+    def json(self):
+        return json.loads(self.body)
+
+
+def _format_duration(seconds):
+    return f"{seconds:.1f}s" if seconds >= 1 else f"{seconds * 1000:.0f}ms"
+
+
+def _get_ssl_context():
+    # Use the same CA bundle as the backend clients, e.g. a corporate proxy's CA from REQUESTS_CA_BUNDLE
+    ca_bundle = os.environ.get("REQUESTS_CA_BUNDLE") or os.environ.get("CURL_CA_BUNDLE") or requests.certs.where()
+    return ssl.create_default_context(cafile=ca_bundle)
+
+
+def probe_http(url, headers):
+    """
+    Send a GET request, timing DNS resolution, TCP connect, proxy tunnel, TLS handshake and first byte separately.
+    The proxy is taken from the environment, as the backend clients do.
+
+    :param url: The URL to get.
+    :param headers: The request headers (e.g. authentication).
+    :return: A ProbeResponse, whose error is set if a phase failed.
+    """
+    response = ProbeResponse()
+    parts = urlsplit(url)
+    https = parts.scheme == "https"
+    port = parts.port or (443 if https else 80)
+    proxy = requests.utils.get_environ_proxies(url).get(parts.scheme)
+    proxy_parts = urlsplit(proxy) if proxy else None
+    connect_host, connect_port = (proxy_parts.hostname, proxy_parts.port or 8080) if proxy else (parts.hostname, port)
+
+    phase = "dns"
+    sock = None
+    try:
+        started_at = time.monotonic()
+        address = socket.getaddrinfo(connect_host, connect_port, type=socket.SOCK_STREAM)[0][4][:2]
+        response.phases.append((phase, time.monotonic() - started_at))
+
+        phase = "tcp"
+        started_at = time.monotonic()
+        sock = socket.create_connection(address, timeout=PROBE_TIMEOUT_SECONDS)
+        response.phases.append((phase, time.monotonic() - started_at))
+
+        proxy_headers = ""
+        if proxy and proxy_parts.username:
+            credentials = base64.b64encode(f"{proxy_parts.username}:{proxy_parts.password or ''}".encode('utf-8'))
+            proxy_headers = f"Proxy-Authorization: Basic {credentials.decode('ascii')}\r\n"
+
+        if proxy and https:
+            phase = "proxy"
+            started_at = time.monotonic()
+            sock.sendall(f"CONNECT {parts.hostname}:{port} HTTP/1.1\r\nHost: {parts.hostname}:{port}\r\n"
+                         f"{proxy_headers}\r\n".encode('utf-8'))
+            tunnel_response = http.client.HTTPResponse(sock, method="CONNECT")
+            tunnel_response.begin()
+            if tunnel_response.status != 200:
+                raise OSError(f"proxy CONNECT returned {tunnel_response.status} {tunnel_response.reason}")
+            response.phases.append((phase, time.monotonic() - started_at))
+
+        if https:
+            phase = "tls"
+            started_at = time.monotonic()
+            sock = _get_ssl_context().wrap_socket(sock, server_hostname=parts.hostname)
+            response.phases.append((phase, time.monotonic() - started_at))
+
+        phase = "first byte"
+        # A plain HTTP request through a proxy uses the absolute URL, a tunneled one only the path
+        target = url if proxy and not https else (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+        request_headers = "".join(f"{name}: {value}\r\n" for name, value in headers.items())
+        if proxy and not https:
+            request_headers += proxy_headers
+        started_at = time.monotonic()
+        sock.sendall(f"GET {target} HTTP/1.1\r\nHost: {parts.netloc}\r\nUser-Agent: gitask-doctor\r\n"
+                     f"Accept: application/json\r\nConnection: close\r\n{request_headers}\r\n".encode('utf-8'))
+        http_response = http.client.HTTPResponse(sock, method="GET")
+        http_response.begin()
+        response.phases.append((phase, time.monotonic() - started_at))
+
+        response.status_code = http_response.status
+        response.headers = {name.lower(): value for name, value in http_response.getheaders()}
+        response.body = http_response.read(MAX_PROBE_BODY_SIZE)
+    except (OSError, http.client.HTTPException) as e:
+        response.error = f"{phase} failed: {e}"
+    finally:
+        if sock is not None:
+            sock.close()
+
+    return response
+
+
+def _get_phases_check(name, response):
+    """Report the connection phases of a probe, warning about the ones above their threshold."""
+    slow_phases = [phase for phase, duration in response.phases if duration > PHASE_THRESHOLDS[phase]]
+    detail = "  ".join(f"{phase} {_format_duration(duration)}" + ("!" if phase in slow_phases else "")
+                       for phase, duration in response.phases)
+
+    if response.error:
+        return Check(name, STATUS_FAIL, f"{detail}  {response.error}".strip())
+    if slow_phases:
+        thresholds = ", ".join(f"{phase} > {_format_duration(PHASE_THRESHOLDS[phase])}" for phase in slow_phases)
+        return Check(name, STATUS_WARN, f"{detail}  (slow: {thresholds})")
+    return Check(name, STATUS_OK, detail)
+
+
+def _get_response_error(response):
+    """:return: A description of a failed probe, or None if it succeeded."""
+    if response.error:
+        return response.error
+    if response.status_code in (401, 403):
+        return f"HTTP {response.status_code}: the token is invalid, expired or lacks permissions"
+    if response.status_code != 200:
+        return f"HTTP {response.status_code}"
+    # e.g. a login or proxy page served with a 200 instead of the API
+    try:
+        body = response.json()
+    except ValueError:
+        content_type = response.headers.get("content-type", "no content type")
+        return f"HTTP 200 but not a JSON response ({content_type}), check the URL"
+    if not isinstance(body, dict):
+        return "HTTP 200 but an unexpected JSON response, check the URL"
+    return None
+
+
+def _get_scopes_check(name, granted_scopes, required_scopes):
+    missing_scopes = required_scopes - granted_scopes
+    if missing_scopes:
+        return Check(name, STATUS_FAIL, f"missing scopes: {', '.join(sorted(missing_scopes))} "
+                                        f"(granted: {', '.join(sorted(granted_scopes)) or 'none'})")
+    return Check(name, STATUS_OK, f"scopes: {', '.join(sorted(granted_scopes))}")
+
+
+def check_jira(url, token):
+    headers = {"Authorization": f"Bearer {token}"}
+    response = probe_http(f"{url.rstrip('/')}/rest/api/2/myself", headers)
+    checks = [_get_phases_check("Jira network", response)]
+    if response.error:
+        return checks
+
+    error = _get_response_error(response)
+    if error:
+        checks.append(Check("Jira token", STATUS_FAIL, error))
+    else:
+        user = response.json()
+        checks.append(Check("Jira token", STATUS_OK, f"authenticated as {user.get('name') or user.get('displayName')}"))
+
+    return checks
+
+
+def check_github(name, api_url, token, repo):
+    headers = {"Authorization": f"token {token}"}
+    response = probe_http(f"{api_url}/user", headers)
+    checks = [_get_phases_check(f"{name} network", response)]
+    if response.error:
+        return checks
+
+    error = _get_response_error(response)
+    if error:
+        checks.append(Check(f"{name} token", STATUS_FAIL, error))
+        return checks
+
+    scopes_header = response.headers.get("x-oauth-scopes")
+    if scopes_header is None:
+        # Fine-grained tokens have per-repository permissions instead of scopes
+        checks.append(Check(f"{name} token", STATUS_OK,
+                            f"authenticated as {response.json().get('login')} (fine-grained token)"))
+    else:
+        granted_scopes = {scope.strip() for scope in scopes_header.split(",") if scope.strip()}
+        checks.append(_get_scopes_check(f"{name} token", granted_scopes, REQUIRED_GITHUB_SCOPES))
+
+    if repo:
+        repo_response = probe_http(f"{api_url}/repos/{repo}", headers)
+        error = _get_response_error(repo_response)
+        if repo_response.status_code == 404:
+            error = f"repository '{repo}' not found, or not visible with this token"
+        if error:
+            checks.append(Check(f"{name} project", STATUS_FAIL, error))
+        else:
+            permissions = repo_response.json().get("permissions", {})
+            status = STATUS_OK if permissions.get("push", True) else STATUS_WARN
+            access = "" if status == STATUS_OK else " (read-only access)"
+            checks.append(Check(f"{name} project", status, f"{repo_response.json().get('full_name')}{access}"))
+
+    return checks
+
+
+def check_gitlab(url, token, project):
+    api_url = f"{url.rstrip('/')}/api/v4"
+    headers = {"PRIVATE-TOKEN": token}
+    response = probe_http(f"{api_url}/personal_access_tokens/self", headers)
+    checks = [_get_phases_check("GitLab network", response)]
+    if response.error:
+        return checks
+
+    if response.status_code == 404:
+        # GitLab versions before 15.5 can't introspect the token, only check that it authenticates
+        user_response = probe_http(f"{api_url}/user", headers)
+        error = _get_response_error(user_response)
+        checks.append(Check("GitLab token", STATUS_FAIL, error) if error else
+                      Check("GitLab token", STATUS_WARN,
+                            f"authenticated as {user_response.json().get('username')}, scopes not available"))
+    else:
+        error = _get_response_error(response)
+        checks.append(Check("GitLab token", STATUS_FAIL, error) if error else
+                      _get_scopes_check("GitLab token", set(response.json().get("scopes", [])),
+                                        REQUIRED_GITLAB_SCOPES))
+
+    if project:
+        project_response = probe_http(f"{api_url}/projects/{quote(project, safe='')}", headers)
+        error = _get_response_error(project_response)
+        if project_response.status_code == 404:
+            error = f"project '{project}' not found, or not visible with this token"
+        checks.append(Check("GitLab project", STATUS_FAIL, error) if error else
+                      Check("GitLab project", STATUS_OK, project_response.json().get("path_with_namespace")))
+
+    return checks
+
+
+def check_current_ticket_script(script):
+    """Run the current ticket script on the current branch, bypassing the cache, and time it."""
+    started_at = time.monotonic()
+    try:
+        ticket = Utils().get_branch_ticket(Utils.get_current_git_branch(), use_cache=False)
+    except Exception as e:
+        return [Check("current-ticket", STATUS_FAIL, f"{script}: {e}")]
+    duration = time.monotonic() - started_at
+
+    if not ticket:
+        return [Check("current-ticket", STATUS_WARN, f"no ticket for the current branch in {_format_duration(duration)}")]
+    if duration > SCRIPT_THRESHOLD:
+        return [Check("current-ticket", STATUS_WARN, f"{ticket} in {_format_duration(duration)}! "
+                                                     f"(slow: > {_format_duration(SCRIPT_THRESHOLD)})")]
+    return [Check("current-ticket", STATUS_OK, f"{ticket} in {_format_duration(duration)}")]
+
+
+def check_config(config):
+    """Validate the configuration file against the known values, and the environment variables."""
+    if config.load_error:
+        return [Check("config", STATUS_FAIL, config.load_error)]
+
+    problems = []
+    for prop_name, (types, required, choices) in CONFIG_SCHEMA.items():
+        value = config.config_data.get(prop_name)
+        if value is None or value == "":
+            if required:
+                problems.append((STATUS_FAIL, f"'{prop_name}' is missing"))
+        elif not isinstance(value, types) or (isinstance(value, bool) and bool not in types):
+            problems.append((STATUS_FAIL, f"'{prop_name}' should be a {' or '.join(t.__name__ for t in types)}"))
+        elif choices and value.lower() not in choices:
+            problems.append((STATUS_FAIL, f"'{prop_name}' should be one of {', '.join(choices)}"))
+
+    for prop_name in config.config_data:
+        if prop_name not in CONFIG_SCHEMA:
+            problems.append((STATUS_WARN, f"unknown value '{prop_name}'"))
+
+    pmt_type = (config.pmt_type or "").lower()
+    vcs_type = (config.vcs_type or "").lower()
+    required_env_vars = [Config.PMT_TOKEN_ENV_VAR, Config.GIT_TOKEN_ENV_VAR]
+    if pmt_type == "jira":
+        required_env_vars.append(Config.PMT_URL_ENV_VAR)
+    if vcs_type == "gitlab":
+        required_env_vars.append(Config.GIT_URL_ENV_VAR)
+    for env_var in required_env_vars:
+        if not config.environ.get(env_var):
+            problems.append((STATUS_FAIL, f"{env_var} is not set"))
+
+    if not problems:
+        return [Check("config", STATUS_OK, config.config_path or "valid")]
+    return [Check("config", status, problem) for status, problem in problems]
+
+
+def run_doctor():
+    """
+    Validate the configuration and probe every configured backend and the current ticket script concurrently,
+    then print a compact report.
+
+    :return: True if no check failed.
+    """
+    config = Config()
+    probes = []
+    pmt_type = (config.pmt_type or "").lower()
+    vcs_type = (config.vcs_type or "").lower()
+
+    if pmt_type == "jira" and config.pmt_url and config.pmt_token:
+        probes.append((check_jira, config.pmt_url, config.pmt_token))
+    elif pmt_type == "github" and config.pmt_token:
+        probes.append((check_github, "GitHub Issues", get_github_api_url(config.git_url), config.pmt_token,
+                       config.git_proj))
+    if vcs_type == "gitlab" and config.git_url and config.git_token:
+        probes.append((check_gitlab, config.git_url, config.git_token, config.git_proj))
+    elif vcs_type == "github" and config.git_token:
+        probes.append((check_github, "GitHub", get_github_api_url(config.git_url), config.git_token, config.git_proj))
+    if config.current_ticket_script:
+        probes.append((check_current_ticket_script, config.current_ticket_script))
+
+    checks = check_config(config)
+    with ContextThreadPoolExecutor(max_workers=max(len(probes), 1)) as executor:
+        futures = [executor.submit(*probe) for probe in probes]
+        for future in futures:
+            checks.extend(future.result())
+
+    for check in checks:
+        click.echo(click.style(f"{check.status:<5}", fg=STATUS_COLORS[check.status]) + f" {check.name:<22}{check.detail}")
+
+    return all(check.status != STATUS_FAIL for check in checks)
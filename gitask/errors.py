@@ -0,0 +1,30 @@
+class GitaskError(Exception):
+    """Base class of the errors raised by gitask."""
+
+
+class BackendError(GitaskError):
+    """Raised when a project management tool or version control system rejects a request."""
+
+    def __init__(self, backend, message, status_code=None):
+        self.backend = backend
+        self.status_code = status_code
+        super().__init__(message)
+
+
+class BackendTimeoutError(BackendError):
+    """Raised when a remote call doesn't complete within the command time budget."""
+
+    def __init__(self, backend, operation, budget):
+        self.operation = operation
+        self.budget = budget
+        super().__init__(backend, f"{backend} '{operation}' did not complete within the {budget}s time budget "
+                                  f"(set with --timeout or the 'timeout' config value)")
+
+
+class InvalidTransitionError(GitaskError, ValueError):
+    """Raised when none of the configured transitions can be applied to a ticket in its current status."""
+
+    def __init__(self, issue_key, current_status):
+        self.issue_key = issue_key
+        self.current_status = current_status
+        super().__init__(f"Invalid status transition from current status '{current_status}' for issue '{issue_key}'")
@@ -0,0 +1,170 @@
+import hashlib
+import json
+import os
+import subprocess
+import tempfile
+import time
+
+import click
+
+from gitask.config.config import Config
+from gitask.metrics import MetricsStore, OUTCOME_ERROR
+from gitask.plan import KIND_HOOK, Plan
+from gitask.utils import Utils
+
+HOOK_LEDGER_FILE_NAME = "hooks-ledger.json"
+HASH_CHUNK_SIZE = 1024 * 1024
+HOOK_METRICS_BACKEND = "hook"
+
+
+def _hash_file(path):
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+class HookLedger:
+    """
+    Local ledger of the inputs hash of the last successful run of each hook, like a build system's
+    up-to-date check. File content hashes are memoized by path, size and modification time,
+    so unchanged files aren't re-read.
+    """
+
+    def __init__(self):
+        self.path = os.path.join(Config().cache_dir, HOOK_LEDGER_FILE_NAME)
+        try:
+            with open(self.path, "r") as ledger_file:
+                data = json.load(ledger_file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            data = {}
+
+        self.runs = data.get("runs", {})
+        self.file_hashes = data.get("file_hashes", {})
+
+    def save(self):
+        """Atomically replace the ledger file, dropping the memoized hashes of deleted files."""
+        self.file_hashes = {path: entry for path, entry in self.file_hashes.items() if os.path.exists(path)}
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path), prefix=".hooks-ledger-")
+        with os.fdopen(fd, "w") as tmp_file:
+            json.dump({"runs": self.runs, "file_hashes": self.file_hashes}, tmp_file)
+        os.replace(tmp_path, self.path)
+
+    def hash_file(self, path):
+        """Get the content hash of a file, memoized by its size and modification time."""
+        path = os.path.abspath(path)
+        stat = os.stat(path)
+        entry = self.file_hashes.get(path)
+        if entry is not None and entry[0] == stat.st_mtime_ns and entry[1] == stat.st_size:
+            return entry[2]
+
+        file_hash = _hash_file(path)
+        self.file_hashes[path] = [stat.st_mtime_ns, stat.st_size, file_hash]
+        return file_hash
+
+
+def _get_matching_files(globs):
+    """List the tracked and untracked (but not ignored) files matching the globs, with a single git invocation."""
+    repo_root = subprocess.check_output(["git", "rev-parse", "--show-toplevel"]).strip().decode('utf-8')
+    output = subprocess.check_output(["git", "ls-files", "-z", "--cached", "--others", "--exclude-standard", "--",
+                                      *[f":(top,glob){pattern}" for pattern in globs]])
+    paths = sorted(set(path for path in output.decode('utf-8').split("\0") if path))
+    return [os.path.join(repo_root, path) for path in paths]
+
+
+def get_hook_inputs_hash(ledger, script_path, inputs, command_params, issue_key):
+    """
+    Hash the declared inputs of a hook. The script content and the ticket are always inputs.
+
+    :param ledger: The hook ledger, memoizing the file hashes.
+    :param script_path: The path of the hook script.
+    :param inputs: The declared inputs: {"head": bool, "params": bool, "files": [glob, ...]}.
+    :param command_params: The parameters of the command running the hook.
+    :param issue_key: The ticket the command acts on.
+    :return: The hex digest of the inputs.
+    """
+    sha = hashlib.sha256()
+    sha.update(f"script:{ledger.hash_file(script_path)}\0ticket:{issue_key}\0".encode('utf-8'))
+
+    if inputs.get("head"):
+        head = subprocess.check_output(["git", "rev-parse", "HEAD"]).strip().decode('utf-8')
+        sha.update(f"head:{head}\0".encode('utf-8'))
+
+    if inputs.get("params"):
+        sha.update(f"params:{json.dumps(command_params, sort_keys=True, default=str)}\0".encode('utf-8'))
+
+    globs = inputs.get("files") or []
+    if globs:
+        for path in _get_matching_files(globs):
+            if os.path.isfile(path):
+                sha.update(f"file:{path}:{ledger.hash_file(path)}\0".encode('utf-8'))
+
+    return sha.hexdigest()
+
+
+def _run_timed_hook(action_name, stage, script_path, command_params, issue_key):
+    """Run a hook script, recording its duration in the metrics store next to the remote operations."""
+    started_at = time.monotonic()
+    try:
+        Utils().run_hook_script(script_path, command_params, issue_key)
+    except Exception:
+        MetricsStore().record(HOOK_METRICS_BACKEND, f"{action_name} {stage}", time.monotonic() - started_at,
+                              OUTCOME_ERROR)
+        raise
+    MetricsStore().record(HOOK_METRICS_BACKEND, f"{action_name} {stage}", time.monotonic() - started_at)
+
+
+def run_hook(action_name, stage, hook, command_params, issue_key=None):
+    """
+    Run a pre or post hook of an action.
+
+    A hook is either a script path, or a {"script", "inputs"} dict declaring the inputs the hook depends on.
+    A hook with declared inputs is skipped when its last successful run had identical inputs,
+    unless hooks are forced with --force-hooks.
+
+    :param action_name: The name of the action (e.g. submit-to-review).
+    :param stage: 'pre' or 'post'.
+    :param hook: The hook configuration.
+    :param command_params: The parameters of the command running the hook.
+    :param issue_key: The ticket the command acts on, defaults to the current ticket.
+    """
+    if Config().plan:
+        Plan().add(HOOK_METRICS_BACKEND, f"{action_name} {stage}", KIND_HOOK)
+        return
+
+    if isinstance(hook, str):
+        _run_timed_hook(action_name, stage, hook, command_params, issue_key)
+        return
+
+    script_path = hook.get("script")
+    inputs = hook.get("inputs")
+    if not inputs or not script_path or not os.path.exists(script_path):
+        _run_timed_hook(action_name, stage, script_path, command_params, issue_key)
+        return
+
+    utils = Utils()
+
+    if issue_key is None:
+        issue_key = utils.get_current_ticket()
+
+    ledger = HookLedger()
+    run_key = f"{action_name}:{stage}:{os.path.abspath(script_path)}:{os.getcwd()}"
+    inputs_hash = get_hook_inputs_hash(ledger, script_path, inputs, command_params, issue_key)
+
+    last_run = ledger.runs.get(run_key)
+    if not Config().force_hooks and last_run is not None and last_run["inputs"] == inputs_hash:
+        ledger.save()
+        click.echo(f"⏭  Skipping the {action_name} {stage} hook, its inputs are unchanged since its last successful run.")
+        return
+
+    _run_timed_hook(action_name, stage, script_path, command_params, issue_key)
+
+    # Re-read the ledger, another command may have recorded runs meanwhile
+    file_hashes = ledger.file_hashes
+    ledger = HookLedger()
+    ledger.file_hashes.update(file_hashes)
+    ledger.runs[run_key] = {"inputs": inputs_hash, "ran_at": time.time()}
+    ledger.save()
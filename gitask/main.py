@@ -1,9 +1,14 @@
 import functools
 import subprocess
+import sys
 
 import click
 
 from gitask.commands import Commands
+from gitask.config.config import Config
+from gitask.errors import BackendError
+from gitask.plan import print_plan
+from gitask.utils import split_and_strip
 
 
 def handle_exceptions(func):
@@ -12,6 +17,9 @@ def handle_exceptions(func):
     def wrapper(*args, **kwargs):
         try:
             return func(*args, **kwargs)
+        except BackendError as e:
+            click.echo(str(e), err=True)
+            sys.exit(1)
         except subprocess.CalledProcessError as e:
             click.echo(f"Subprocess Error: {str(e)}", err=True)
         except Exception as e:
@@ -19,12 +27,38 @@ def handle_exceptions(func):
     return wrapper
 
 
+def reject_plan(command_name):
+    """Commands that wait for remote events or only act locally can't be planned."""
+    if Config().plan:
+        raise click.UsageError(f"'{command_name}' doesn't support --plan.")
+
+
 @click.command(name='configure')
 @click.option('--auto-complete', is_flag=True, required=False,  help='Setup gitask autocompletion.')
+@click.option('--git-hooks', is_flag=True, required=False, help='Install git hooks that prefetch ticket metadata in the background.')
 @handle_exceptions
-def configure(auto_complete):
+def configure(auto_complete, git_hooks):
     """Configure Gitask with the necessary settings."""
-    Commands.configure(auto_complete)
+    reject_plan('configure')
+    Commands.configure(auto_complete, git_hooks)
+
+
+@click.command(name='doctor', short_help='Diagnose the configuration and the connectivity to the backends.')
+@handle_exceptions
+def doctor():
+    """
+    Validate the configuration, probe every configured backend concurrently (DNS, TCP connect, TLS handshake
+    and first byte timings, token scopes, project resolution) and time the current ticket script.
+    """
+    if not Commands.doctor():
+        sys.exit(1)
+
+
+@click.command(name='prefetch', hidden=True)
+@handle_exceptions
+def prefetch():
+    """Warm the local metadata cache for the current branch's ticket."""
+    Commands.prefetch()
 
 
 @click.command(name='open')
@@ -35,41 +69,140 @@ def reopen():
 
 
 @click.command(name='start-working', short_help='Move the current ticket to In Progress status.')
+@click.option('--pick', is_flag=True, required=False, help='Pick a to-do ticket and create its branch.')
 @handle_exceptions
-def start_working():
+def start_working(pick):
     """Move the current ticket to In Progress status."""
-    Commands().move_to_in_progress()
+    if pick:
+        Commands().pick_and_start_working()
+    else:
+        Commands().move_to_in_progress()
 
 
 @click.command(name='submit-to-review', short_help='Submit the current ticket to In Review and create a pull request.')
 @click.option('-t', '--title', default='',  help='Title of the pull request.')
-@click.option('-r', '--reviewer', required=True, help='Username of the reviewer.')
+@click.option('-r', '--reviewer', required=False,
+              help="Username of the reviewer, or 'auto' to request reviews from the code owners of the changes.")
+@click.option('--reviewer-pool', required=False,
+              help='Reviewer group (GitLab group or GitHub org/team) to pick the member with the fewest open reviews from.')
 @click.option('-b', '--branch', required=False, default='master', help='Target branch for pull request.')
 @click.option('--pr-only', '--pull-request-only', is_flag=True, required=False, help='Create only the pull request.')
+@click.option('--stack', is_flag=True, required=False,
+              help='Submit every branch of the current stack, each against its parent branch.')
+@click.option('--repos', 'repo_patterns', multiple=True, required=False,
+              help='Create a pull request in each of these repositories (comma-separated paths or glob patterns, '
+                   'repeatable), from their current branch, and submit their ticket once.')
 @handle_exceptions
-def submit_to_review(title, reviewer, branch, pr_only):
+def submit_to_review(title, reviewer, reviewer_pool, branch, pr_only, stack, repo_patterns):
     """Submit the current ticket to In Review and create a pull request."""
-    Commands().move_to_in_review(title, reviewer, branch, pr_only)
+    repo_patterns = [pattern for value in repo_patterns for pattern in split_and_strip(value) if pattern]
+    Commands().move_to_in_review(title, reviewer, branch, pr_only, stack, reviewer_pool, repo_patterns)
 
 
 @click.command(name='done')
+@click.option('--when-merged', is_flag=True, required=False,
+              help="Wait for the current branch's pull request to be merged first.")
+@click.option('--cascade', is_flag=False, flag_value='subtasks', default=None, required=False,
+              help="Close the related issues first, children before parents: 'subtasks' (the default) "
+                   "and/or 'links:<link type>', comma-separated.")
 @handle_exceptions
-def done():
+def done(when_merged, cascade):
     """Move the current ticket to Done status."""
-    Commands().move_to_done()
+    if when_merged and cascade:
+        raise click.UsageError("--when-merged and --cascade can't be used together.")
+    if when_merged:
+        reject_plan('done --when-merged')
+        Commands().move_to_done_when_merged()
+    else:
+        Commands().move_to_done(cascade=cascade)
+
+
+@click.command(name='watch', short_help='Move tickets to Done status when their pull requests are merged.')
+@click.option('--once', is_flag=True, required=False, help='Poll only once, e.g. from a cron job.')
+@handle_exceptions
+def watch(once):
+    """Watch your open pull requests and move their tickets to Done status when they are merged."""
+    reject_plan('watch')
+    Commands().watch(once)
+
+
+@click.command(name='sync-status', short_help='Reconcile ticket statuses with their pull requests.')
+@click.option('--dry-run', is_flag=True, required=False, help='Only show the planned transitions.')
+@click.option('-y', '--yes', 'assume_yes', is_flag=True, required=False, help='Apply the transitions without confirmation.')
+@click.option('--days', default=30, show_default=True, type=click.IntRange(min=1),
+              help='Only consider pull requests updated in this number of days.')
+@handle_exceptions
+def sync_status(dry_run, assume_yes, days):
+    """Move tickets to the status matching their branches and pull requests."""
+    Commands().sync_status(dry_run, assume_yes, days)
+
+
+@click.command(name='report', short_help='Report ticket status dwell times and review turnaround.')
+@click.option('--since', required=True, type=click.DateTime(), help='Report tickets updated since this date.')
+@click.option('-q', '--query', required=False, help='Search query selecting the reported tickets (JQL for Jira).')
+@handle_exceptions
+def report(since, query):
+    """Report ticket status dwell-time percentiles and review turnaround per reviewer."""
+    Commands.report(since, query)
+
+
+@click.command(name='stats', short_help='Show latency percentiles of remote operations and hooks.')
+@click.option('--days', default=7, show_default=True, type=click.IntRange(min=1), help='Number of days to report.')
+@click.option('--export', 'export_path', required=False, type=click.Path(dir_okay=False),
+              help='Also write the statistics to an OpenMetrics text file (e.g. for node_exporter).')
+@handle_exceptions
+def stats(days, export_path):
+    """Show p50/p95/p99 latencies per backend operation and hook, recorded by past gitask commands."""
+    Commands.stats(days, export_path)
+
+
+@click.command(name='serve-webhooks', short_help='Transition tickets from GitLab/GitHub pull request webhooks.')
+@click.option('--host', default='127.0.0.1', show_default=True, help='Address to listen on.')
+@click.option('--port', default=8765, show_default=True, type=int, help='Port to listen on.')
+@click.option('--workers', default=8, show_default=True, type=click.IntRange(min=1),
+              help='Maximum number of tickets transitioned concurrently.')
+@click.option('--replay', 'replay_paths', multiple=True, type=click.Path(exists=True, dir_okay=False),
+              help='Process recorded deliveries instead of serving (repeatable).')
+@click.option('--dry-run', is_flag=True, required=False, help='Only log the transitions.')
+@handle_exceptions
+def serve_webhooks(host, port, workers, replay_paths, dry_run):
+    """Serve pull request webhooks: opened pull requests move their tickets to In Review, merged ones to Done."""
+    reject_plan('serve-webhooks')
+    Commands.serve_webhooks(host, port, workers, replay_paths, dry_run)
 
 
 @click.group(context_settings={"max_content_width": 120})
-def cli():
+@click.option('--timeout', type=float, required=False,
+              help='Time budget in seconds for all remote calls of the command (0 to disable).')
+@click.option('--force-hooks', is_flag=True, required=False,
+              help='Run the hooks even if their declared inputs are unchanged since their last successful run.')
+@click.option('--plan', is_flag=True, required=False,
+              help='Resolve the command and print the remote operations it would perform, with estimated latencies, '
+                   'without performing writes or hooks.')
+def cli(timeout, force_hooks, plan):
     # enable the use of subcommands
-    pass
+    if timeout is not None:
+        Config().override(Config.TIMEOUT_PROP_NAME, timeout)
+    if force_hooks:
+        Config().override(Config.FORCE_HOOKS_PROP_NAME, True)
+    if plan:
+        Config().override(Config.PLAN_PROP_NAME, True)
+        click.echo("📝 Plan mode: remote writes and hooks are not performed.")
+        click.get_current_context().call_on_close(print_plan)
 
 
 cli.add_command(configure)
+cli.add_command(doctor)
+cli.add_command(prefetch)
 cli.add_command(reopen)
 cli.add_command(start_working)
 cli.add_command(submit_to_review)
 cli.add_command(done)
+cli.add_command(watch)
+cli.add_command(sync_status)
+cli.add_command(report)
+cli.add_command(stats)
+cli.add_command(serve_webhooks)
 
 if __name__ == '__main__':
     cli()
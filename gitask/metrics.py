@@ -0,0 +1,199 @@
+import atexit
+import fcntl
+import os
+import struct
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+from gitask.config.config import Config
+from gitask.scope import get_singleton
+from gitask.utils import percentile
+
+METRICS_FILE_NAME = "metrics.bin"
+METRICS_CAPACITY = 20000
+# Long-running processes (e.g. a Session or gitask watch) flush their records periodically, not only at exit
+FLUSH_THRESHOLD = 100
+HEADER = struct.Struct("<Q")
+NAME_SIZE = 48
+# timestamp, latency in seconds, response bytes, status code, outcome, "backend\0operation"
+RECORD = struct.Struct(f"<dfIHB{NAME_SIZE}s")
+
+OUTCOME_OK = 0
+OUTCOME_ERROR = 1
+OUTCOME_TIMEOUT = 2
+OUTCOME_NAMES = {OUTCOME_OK: "ok", OUTCOME_ERROR: "error", OUTCOME_TIMEOUT: "timeout"}
+
+
+class MetricRecord:
+    """The timing of a single remote operation or hook run."""
+
+    def __init__(self, timestamp, latency, size, status_code, outcome, backend, operation):
+        self.timestamp = timestamp
+        self.latency = latency
+        self.size = size
+        self.status_code = status_code
+        self.outcome = outcome
+        self.backend = backend
+        self.operation = operation
+
+    def pack(self):
+        # A name cut in the middle of a UTF-8 character is decoded with a replacement character
+        name = f"{self.backend}\0{self.operation}".encode('utf-8')[:NAME_SIZE]
+        return RECORD.pack(self.timestamp, self.latency, min(self.size, 0xFFFFFFFF), self.status_code,
+                           self.outcome, name)
+
+    @staticmethod
+    def unpack(data):
+        timestamp, latency, size, status_code, outcome, name = RECORD.unpack(data)
+        backend, _, operation = name.rstrip(b"\0").decode('utf-8', errors='replace').partition("\0")
+        return MetricRecord(timestamp, latency, size, status_code, outcome, backend, operation)
+
+
+class MetricsStore:
+    """
+    Bounded ring buffer of operation timings, shared by all gitask invocations.
+
+    Each invocation buffers its records in memory and appends them in a single locked write when it exits
+    or every FLUSH_THRESHOLD records, overwriting the oldest records once the file holds METRICS_CAPACITY records.
+    """
+
+    def __new__(cls):
+        return get_singleton(cls, MetricsStore.__init_store)
+
+    def __init_store(self):
+        self.path = os.path.join(Config().cache_dir, METRICS_FILE_NAME)
+        self.pending = []
+        self.lock = threading.Lock()
+        atexit.register(self.flush)
+
+    def record(self, backend, operation, latency, outcome=OUTCOME_OK, status_code=0, size=0):
+        """
+        Record the timing of an operation.
+
+        :param backend: The backend name (e.g. Jira), or 'hook' for hook scripts.
+        :param operation: The operation name (e.g. transitions).
+        :param latency: The operation duration in seconds.
+        :param outcome: OUTCOME_OK, OUTCOME_ERROR or OUTCOME_TIMEOUT.
+        :param status_code: The HTTP status code of a failed call, 0 if unknown.
+        :param size: The response size in bytes, 0 if unknown.
+        """
+        with self.lock:
+            self.pending.append(MetricRecord(time.time(), latency, size or 0, status_code or 0, outcome,
+                                             backend, operation))
+            should_flush = len(self.pending) >= FLUSH_THRESHOLD
+
+        if should_flush:
+            self.flush()
+
+    def flush(self):
+        """Append the pending records to the ring buffer file."""
+        with self.lock:
+            pending, self.pending = self.pending, []
+        if not pending:
+            return
+
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            with os.fdopen(fd, "r+b") as metrics_file:
+                fcntl.flock(metrics_file, fcntl.LOCK_EX)
+                header = metrics_file.read(HEADER.size)
+                next_index = HEADER.unpack(header)[0] if len(header) == HEADER.size else 0
+
+                for record in pending:
+                    metrics_file.seek(HEADER.size + (next_index % METRICS_CAPACITY) * RECORD.size)
+                    metrics_file.write(record.pack())
+                    next_index += 1
+
+                metrics_file.seek(0)
+                metrics_file.write(HEADER.pack(next_index))
+        except OSError:
+            # Metrics must never fail a command
+            pass
+
+        export_path = Config().metrics_textfile
+        if export_path:
+            try:
+                export_openmetrics(self, export_path)
+            except OSError:
+                pass
+
+    def read(self, since=0):
+        """
+        Read the stored records.
+
+        :param since: Only records from this timestamp on are returned.
+        :return: A list of MetricRecord, oldest first.
+        """
+        try:
+            with open(self.path, "rb") as metrics_file:
+                fcntl.flock(metrics_file, fcntl.LOCK_SH)
+                header = metrics_file.read(HEADER.size)
+                data = metrics_file.read(METRICS_CAPACITY * RECORD.size)
+        except FileNotFoundError:
+            return []
+        if len(header) < HEADER.size:
+            return []
+
+        next_index = HEADER.unpack(header)[0]
+        count = min(next_index, METRICS_CAPACITY, len(data) // RECORD.size)
+        records = [MetricRecord.unpack(data[i * RECORD.size:(i + 1) * RECORD.size]) for i in range(count)]
+        records = [record for record in records if record.timestamp >= since]
+        records.sort(key=lambda record: record.timestamp)
+        return records
+
+
+def get_latency_stats(records):
+    """
+    Aggregate the records per operation.
+
+    :return: A dict of (backend, operation) to {"latencies": sorted latencies, "errors": count, "bytes": total}.
+    """
+    stats = defaultdict(lambda: {"latencies": [], "errors": 0, "bytes": 0})
+    for record in records:
+        operation_stats = stats[(record.backend, record.operation)]
+        operation_stats["latencies"].append(record.latency)
+        operation_stats["bytes"] += record.size
+        if record.outcome != OUTCOME_OK:
+            operation_stats["errors"] += 1
+
+    for operation_stats in stats.values():
+        operation_stats["latencies"].sort()
+    return dict(stats)
+
+
+def _escape_label(value):
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def export_openmetrics(store, path, since=0):
+    """
+    Write the operation timings as an OpenMetrics text file, e.g. for the node_exporter textfile collector.
+    The file is replaced atomically, so the collector never reads a partial file.
+    """
+    duration_lines = ["# HELP gitask_operation_duration_seconds Duration of gitask remote operations and hooks.",
+                      "# TYPE gitask_operation_duration_seconds summary"]
+    error_lines = ["# HELP gitask_operation_errors Failed gitask remote operations and hooks.",
+                   "# TYPE gitask_operation_errors counter"]
+    for (backend, operation), operation_stats in sorted(get_latency_stats(store.read(since)).items()):
+        labels = f'backend="{_escape_label(backend)}",operation="{_escape_label(operation)}"'
+        latencies = operation_stats["latencies"]
+        for quantile in (50, 95, 99):
+            duration_lines.append(f'gitask_operation_duration_seconds{{{labels},quantile="{quantile / 100}"}} '
+                                  f'{percentile(latencies, quantile):.6f}')
+        duration_lines.append(f"gitask_operation_duration_seconds_sum{{{labels}}} {sum(latencies):.6f}")
+        duration_lines.append(f"gitask_operation_duration_seconds_count{{{labels}}} {len(latencies)}")
+        error_lines.append(f"gitask_operation_errors_total{{{labels}}} {operation_stats['errors']}")
+
+    # Metric families must not be interleaved
+    lines = duration_lines + error_lines
+    lines.append("# EOF")
+
+    export_dir = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=export_dir, prefix=".gitask-metrics-")
+    with os.fdopen(fd, "w") as tmp_file:
+        tmp_file.write("\n".join(lines) + "\n")
+    os.chmod(tmp_path, 0o644)
+    os.replace(tmp_path, path)
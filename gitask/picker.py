@@ -0,0 +1,153 @@
+import os
+import select
+import shutil
+import sys
+import termios
+import threading
+import tty
+
+import click
+
+KEY_UP = "\x1b[A"
+KEY_DOWN = "\x1b[B"
+KEY_ESCAPE = "\x1b"
+KEY_ENTER = ("\r", "\n")
+KEY_BACKSPACE = ("\x7f", "\x08")
+KEY_INTERRUPT = "\x03"
+REFRESH_INTERVAL_SECONDS = 0.2
+
+
+class TicketPicker:
+    """
+    Interactive ticket picker with incremental search.
+
+    Tickets are streamed from a paginated query in a background thread: the first page is shown as soon as
+    it arrives, further pages are appended while the user types, and filtering is done locally.
+    """
+
+    def __init__(self, ticket_pages):
+        """
+        :param ticket_pages: An iterator of ticket pages, each a list of {"key", "summary", "status"} dicts.
+        """
+        self.ticket_pages = ticket_pages
+        self.tickets = []
+        self.loading = True
+        self.error = None
+        self.lock = threading.Lock()
+
+        self.query = ""
+        self.matches = []
+        self.scanned = 0
+        self.selected = 0
+        self.rendered_loading = True
+
+    def __load(self):
+        try:
+            for page in self.ticket_pages:
+                with self.lock:
+                    self.tickets.extend(page)
+        except Exception as e:
+            self.error = e
+        finally:
+            self.loading = False
+
+    @staticmethod
+    def __matches(ticket, query):
+        return query in f"{ticket['key']} {ticket['summary']}".lower()
+
+    def __set_query(self, query):
+        """Update the matches incrementally: a narrowed query only re-filters the current matches."""
+        if query.startswith(self.query):
+            self.matches = [ticket for ticket in self.matches if self.__matches(ticket, query)]
+        else:
+            self.matches = [ticket for ticket in self.tickets[:self.scanned] if self.__matches(ticket, query)]
+
+        self.query = query
+        self.selected = 0
+
+    def __scan_new_tickets(self):
+        """Filter the tickets loaded since the last scan. :return: True if new tickets were loaded."""
+        with self.lock:
+            new_tickets = self.tickets[self.scanned:]
+            self.scanned = len(self.tickets)
+
+        self.matches.extend(ticket for ticket in new_tickets if self.__matches(ticket, self.query))
+        return bool(new_tickets)
+
+    def __render(self):
+        width, height = shutil.get_terminal_size()
+        visible_count = max(height - 3, 1)
+        first_visible = max(self.selected - visible_count + 1, 0)
+
+        if self.error is not None:
+            status = f"loading failed: {self.error}"
+        else:
+            status = "loading..." if self.loading else f"{self.scanned} tickets"
+        lines = [f"Search: {self.query}",
+                 f"  {len(self.matches)} matches ({status}), ↑/↓ to move, Enter to pick, Esc to cancel"]
+        for index, ticket in enumerate(self.matches[first_visible:first_visible + visible_count], first_visible):
+            pointer = "❯" if index == self.selected else " "
+            line = f"{pointer} {ticket['key']}  {ticket['summary']}  [{ticket['status']}]"
+            lines.append(line[:width - 1])
+
+        self.rendered_loading = self.loading
+        click.clear()
+        sys.stdout.write("\r\n".join(lines))
+        sys.stdout.flush()
+
+    @staticmethod
+    def __read_key(fd):
+        """Read a key press, or return None if none was pressed within the refresh interval."""
+        readable, _, _ = select.select([fd], [], [], REFRESH_INTERVAL_SECONDS)
+        if not readable:
+            return None
+
+        return os.read(fd, 32).decode('utf-8', errors='ignore')
+
+    def pick(self):
+        """
+        Run the picker until a ticket is picked.
+
+        :return: The picked ticket dict, or None if the picker was cancelled.
+        """
+        if not sys.stdin.isatty():
+            raise RuntimeError("The ticket picker requires an interactive terminal.")
+
+        threading.Thread(target=self.__load, daemon=True).start()
+
+        fd = sys.stdin.fileno()
+        terminal_settings = termios.tcgetattr(fd)
+        try:
+            tty.setraw(fd)
+            self.__scan_new_tickets()
+            self.__render()
+
+            while True:
+                key = self.__read_key(fd)
+                if key is None:
+                    # Re-render when new pages arrived or loading just finished
+                    if self.__scan_new_tickets() or self.rendered_loading != self.loading:
+                        self.__render()
+                    continue
+
+                if key == KEY_INTERRUPT or key == KEY_ESCAPE:
+                    if self.error is not None:
+                        raise self.error
+                    return None
+                elif key in KEY_ENTER:
+                    if self.matches:
+                        return self.matches[self.selected]
+                elif key == KEY_UP:
+                    self.selected = max(self.selected - 1, 0)
+                elif key == KEY_DOWN:
+                    self.selected = min(self.selected + 1, max(len(self.matches) - 1, 0))
+                elif key in KEY_BACKSPACE:
+                    self.__set_query(self.query[:-1])
+                elif key.isprintable():
+                    self.__set_query(self.query + key.lower())
+
+                self.__scan_new_tickets()
+                self.__render()
+        finally:
+            termios.tcsetattr(fd, termios.TCSADRAIN, terminal_settings)
+            click.clear()
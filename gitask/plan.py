@@ -0,0 +1,93 @@
+import threading
+import time
+
+import click
+
+from gitask.metrics import MetricsStore, get_latency_stats
+from gitask.scope import get_singleton
+from gitask.utils import percentile
+
+PLAN_HISTORY_DAYS = 30
+ESTIMATE_PERCENTILE = 50
+
+KIND_READ = "read"
+KIND_WRITE = "write"
+KIND_HOOK = "hook"
+
+
+class PlannedResult:
+    """Stands for the result of a remote write that isn't performed in plan mode, e.g. a created pull request."""
+
+    def __init__(self, operation):
+        self.operation = operation
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        return PlannedResult(f"{self.operation}.{name}")
+
+    def __call__(self, *args, **kwargs):
+        return self
+
+    def __str__(self):
+        return f"<planned {self.operation}>"
+
+
+class Plan:
+    """
+    The remote operations of the current command, recorded in plan mode (--plan).
+
+    Reads are performed, since the writes depend on them (e.g. the available transitions),
+    while writes and hooks are only recorded.
+    """
+
+    def __new__(cls):
+        return get_singleton(cls, Plan.__init_plan)
+
+    def __init_plan(self):
+        self.operations = []
+        self.lock = threading.Lock()
+
+    def add(self, backend, operation, kind):
+        """
+        Record a remote operation or hook.
+
+        :param backend: The backend name (e.g. Jira, GitLab, hook).
+        :param operation: The operation name, as recorded in the metrics store.
+        :param kind: KIND_READ for performed reads, KIND_WRITE or KIND_HOOK for skipped writes and hooks.
+        """
+        with self.lock:
+            self.operations.append((backend, operation, kind))
+
+
+def _format_latency(seconds):
+    return "-" if seconds is None else f"{seconds * 1000:.0f}ms"
+
+
+def print_plan():
+    """Print the recorded operations, with their median latency from the metrics store, and their totals."""
+    operations = Plan().operations
+    if not operations:
+        click.echo("\nPlan: no remote operations.")
+        return
+
+    stats = get_latency_stats(MetricsStore().read(time.time() - PLAN_HISTORY_DAYS * 86400))
+    estimated_total = 0.0
+    unknown_count = 0
+
+    click.echo(f"\n{'#':>3}  {'Backend':<16}{'Operation':<32}{'Kind':<8}{'p' + str(ESTIMATE_PERCENTILE):>9}")
+    for index, (backend, operation, kind) in enumerate(operations, start=1):
+        latencies = stats.get((backend, operation), {}).get("latencies")
+        estimate = percentile(latencies, ESTIMATE_PERCENTILE) if latencies else None
+        if estimate is None:
+            unknown_count += 1
+        else:
+            estimated_total += estimate
+
+        click.echo(f"{index:>3}  {backend[:15]:<16}{operation[:31]:<32}{kind:<8}{_format_latency(estimate):>9}")
+
+    requests_count = sum(1 for _, _, kind in operations if kind != KIND_HOOK)
+    writes_count = sum(1 for _, _, kind in operations if kind == KIND_WRITE)
+    unknown = f", {unknown_count} without recorded history" if unknown_count else ""
+    click.echo(f"\n{requests_count} requests ({writes_count} writes, not performed), "
+               f"~{estimated_total:.1f}s if run sequentially{unknown}.")
@@ -1,27 +1,120 @@
-from typing import List
+import threading
+from typing import Dict, List
+from urllib.parse import urlsplit
 
-from github import Github
+import requests
+from github import Github, GithubException
 
+from gitask.cache import MetadataCache
+from gitask.errors import BackendError, InvalidTransitionError
 from gitask.pmt.project_management_tool import PMToolInterface
 from gitask.config.config import Config
+from gitask.transport import call_remote, Deadline
+
+GITHUB_ISSUES_BACKEND = "GitHub Issues"
+GITHUB_API_URL = "https://api.github.com"
+GITHUB_ENTERPRISE_API_PATH = "/api/v3"
+GRAPHQL_ISSUES_PER_QUERY = 100
+
+
+def get_github_api_url(url=None):
+    """
+    Get the REST API URL of github.com, or of a GitHub Enterprise Server from its base URL.
+
+    :param url: The base URL (GITASK_GIT_URL), e.g. https://github.example.com, None for github.com.
+    :return: The REST API URL.
+    """
+    if not url or urlsplit(url).hostname in ("github.com", "api.github.com"):
+        return GITHUB_API_URL
+    url = url.rstrip("/")
+    return url if url.endswith(GITHUB_ENTERPRISE_API_PATH) else f"{url}{GITHUB_ENTERPRISE_API_PATH}"
+
+
+def get_github_graphql_url(api_url):
+    """Get the GraphQL API URL matching a REST API URL, GitHub Enterprise Server serves it at /api/graphql."""
+    if api_url.endswith(GITHUB_ENTERPRISE_API_PATH):
+        return f"{api_url[:-len(GITHUB_ENTERPRISE_API_PATH)]}/api/graphql"
+    return f"{api_url}/graphql"
+
+
+def get_http_error_message(error):
+    """Get the message of a failed raw GitHub API request, from its response JSON if any."""
+    try:
+        message = error.response.json().get("message")
+    except (ValueError, AttributeError):
+        message = None
+    return message or str(error)
+
+
+def handle_github_errors(func):
+    """
+    Decorator to turn GitHub errors, from the client library or from raw API requests,
+    into BackendError with meaningful error messages.
+
+    :param func: The function to wrap.
+    :return: The wrapped function.
+    """
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        except GithubException as e:
+            message = e.data.get('message', str(e)) if isinstance(e.data, dict) else str(e)
+            raise BackendError(GITHUB_ISSUES_BACKEND, f"GitHub Error: {message}", e.status) from e
+        except requests.HTTPError as e:
+            raise BackendError(GITHUB_ISSUES_BACKEND, f"GitHub Error: {get_http_error_message(e)}",
+                               e.response.status_code if e.response is not None else None) from e
+
+    return wrapper
 
 
 class GitHubPmt(PMToolInterface):
     def __init__(self):
         self.config = Config()
-        self.github = Github(self.config.pmt_token)
-        self.repo = self.github.get_repo(self.config.git_proj)
+        # Retries are handled by call_remote, within the command time budget
+        self.api_url = get_github_api_url(self.config.git_url)
+        self.github = Github(self.config.pmt_token, base_url=self.api_url, timeout=self.config.timeout or None,
+                             retry=None, per_page=100)
+        # A lazy repository doesn't cost a request, issues are fetched through it by URL
+        self.repo = self.github.get_repo(self.config.git_proj, lazy=True)
+        self.cache = MetadataCache()
+        # Identity map of the issues fetched in this session, shared by the pool threads so guarded by a lock
+        self.issues = {}
+        self.lock = threading.Lock()
+
+    def __get_issue(self, issue_key: str):
+        """
+        Get an issue object, fetching it only if it wasn't fetched before in this session.
+        The lock isn't held while fetching, if two threads fetch the same issue the first one stored wins.
+        """
+        with self.lock:
+            issue = self.issues.get(issue_key)
+        if issue is not None:
+            return issue
+
+        issue = call_remote(GITHUB_ISSUES_BACKEND, "get_issue", self.repo.get_issue, int(issue_key), idempotent=True)
+        with self.lock:
+            return self.issues.setdefault(issue_key, issue)
 
     def get_user_by_username(self, username: str) -> dict:
         """Not supported for GitHub."""
         raise NotImplementedError("This action is not supported for GitHub")
 
+    @handle_github_errors
     def update_ticket_status(self, issue_key: str, status: str) -> None:
         """Update issue state (open/closed)."""
-        issue = self.repo.get_issue(int(issue_key))
-        issue.edit(state=status)
+        issue = self.__get_issue(issue_key)
+        try:
+            # edit() updates the issue object in place from the response, keeping the identity map current
+            call_remote(GITHUB_ISSUES_BACKEND, "edit", issue.edit, state=status)
+        except Exception:
+            with self.lock:
+                self.issues.pop(issue_key, None)
+            self.cache.invalidate_issue(issue_key)
+            raise
 
-    def update_git_branch(self, issue_key: str, git_branch_field: str) -> None:
+        self.cache.set_issue(issue_key, status=issue.state)
+
+    def update_git_branch(self, issue_key: str, git_branch_field: str, branch: str = None) -> None:
         """Not supported for GitHub."""
         raise NotImplementedError("This action is not supported for GitHub")
 
@@ -29,17 +122,99 @@ class GitHubPmt(PMToolInterface):
         """Not supported for GitHub."""
         raise NotImplementedError("This action is not supported for GitHub")
 
+    @handle_github_errors
+    def get_ticket_details(self, issue_key: str, acceptance_criteria_field: str = None) -> dict:
+        """Get the title and link of an issue. GitHub issues have no acceptance criteria field."""
+        issue = self.__get_issue(issue_key)
+        return {"key": f"#{issue_key}", "summary": issue.title, "acceptance_criteria": None, "link": issue.html_url}
+
+    def iter_changelog_pages(self, query: str, page_size: int = 100):
+        """Not supported for GitHub."""
+        raise NotImplementedError("This action is not supported for GitHub")
+
+    @handle_github_errors
     def find_valid_status_transition(self, issue_key: str, target_statuses: List[str]) -> str:
         """Find a valid status transition based on current issue state."""
-        issue = self.repo.get_issue(int(issue_key))
-        if "closed" in target_statuses and issue.state == "open":
+        state = self.get_issue_status(issue_key)
+        if "closed" in target_statuses and state == "open":
             return "closed"
-        elif "open" in target_statuses and issue.state == "closed":
+        elif "open" in target_statuses and state == "closed":
             return "open"
         else:
-            raise ValueError(f"Invalid status transition from current status '{issue.state}' for issue '{issue_key}'")
+            raise InvalidTransitionError(issue_key, state)
 
+    @handle_github_errors
     def get_issue_status(self, issue_key: str) -> str:
-        """Get current issue state."""
-        issue = self.repo.get_issue(int(issue_key))
-        return issue.state 
+        """Get current issue state, from the session's issues or the metadata cache when fresh."""
+        with self.lock:
+            issue = self.issues.get(issue_key)
+        if issue is not None:
+            return issue.state
+
+        cached_issue = self.cache.get_issue(issue_key)
+        if cached_issue and "status" in cached_issue:
+            return cached_issue["status"]
+
+        issue = self.__get_issue(issue_key)
+        self.cache.set_issue(issue_key, status=issue.state)
+        return issue.state
+
+    @handle_github_errors
+    def get_issues_statuses(self, issue_keys: List[str]) -> Dict[str, str]:
+        """
+        Get the states of many issues with a single GraphQL query per 100 issues.
+
+        :param issue_keys: The issue numbers.
+        :return: A dict of issue number to state (open/closed).
+        """
+        with self.lock:
+            statuses = {key: self.issues[key].state for key in issue_keys if key in self.issues}
+        missing_keys = [key for key in issue_keys if key not in statuses]
+
+        owner, name = self.config.git_proj.split("/", 1)
+        for start in range(0, len(missing_keys), GRAPHQL_ISSUES_PER_QUERY):
+            chunk = missing_keys[start:start + GRAPHQL_ISSUES_PER_QUERY]
+            aliases = " ".join(f"i{int(key)}: issue(number: {int(key)}) {{ state }}" for key in chunk)
+            query = f"query($owner: String!, $name: String!) {{ repository(owner: $owner, name: $name) {{ {aliases} }} }}"
+            result = call_remote(GITHUB_ISSUES_BACKEND, "graphql", self.__graphql_request, query,
+                                 {"owner": owner, "name": name}, idempotent=True)
+
+            repository = result.get("data", {}).get("repository") or {}
+            for key in chunk:
+                issue = repository.get(f"i{int(key)}")
+                if issue is not None:
+                    statuses[key] = issue["state"].lower()
+
+        self.cache.set_issues({key: {"status": status} for key, status in statuses.items()})
+        return statuses
+
+    def __graphql_request(self, query: str, variables: dict) -> dict:
+        """Make a GraphQL request to the GitHub API."""
+        headers = {"Authorization": f"Bearer {self.config.pmt_token}"}
+        response = requests.post(get_github_graphql_url(self.api_url), json={"query": query, "variables": variables},
+                                 headers=headers, timeout=Deadline().remaining())
+        response.raise_for_status()
+        return response.json()
+
+
+    def iter_todo_tickets(self, page_size: int = 100):
+        """
+        Iterate the open issues that are assigned to the current user or unassigned, page by page.
+        Pages are fetched 100 issues at a time, the GitHub maximum, so page_size is ignored.
+        """
+        login = call_remote(GITHUB_ISSUES_BACKEND, "get_user", lambda: self.github.get_user().login, idempotent=True)
+        issues = self.repo.get_issues(state="open")
+        page_number = 0
+
+        while True:
+            page = call_remote(GITHUB_ISSUES_BACKEND, "get_issues", issues.get_page, page_number, idempotent=True)
+            if not page:
+                return
+
+            yield [
+                {"key": str(issue.number), "summary": issue.title, "status": issue.state}
+                for issue in page
+                if issue.pull_request is None
+                and (not issue.assignees or login in [assignee.login for assignee in issue.assignees])
+            ]
+            page_number += 1
@@ -1,17 +1,41 @@
 import json
-import sys
+import threading
+from concurrent.futures import as_completed
 
 import requests
 from jira import JIRA, JIRAError
 
+from gitask.cache import MetadataCache
 from gitask.config.config import Config
+from gitask.errors import BackendError, InvalidTransitionError
 from gitask.pmt.project_management_tool import PMToolInterface
+from gitask.scope import ContextThreadPoolExecutor, get_singleton
+from gitask.transport import call_remote, Deadline
 from gitask.utils import Utils
 
+JIRA_BACKEND = "Jira"
+JQL_KEYS_PER_SEARCH = 100
+CONCURRENT_PAGE_FETCHES = 4
+ISSUE_GRAPH_PAGE_SIZE = 100
+DEFAULT_PICKER_JQL = 'statusCategory = "To Do" AND (assignee = currentUser() OR assignee is EMPTY) ORDER BY updated DESC'
+
+
+def _get_error_messages(response):
+    """Get the error messages and field errors of a JIRA error response JSON."""
+    messages = []
+    try:
+        response_json = response.json()
+        messages.extend(response_json.get("errorMessages", []))
+        messages.extend(f"{field}: {message}" for field, message in response_json.get("errors", {}).items())
+    except (ValueError, TypeError, AttributeError):
+        pass
+    return messages
+
 
 def handle_jira_errors(func):
     """
-    Decorator to handle JIRA errors and print meaningful error messages.
+    Decorator to turn JIRA errors, from the client library or from raw API requests,
+    into BackendError with meaningful error messages.
 
     :param func: The function to wrap.
     :return: The wrapped function.
@@ -20,26 +44,12 @@ def handle_jira_errors(func):
         try:
             return func(*args, **kwargs)
         except JIRAError as e:
-            try:
-                # Print the error messages and errors from the response JSON
-                response_json = e.response.json()
-                error_messages = response_json.get("errorMessages", [])
-                errors = response_json.get("errors", {})
-
-                if error_messages:
-                    print("\n".join(error_messages))
-
-                if errors:
-                    for field, message in errors.items():
-                        print(f"{field}: {message}")
-
-                sys.exit(1)
-            except (json.JSONDecodeError, TypeError, AttributeError):
-                pass
-
-            # print the error text if the error messages and errors attributes are not present
-            print(e.text)
-            sys.exit(1)
+            # Use the error text if the error messages and errors attributes are not present
+            raise BackendError(JIRA_BACKEND, "\n".join(_get_error_messages(e.response)) or str(e.text),
+                               e.status_code) from e
+        except requests.HTTPError as e:
+            raise BackendError(JIRA_BACKEND, "\n".join(_get_error_messages(e.response)) or str(e),
+                               e.response.status_code if e.response is not None else None) from e
 
     return wrapper
 
@@ -48,20 +58,181 @@ class JiraPmt(PMToolInterface):
     """
     JiraPmt class implements the PMToolInterface for JIRA.
     """
-    _instance = None
 
     def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super(JiraPmt, cls).__new__(cls)
-            cls._instance.__init_jira_client()
-        return cls._instance
+        return get_singleton(cls, JiraPmt.__init_jira_client)
 
     @handle_jira_errors
     def __init_jira_client(self):
         config = Config()
-        self.jira_client = JIRA(server=config.pmt_url, token_auth=config.pmt_token)
+        # Retries are handled by call_remote, within the command time budget
+        self.jira_client = call_remote(JIRA_BACKEND, "connect", JIRA, server=config.pmt_url,
+                                       token_auth=config.pmt_token, timeout=config.timeout or None, max_retries=0,
+                                       idempotent=True)
         self.api_url = f"{config.pmt_url}/rest/api/2"
         self.token = config.pmt_token
+        self.cache = MetadataCache()
+        # Shared by the pool threads, e.g. the webhook workers, so guarded by a lock
+        self.transition_ids = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def __to_cached_transition(transition):
+        """Keep only the transition id, name and target status name."""
+        return {"id": transition["id"], "name": transition["name"], "to": transition.get("to", {}).get("name")}
+
+    def __remember_transitions(self, issue_key, transitions):
+        """Keep the transition ids so transitioning by name doesn't re-fetch the transitions list."""
+        with self.lock:
+            for transition in transitions:
+                self.transition_ids[(issue_key, transition["name"])] = transition["id"]
+
+    def __get_transitions(self, issue_key, use_cache=True):
+        """
+        Get the available transitions of an issue, from the metadata cache when fresh.
+
+        :param issue_key: The key of the issue.
+        :param use_cache: Whether a cached transitions list may be used.
+        :return: A tuple of the {"id", "name", "to"} transition dicts and whether they came from the cache.
+        """
+        cached_issue = self.cache.get_issue(issue_key) if use_cache else None
+        from_cache = bool(cached_issue and "transitions" in cached_issue)
+        if from_cache:
+            transitions = cached_issue["transitions"]
+        else:
+            jira_transitions = call_remote(JIRA_BACKEND, "transitions", self.jira_client.transitions, issue_key,
+                                           idempotent=True)
+            transitions = [self.__to_cached_transition(t) for t in jira_transitions]
+            self.cache.set_issue(issue_key, transitions=transitions)
+
+        self.__remember_transitions(issue_key, transitions)
+        return transitions, from_cache
+
+    @handle_jira_errors
+    def prefetch_issue(self, issue_key):
+        """
+        Fetch the issue status and its available transitions in a single request and cache them.
+
+        :param issue_key: The key of the issue to prefetch.
+        """
+        issue = call_remote(JIRA_BACKEND, "issue", self.jira_client.issue, issue_key, fields="status",
+                            expand="transitions", idempotent=True)
+        transitions = [self.__to_cached_transition(t) for t in issue.raw.get("transitions", [])]
+        # noinspection PyUnresolvedReferences
+        self.cache.set_issue(issue_key, status=issue.fields.status.name, transitions=transitions)
+
+    @handle_jira_errors
+    def get_issue_status(self, issue_key):
+        """
+        Get the current status of a JIRA ticket.
+
+        :param issue_key: The key of the issue.
+        :return: The current status name.
+        """
+        cached_issue = self.cache.get_issue(issue_key)
+        if cached_issue and "status" in cached_issue:
+            return cached_issue["status"]
+
+        issue = call_remote(JIRA_BACKEND, "issue", self.jira_client.issue, issue_key, fields="status", idempotent=True)
+        # noinspection PyUnresolvedReferences
+        status = issue.fields.status.name
+        self.cache.set_issue(issue_key, status=status)
+        return status
+
+    @handle_jira_errors
+    def get_issues_statuses(self, issue_keys):
+        """
+        Get the current statuses of many JIRA tickets with a single JQL search per 100 tickets.
+        Their available transitions come with the search and are cached as well,
+        so transitioning the tickets afterwards doesn't fetch them one by one.
+
+        :param issue_keys: The keys of the issues.
+        :return: A dict of issue key to status name, without the issues that don't exist.
+        """
+        statuses = {}
+        cached_issues = {}
+        for start in range(0, len(issue_keys), JQL_KEYS_PER_SEARCH):
+            chunk = issue_keys[start:start + JQL_KEYS_PER_SEARCH]
+            # Unknown keys (e.g. deleted tickets) are only warnings instead of failing the whole search
+            params = {"jql": f"key in ({','.join(json.dumps(key) for key in chunk)})", "maxResults": len(chunk),
+                      "fields": "status", "expand": "transitions", "validateQuery": "warn"}
+            result = call_remote(JIRA_BACKEND, "search", self.__jira_get_request, "search", params, idempotent=True)
+            for issue in result.get("issues", []):
+                transitions = [self.__to_cached_transition(t) for t in issue.get("transitions", [])]
+                self.__remember_transitions(issue["key"], transitions)
+                statuses[issue["key"]] = issue["fields"]["status"]["name"]
+                cached_issues[issue["key"]] = {"status": statuses[issue["key"]], "transitions": transitions}
+
+        self.cache.set_issues(cached_issues)
+        return statuses
+
+    @staticmethod
+    def __matches_link_type(link, link_types):
+        """Check if an issue link has one of the link types, by name or inward/outward description."""
+        link_type = link.get("type", {})
+        names = {link_type.get(attr, "").lower() for attr in ("name", "inward", "outward")}
+        return any(link_type_name.lower() in names for link_type_name in link_types)
+
+    @handle_jira_errors
+    def get_issue_graph(self, issue_key, include_subtasks, link_types):
+        """
+        Get an issue with its subtasks, its linked issues and their subtasks with a single JQL search.
+        Their available transitions come with the search and are cached, like in get_issues_statuses.
+        Links are followed one level from the root issue.
+
+        :param issue_key: The key of the root issue.
+        :param include_subtasks: Whether subtasks are children of their parent issue.
+        :param link_types: The issue link type names (or inward/outward descriptions, e.g. "blocks").
+        :return: A dict of issue key to {"status", "children"}, where children is a list of issue keys.
+        """
+        clauses = [f"key = {issue_key}"]
+        if include_subtasks:
+            clauses.append(f"parent = {issue_key}")
+        if link_types:
+            # Links are filtered by type below, from the root issue's links
+            clauses.append(f"issue in linkedIssues({issue_key})")
+        if include_subtasks and link_types:
+            clauses.append(f"parent in linkedIssues({issue_key})")
+
+        issues = {}
+        start_at = 0
+        while True:
+            params = {"jql": " OR ".join(clauses), "startAt": start_at, "maxResults": ISSUE_GRAPH_PAGE_SIZE,
+                      "fields": "status,parent,issuelinks", "expand": "transitions"}
+            result = call_remote(JIRA_BACKEND, "search", self.__jira_get_request, "search", params, idempotent=True)
+            page = result.get("issues", [])
+            issues.update((issue["key"], issue) for issue in page)
+            start_at += len(page)
+            if not page or start_at >= result.get("total", 0):
+                break
+
+        if issue_key not in issues:
+            raise ValueError(f"Issue '{issue_key}' not found")
+
+        cached_issues = {}
+        for key, issue in issues.items():
+            transitions = [self.__to_cached_transition(t) for t in issue.get("transitions", [])]
+            self.__remember_transitions(key, transitions)
+            cached_issues[key] = {"status": issue["fields"]["status"]["name"], "transitions": transitions}
+        self.cache.set_issues(cached_issues)
+
+        graph = {key: {"status": cached_issues[key]["status"], "children": []} for key in issues}
+
+        for link in issues[issue_key]["fields"].get("issuelinks") or []:
+            linked_issue = link.get("inwardIssue") or link.get("outwardIssue") or {}
+            linked_key = linked_issue.get("key")
+            if linked_key in graph and linked_key != issue_key and self.__matches_link_type(link, link_types):
+                graph[issue_key]["children"].append(linked_key)
+
+        # Subtasks of the linked issues are only children of the linked issues of the requested types
+        reachable = {issue_key, *graph[issue_key]["children"]}
+        for key, issue in issues.items():
+            parent_key = (issue["fields"].get("parent") or {}).get("key")
+            if include_subtasks and parent_key in reachable and key not in graph[parent_key]["children"]:
+                graph[parent_key]["children"].append(key)
+
+        included = reachable.union(*(graph[key]["children"] for key in reachable))
+        return {key: node for key, node in graph.items() if key in included}
 
     @handle_jira_errors
     def update_ticket_status(self, issue_key, status):
@@ -71,7 +242,25 @@ class JiraPmt(PMToolInterface):
         :param issue_key: The key of the issue to update.
         :param status: The new status to set.
         """
-        self.jira_client.transition_issue(issue_key, status)
+        with self.lock:
+            transition_id = self.transition_ids.pop((issue_key, status), None)
+        self.cache.invalidate_issue(issue_key)
+
+        if transition_id is None:
+            call_remote(JIRA_BACKEND, "transition", self.jira_client.transition_issue, issue_key, status)
+            return
+
+        try:
+            call_remote(JIRA_BACKEND, "transition", self.jira_client.transition_issue, issue_key, transition_id)
+        except JIRAError:
+            # The cached transition id may be stale (e.g. after a workflow change), re-pick it from the server
+            transitions, _ = self.__get_transitions(issue_key, use_cache=False)
+            self.cache.invalidate_issue(issue_key)
+            transition_id = next((transition["id"] for transition in transitions if transition["name"] == status),
+                                 None)
+            if transition_id is None:
+                raise InvalidTransitionError(issue_key, self.get_issue_status(issue_key))
+            call_remote(JIRA_BACKEND, "transition", self.jira_client.transition_issue, issue_key, transition_id)
 
     @handle_jira_errors
     def find_valid_status_transition(self, issue_key, statuses):
@@ -83,13 +272,18 @@ class JiraPmt(PMToolInterface):
         :return: The first valid status if a transition is possible.
                  Raises an exception if no valid transition is found.
         """
-        transitions = self.jira_client.transitions(issue_key)
+        transitions, from_cache = self.__get_transitions(issue_key)
         valid_transitions = [transition["name"] for transition in transitions if transition["name"] in statuses]
 
+        if not valid_transitions and from_cache:
+            # The cached transitions may be stale, re-check against the server before failing
+            self.cache.invalidate_issue(issue_key)
+            transitions, _ = self.__get_transitions(issue_key, use_cache=False)
+            valid_transitions = [transition["name"] for transition in transitions if transition["name"] in statuses]
+
         if not valid_transitions:
-            # noinspection PyUnresolvedReferences
-            current_status = self.jira_client.issue(issue_key).fields.status.name
-            raise ValueError(f"Invalid status transition from current status '{current_status}' for issue '{issue_key}'")
+            current_status = self.get_issue_status(issue_key)
+            raise InvalidTransitionError(issue_key, current_status)
 
         return valid_transitions[0]
 
@@ -102,21 +296,27 @@ class JiraPmt(PMToolInterface):
         :return: The user object.
         """
         params = {"username": username}
-        users = self.__jira_get_request("user/search", params)
+        users = call_remote(JIRA_BACKEND, "user/search", self.__jira_get_request, "user/search", params,
+                            idempotent=True)
         if not users:
             raise ValueError(f"User '{username}' not found")
 
         return users[0]
 
     @handle_jira_errors
-    def update_git_branch(self, issue_key, git_branch_field):
+    def update_git_branch(self, issue_key, git_branch_field, branch=None):
         """
         Update the git branch field of a JIRA ticket.
 
         :param issue_key: The key of the issue to update.
-        :param git_branch_field: The field to update with the current git branch.
+        :param git_branch_field: The field to update with the git branch.
+        :param branch: The git branch, defaults to the current git branch.
         """
-        self.jira_client.issue(issue_key).update(fields={git_branch_field: Utils.get_current_git_branch()})
+        if branch is None:
+            branch = Utils.get_current_git_branch()
+
+        issue = call_remote(JIRA_BACKEND, "issue", self.jira_client.issue, issue_key, idempotent=True)
+        call_remote(JIRA_BACKEND, "update", issue.update, fields={git_branch_field: branch})
 
     @handle_jira_errors
     def update_reviewer(self, issue_key, reviewer_field_id, user):
@@ -127,7 +327,111 @@ class JiraPmt(PMToolInterface):
         :param reviewer_field_id: The field to update with the reviewer.
         :param user: The user object of the reviewer.
         """
-        self.jira_client.issue(issue_key).update(fields={reviewer_field_id: user})
+        issue = call_remote(JIRA_BACKEND, "issue", self.jira_client.issue, issue_key, idempotent=True)
+        call_remote(JIRA_BACKEND, "update", issue.update, fields={reviewer_field_id: user})
+
+    def iter_todo_tickets(self, page_size=100):
+        """
+        Iterate the to-do JIRA tickets page by page, using the configured picker JQL.
+
+        :param page_size: The number of tickets to fetch per request.
+        :return: An iterator of ticket pages, each a list of {"key", "summary", "status"} dicts.
+        """
+        jql = Config().picker_query or DEFAULT_PICKER_JQL
+        start_at = 0
+
+        while True:
+            params = {"jql": jql, "startAt": start_at, "maxResults": page_size, "fields": "summary,status"}
+            result = call_remote(JIRA_BACKEND, "search", self.__jira_get_request, "search", params, idempotent=True)
+            issues = result.get("issues", [])
+
+            yield [
+                {"key": issue["key"], "summary": issue["fields"]["summary"], "status": issue["fields"]["status"]["name"]}
+                for issue in issues
+            ]
+
+            start_at += len(issues)
+            if not issues or start_at >= result.get("total", 0):
+                return
+
+    def iter_changelog_pages(self, jql, page_size=100):
+        """
+        Iterate the JIRA tickets matching a JQL query with their status changelog, page by page.
+        The first page is fetched to learn the result size, then the remaining pages are fetched concurrently,
+        so pages are yielded in completion order. Each page has its own time and retry budget.
+
+        :param jql: The JQL query.
+        :param page_size: The number of tickets to fetch per request.
+        :return: An iterator of ticket pages, each a list of
+                 {"key", "created", "updated", "status", "reviewer", "changes"} dicts,
+                 where changes is a list of {"at", "from", "to"} status change dicts.
+        """
+        reviewer_field = Config().reviewer_field
+        fields = "status,created,updated" + (f",{reviewer_field}" if reviewer_field else "")
+
+        def fetch_page(start_at):
+            params = {"jql": jql, "startAt": start_at, "maxResults": page_size, "fields": fields, "expand": "changelog"}
+            # A first sync of a large project outlasts the command's budget
+            deadline_token = Deadline.start_operation()
+            try:
+                return call_remote(JIRA_BACKEND, "search", self.__jira_get_request, "search", params, idempotent=True)
+            finally:
+                Deadline.end_operation(deadline_token)
+
+        first_page = fetch_page(0)
+        yield [self.__to_changelog_issue(issue, reviewer_field) for issue in first_page.get("issues", [])]
+
+        # The server may cap the page size when expanding changelogs
+        server_page_size = first_page.get("maxResults") or page_size
+        start_offsets = range(len(first_page.get("issues", [])), first_page.get("total", 0), server_page_size)
+        with ContextThreadPoolExecutor(max_workers=CONCURRENT_PAGE_FETCHES) as executor:
+            futures = [executor.submit(fetch_page, start_at) for start_at in start_offsets]
+            for future in as_completed(futures):
+                yield [self.__to_changelog_issue(issue, reviewer_field) for issue in future.result().get("issues", [])]
+
+    @handle_jira_errors
+    def get_ticket_details(self, issue_key, acceptance_criteria_field=None):
+        """
+        Get the summary and acceptance criteria of a JIRA ticket, projecting the fetched fields to these only.
+
+        :param issue_key: The key of the issue.
+        :param acceptance_criteria_field: The (custom) field holding the acceptance criteria, if any.
+        :return: A {"key", "summary", "acceptance_criteria", "link"} dict.
+        """
+        fields = ["summary"] + ([acceptance_criteria_field] if acceptance_criteria_field else [])
+        issue = call_remote(JIRA_BACKEND, "issue", self.__jira_get_request, f"issue/{issue_key}",
+                            {"fields": ",".join(fields)}, idempotent=True)
+        acceptance_criteria = issue["fields"].get(acceptance_criteria_field) if acceptance_criteria_field else None
+        return {
+            "key": issue_key,
+            "summary": issue["fields"].get("summary") or "",
+            # Rich text fields of other editors aren't rendered
+            "acceptance_criteria": acceptance_criteria if isinstance(acceptance_criteria, str) else None,
+            "link": f"{Config().pmt_url}/browse/{issue_key}",
+        }
+
+    @staticmethod
+    def __to_changelog_issue(issue, reviewer_field):
+        fields = issue["fields"]
+        reviewer = fields.get(reviewer_field) if reviewer_field else None
+        if isinstance(reviewer, dict):
+            reviewer = reviewer.get("displayName") or reviewer.get("name")
+
+        changes = [
+            {"at": history["created"], "from": item.get("fromString"), "to": item.get("toString")}
+            for history in issue.get("changelog", {}).get("histories", [])
+            for item in history.get("items", [])
+            if item.get("field") == "status"
+        ]
+
+        return {
+            "key": issue["key"],
+            "created": fields["created"],
+            "updated": fields["updated"],
+            "status": fields["status"]["name"],
+            "reviewer": reviewer,
+            "changes": changes,
+        }
 
     def __jira_get_request(self, resource, params=None):
         """
@@ -142,10 +446,11 @@ class JiraPmt(PMToolInterface):
             "Content-Type": "application/json"
         }
 
+        timeout = Deadline().remaining()
         if params is None:
-            response = requests.get(url, headers=headers)
+            response = requests.get(url, headers=headers, timeout=timeout)
         else:
-            response = requests.get(url, headers=headers, params=params)
+            response = requests.get(url, headers=headers, params=params, timeout=timeout)
 
         response.raise_for_status()
 
@@ -39,12 +39,13 @@ class PMToolInterface(ABC):
         pass
 
     @abstractmethod
-    def update_git_branch(self, issue_key, git_branch_field):
+    def update_git_branch(self, issue_key, git_branch_field, branch=None):
         """
         Update the git branch field of a ticket.
 
         :param issue_key: The key of the issue to update.
-        :param git_branch_field: The field to update with the current git branch.
+        :param git_branch_field: The field to update with the git branch.
+        :param branch: The git branch, defaults to the current git branch.
         """
         pass
 
@@ -58,3 +59,76 @@ class PMToolInterface(ABC):
         :param user_object: The user object of the reviewer.
         """
         pass
+
+    @abstractmethod
+    def get_issue_status(self, issue_key):
+        """
+        Get the current status of a ticket.
+
+        :param issue_key: The key of the issue.
+        :return: The current status name.
+        """
+        pass
+
+    @abstractmethod
+    def get_ticket_details(self, issue_key, acceptance_criteria_field=None):
+        """
+        Get the details of a ticket shown in its pull request description, fetching only the needed fields.
+
+        :param issue_key: The key of the issue.
+        :param acceptance_criteria_field: The field holding the acceptance criteria, if any.
+        :return: A {"key", "summary", "acceptance_criteria", "link"} dict, acceptance_criteria may be None.
+        """
+        pass
+
+    @abstractmethod
+    def iter_todo_tickets(self, page_size):
+        """
+        Iterate the to-do tickets that are assigned to the current user or unassigned, page by page.
+
+        :param page_size: The number of tickets to fetch per request.
+        :return: An iterator of ticket pages, each a list of {"key", "summary", "status"} dicts.
+        """
+        pass
+
+    @abstractmethod
+    def iter_changelog_pages(self, query, page_size):
+        """
+        Iterate the tickets matching a query with their status changelog, page by page.
+
+        :param query: The backend's search query.
+        :param page_size: The number of tickets to fetch per request.
+        :return: An iterator of ticket pages, each a list of
+                 {"key", "created", "updated", "status", "reviewer", "changes"} dicts,
+                 where changes is a list of {"at", "from", "to"} status change dicts.
+        """
+        pass
+
+    def get_issues_statuses(self, issue_keys):
+        """
+        Get the current statuses of many tickets.
+        Backends that support it override this with a single batched query.
+
+        :param issue_keys: The keys of the issues.
+        :return: A dict of issue key to status name.
+        """
+        return {issue_key: self.get_issue_status(issue_key) for issue_key in issue_keys}
+
+    def prefetch_issue(self, issue_key):
+        """
+        Warm the local metadata cache with the issue data needed by later transitions.
+
+        :param issue_key: The key of the issue to prefetch.
+        """
+        self.get_issue_status(issue_key)
+
+    def get_issue_graph(self, issue_key, include_subtasks, link_types):
+        """
+        Get an issue with the issues under it: its subtasks, the issues linked to it, and their subtasks.
+
+        :param issue_key: The key of the root issue.
+        :param include_subtasks: Whether subtasks are children of their parent issue.
+        :param link_types: The names of the issue link types whose linked issues are children of the root issue.
+        :return: A dict of issue key to {"status", "children"}, where children is a list of issue keys.
+        """
+        raise NotImplementedError("Cascading to related issues is not supported by this project management tool")
@@ -0,0 +1,132 @@
+import fcntl
+import os
+import shlex
+import shutil
+import stat
+import subprocess
+import sys
+import time
+
+import click
+
+from gitask.cache import MetadataCache
+from gitask.config.config import Config
+from gitask.pmt.pmt_factory import get_pmt
+from gitask.scope import ContextThreadPoolExecutor
+from gitask.utils import Utils
+from gitask.vcs.vcs_factory import get_vcs
+
+PREFETCH_LOCK_FILE_NAME = "prefetch.lock"
+PREFETCH_DEBOUNCE_SECONDS = 1
+PREFETCH_MIN_INTERVAL_SECONDS = 60
+PREFETCH_MAX_ROUNDS = 5
+
+PREFETCH_HOOK_MARKER = "# gitask prefetch"
+PREFETCH_HOOKS = {
+    # Only branch checkouts (third argument is 1) change the current ticket
+    "post-checkout": '[ "$3" = "1" ]',
+    "post-commit": "true",
+}
+
+
+def _get_gitask_path():
+    """Get the absolute path of the gitask executable, which the hooks run without relying on their PATH."""
+    gitask_path = shutil.which("gitask")
+    if gitask_path is None and os.path.basename(sys.argv[0]) == "gitask" and os.access(sys.argv[0], os.X_OK):
+        gitask_path = sys.argv[0]
+    if gitask_path is None:
+        raise ValueError("Can't find the gitask executable to run from the git hooks, is it on your PATH?")
+    return os.path.abspath(gitask_path)
+
+
+def _get_hook_line(condition, gitask_path):
+    # A hook must never fail: git reports a failed post-checkout to the user and to scripts
+    command = f"{shlex.quote(gitask_path)} prefetch </dev/null >/dev/null 2>&1 &"
+    return f"{{ {condition} && [ -x {shlex.quote(gitask_path)} ] && ({command}); }} || true {PREFETCH_HOOK_MARKER}\n"
+
+
+def install_git_hooks():
+    """
+    Install the post-checkout and post-commit git hooks of the current repository,
+    which start a detached background prefetch of the branch's ticket metadata.
+    Existing hooks are kept and the prefetch line is appended to them, or replaced if already installed.
+    """
+    gitask_path = _get_gitask_path()
+    hooks_dir = subprocess.check_output("git rev-parse --git-path hooks", shell=True).strip().decode('utf-8')
+    os.makedirs(hooks_dir, exist_ok=True)
+
+    for hook_name, hook_condition in PREFETCH_HOOKS.items():
+        hook_path = os.path.join(hooks_dir, hook_name)
+        hook_line = _get_hook_line(hook_condition, gitask_path)
+
+        if os.path.exists(hook_path):
+            with open(hook_path, "r") as f:
+                lines = f.readlines()
+            if hook_line in lines:
+                click.echo(f"   {hook_name} hook already installed")
+                continue
+
+            # Hooks installed by former versions are replaced
+            lines = [line for line in lines if PREFETCH_HOOK_MARKER not in line]
+            if lines and not lines[-1].endswith("\n"):
+                lines[-1] += "\n"
+            with open(hook_path, "w") as f:
+                f.writelines(lines + [hook_line])
+        else:
+            with open(hook_path, "w") as f:
+                f.write("#!/bin/sh\n")
+                f.write(hook_line)
+
+        os.chmod(hook_path, os.stat(hook_path).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+        click.echo(f"   {hook_name} hook installed at {hook_path}")
+
+
+def _recently_prefetched(branch):
+    cached_branch = MetadataCache().get_branch(branch)
+    if cached_branch is None:
+        return False
+
+    return time.time() - cached_branch.get("prefetched_at", 0) < PREFETCH_MIN_INTERVAL_SECONDS
+
+
+def _prefetch_branch(branch):
+    """Resolve the branch's ticket and cache its status, transitions and open pull request."""
+    issue_key = Utils().get_current_ticket()
+    pmt = get_pmt()
+    vcs = get_vcs()
+
+    with ContextThreadPoolExecutor(max_workers=2) as executor:
+        issue_future = executor.submit(pmt.prefetch_issue, issue_key)
+        pr_future = executor.submit(vcs.find_open_pull_request, branch)
+        issue_future.result()
+        pull_request = pr_future.result()
+
+    MetadataCache().set_branch(branch, ticket=issue_key, pull_request=pull_request, prefetched_at=time.time())
+
+
+def run_prefetch():
+    """
+    Prefetch the metadata of the current branch's ticket into the local cache.
+
+    Only a single prefetch runs at a time: concurrent invocations (e.g. rapid branch switches) exit
+    immediately, and the running one re-checks the current branch once it is done, so it always ends
+    up prefetching the branch that was checked out last. Branches prefetched within the last minute are skipped.
+    """
+    cache_dir = Config().cache_dir
+    os.makedirs(cache_dir, exist_ok=True)
+
+    with open(os.path.join(cache_dir, PREFETCH_LOCK_FILE_NAME), "w") as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return
+
+        for _ in range(PREFETCH_MAX_ROUNDS):
+            # Let rapid branch switches settle before resolving the branch
+            time.sleep(PREFETCH_DEBOUNCE_SECONDS)
+
+            branch = Utils.get_current_git_branch()
+            if _recently_prefetched(branch):
+                return
+
+            _prefetch_branch(branch)
@@ -0,0 +1,169 @@
+import subprocess
+import time
+
+from gitask.cache import MetadataCache
+from gitask.config.config import Config
+from gitask.errors import GitaskError
+from gitask.scope import ContextThreadPoolExecutor
+from gitask.utils import Utils, get_status_groups
+
+RESOLVE_MAX_WORKERS = 8
+STATUS_GROUP_ORDER = (Config.TO_DO_PROP_NAME, Config.IN_PROGRESS_PROP_NAME, Config.IN_REVIEW_PROP_NAME,
+                      Config.DONE_PROP_NAME)
+
+
+class StatusChange:
+    """A ticket status transition needed to match the state of the ticket's branches and pull requests."""
+
+    def __init__(self, issue_key, current_status, target_group, transition, reason):
+        self.issue_key = issue_key
+        self.current_status = current_status
+        self.target_group = target_group
+        self.transition = transition
+        self.reason = reason
+
+
+def get_branches():
+    """
+    List the local and remote branches of the current repository, with a single git invocation.
+
+    :return: A set of branch names, without their remote prefix.
+    """
+    output = subprocess.check_output(["git", "for-each-ref", "--format=%(refname)", "refs/heads", "refs/remotes"])
+    branches = set()
+    for ref in output.decode('utf-8').splitlines():
+        if ref.startswith("refs/heads/"):
+            branches.add(ref[len("refs/heads/"):])
+        else:
+            # refs/remotes/<remote>/<branch>
+            branch = ref.split("/", 3)[-1]
+            if branch != "HEAD":
+                branches.add(branch)
+    return branches
+
+
+def _resolve_tickets(branches):
+    """Resolve the tickets of many branches concurrently, skipping the branches without a ticket."""
+    utils = Utils()
+
+    def resolve(branch):
+        try:
+            return utils.get_branch_ticket(branch)
+        except (subprocess.CalledProcessError, ValueError):
+            return None
+
+    with ContextThreadPoolExecutor(max_workers=RESOLVE_MAX_WORKERS) as executor:
+        tickets = dict(zip(branches, executor.map(resolve, branches)))
+
+    return {branch: ticket for branch, ticket in tickets.items() if ticket}
+
+
+def _get_target_group(pr_states, branches, abandoned_branches):
+    """
+    Get the status group a ticket should be in, from the pull request states of its branches.
+    A ticket is in review while any of its pull requests is open, and done once they are merged.
+    A ticket whose branches were all deleted without ever having a pull request is back to do.
+
+    :return: The target status group and the reason, or (None, None) if nothing can be inferred.
+    """
+    open_branches = [branch for branch, state in pr_states.items() if state == "open"]
+    if open_branches:
+        return Config.IN_REVIEW_PROP_NAME, f"open pull request on {', '.join(open_branches)}"
+
+    merged_branches = [branch for branch, state in pr_states.items() if state == "merged"]
+    if merged_branches:
+        return Config.DONE_PROP_NAME, f"merged pull request on {', '.join(merged_branches)}"
+
+    if all(branch in abandoned_branches for branch in branches):
+        return Config.TO_DO_PROP_NAME, f"branch {', '.join(branches)} deleted without a pull request"
+
+    return None, None
+
+
+def plan_status_changes(pmt, vcs, lookback_days):
+    """
+    Compute the ticket transitions needed to reconcile the ticket statuses with the branches and pull requests.
+
+    Everything is fetched in bulk: one git invocation lists the branches, the branches deleted since
+    are taken from the metadata cache, the pull request states come from a list of the pull requests
+    updated in the lookback period, and the ticket statuses (with their transitions) from batched searches.
+    Only the branches with a pull request updated in the lookback period and the cached branches are resolved
+    to tickets, the other branches have nothing to reconcile. Cached deleted branches older than the lookback
+    period are pruned.
+    Tickets are only moved forward through the status groups, except back to do when their branches are abandoned.
+
+    :param pmt: The project management tool object.
+    :param vcs: The version control system object.
+    :param lookback_days: Only pull requests updated in this number of days are considered.
+    :return: A tuple of the list of StatusChange, a list of (issue key, error) of unreconcilable tickets,
+             and a dict of the reconciled deleted branches to their ticket, to prune once handled.
+    """
+    since = time.time() - lookback_days * 86400
+    existing_branches = get_branches()
+    cache = MetadataCache()
+
+    # Deleted branches are only known from the metadata cache
+    cached_tickets = {}
+    deleted_branches = {}
+    abandoned_branches = set()
+    expired_branches = []
+    for branch, cached_branch in cache.get_all_branches().items():
+        if not cached_branch.get("ticket"):
+            continue
+        if branch in existing_branches:
+            cached_tickets[branch] = cached_branch["ticket"]
+        elif cached_branch.get(MetadataCache.FETCHED_AT_KEY, 0) < since:
+            expired_branches.append(branch)
+        else:
+            deleted_branches[branch] = cached_tickets[branch] = cached_branch["ticket"]
+            if not cached_branch.get("pull_request"):
+                abandoned_branches.add(branch)
+    if expired_branches:
+        cache.remove_branches(expired_branches)
+
+    pr_states = vcs.get_pull_request_states(sorted(existing_branches.union(cached_tickets)), since)
+
+    tickets_by_branch = dict(cached_tickets)
+    tickets_by_branch.update(_resolve_tickets(sorted(branch for branch in pr_states if branch not in cached_tickets)))
+
+    branches_by_ticket = {}
+    for branch, ticket in tickets_by_branch.items():
+        branches_by_ticket.setdefault(ticket, []).append(branch)
+
+    statuses = pmt.get_issues_statuses(sorted(branches_by_ticket))
+    status_groups = get_status_groups()
+    config = Config()
+    group_statuses = {
+        Config.TO_DO_PROP_NAME: config.to_do_statuses or [],
+        Config.IN_PROGRESS_PROP_NAME: config.in_progress_statuses or [],
+        Config.IN_REVIEW_PROP_NAME: config.in_review_statuses or [],
+        Config.DONE_PROP_NAME: config.done_statuses or [],
+    }
+
+    changes = []
+    errors = []
+    for issue_key, current_status in statuses.items():
+        branches = branches_by_ticket.get(issue_key)
+        if branches is None:
+            continue
+        current_group = status_groups.get(current_status.lower())
+        target_group, reason = _get_target_group(
+            {branch: pr_states[branch] for branch in branches if branch in pr_states}, branches, abandoned_branches)
+
+        if current_group is None or target_group is None or target_group == current_group:
+            continue
+        if target_group == Config.TO_DO_PROP_NAME:
+            if current_group != Config.IN_PROGRESS_PROP_NAME:
+                continue
+        elif STATUS_GROUP_ORDER.index(target_group) < STATUS_GROUP_ORDER.index(current_group):
+            continue
+
+        try:
+            transition = pmt.find_valid_status_transition(issue_key, group_statuses[target_group])
+        except GitaskError as e:
+            errors.append((issue_key, e))
+            continue
+
+        changes.append(StatusChange(issue_key, current_status, target_group, transition, reason))
+
+    return changes, errors, deleted_branches
@@ -0,0 +1,176 @@
+import math
+import os
+import sqlite3
+import time
+from collections import defaultdict
+from datetime import datetime
+
+import click
+
+from gitask.config.config import Config
+from gitask.utils import get_status_groups, percentile
+
+REPORT_DB_FILE_NAME = "changelogs.sqlite"
+REPORT_PAGE_SIZE = 100
+JIRA_TIME_FORMAT = "%Y-%m-%dT%H:%M:%S.%f%z"
+# Relative JQL dates have a minute resolution, and tickets may be updated while a sync is running
+SYNC_OVERLAP_SECONDS = 300
+PERCENTILES = (50, 90, 95)
+# Stored tickets weren't tied to the query that fetched them before version 1
+SCHEMA_VERSION = 1
+
+
+def _parse_time(value):
+    return datetime.strptime(value, JIRA_TIME_FORMAT).timestamp()
+
+
+def normalize_query(query):
+    """Normalize a query for storage, so that whitespace-only differences share their stored tickets."""
+    return " ".join((query or "").split())
+
+
+def _format_duration(seconds):
+    if seconds is None:
+        return "-"
+    if seconds >= 86400:
+        return f"{seconds / 86400:.1f}d"
+    return f"{seconds / 3600:.1f}h"
+
+
+class ChangelogStore:
+    """
+    Local SQLite cache of ticket status changelogs, refreshed incrementally by the tickets' updated timestamp.
+    Tickets are stored once, and tied to each (normalized) query that fetched them, so that the report of a query
+    only covers its own tickets.
+    """
+
+    def __init__(self):
+        db_path = os.path.join(Config().cache_dir, REPORT_DB_FILE_NAME)
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.db = sqlite3.connect(db_path)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS issues (
+                key TEXT PRIMARY KEY, created REAL, updated REAL, status TEXT, reviewer TEXT);
+            CREATE TABLE IF NOT EXISTS status_changes (
+                issue_key TEXT, changed_at REAL, from_status TEXT, to_status TEXT);
+            CREATE INDEX IF NOT EXISTS status_changes_issue ON status_changes (issue_key);
+            CREATE INDEX IF NOT EXISTS issues_updated ON issues (updated);
+            CREATE TABLE IF NOT EXISTS sync_windows (query TEXT PRIMARY KEY, since REAL, until REAL);
+            CREATE TABLE IF NOT EXISTS query_issues (query TEXT, issue_key TEXT, PRIMARY KEY (query, issue_key));
+        """)
+        if self.db.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+            # Older syncs didn't record their tickets' queries, so every query is fetched again
+            with self.db:
+                self.db.execute("DELETE FROM sync_windows")
+                self.db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def get_sync_window(self, query):
+        """:return: The (since, until) timestamps already synced for the query, or None."""
+        return self.db.execute("SELECT since, until FROM sync_windows WHERE query = ?", (query,)).fetchone()
+
+    def set_sync_window(self, query, since, until):
+        with self.db:
+            self.db.execute("INSERT OR REPLACE INTO sync_windows VALUES (?, ?, ?)", (query, since, until))
+
+    def save_page(self, query, issues):
+        """Replace the stored tickets and their status changes with the ones fetched by a query."""
+        with self.db:
+            self.db.executemany("INSERT OR IGNORE INTO query_issues VALUES (?, ?)",
+                                [(query, issue["key"]) for issue in issues])
+            self.db.executemany("INSERT OR REPLACE INTO issues VALUES (?, ?, ?, ?, ?)", [
+                (issue["key"], _parse_time(issue["created"]), _parse_time(issue["updated"]), issue["status"],
+                 issue["reviewer"])
+                for issue in issues
+            ])
+            self.db.executemany("DELETE FROM status_changes WHERE issue_key = ?",
+                                [(issue["key"],) for issue in issues])
+            self.db.executemany("INSERT INTO status_changes VALUES (?, ?, ?, ?)", [
+                (issue["key"], _parse_time(change["at"]), change["from"], change["to"])
+                for issue in issues
+                for change in issue["changes"]
+            ])
+
+    def iter_status_intervals(self, query, since):
+        """
+        Iterate the completed status intervals of the tickets of a query updated since a timestamp.
+
+        :return: An iterator of (status, duration in seconds, reviewer) tuples.
+        """
+        rows = self.db.execute("""
+            SELECT issues.key, issues.created, issues.reviewer, changes.changed_at, changes.from_status,
+                   changes.to_status
+            FROM issues
+            JOIN query_issues ON query_issues.issue_key = issues.key
+            JOIN status_changes AS changes ON changes.issue_key = issues.key
+            WHERE query_issues.query = ? AND issues.updated >= ?
+            ORDER BY issues.key, changes.changed_at
+        """, (query, since))
+
+        previous_key = None
+        entered_at = None
+        for key, created, reviewer, changed_at, from_status, _ in rows:
+            if key != previous_key:
+                # The first status starts when the ticket is created
+                previous_key, entered_at = key, created
+
+            if changed_at >= since:
+                yield from_status, changed_at - entered_at, reviewer
+            entered_at = changed_at
+
+
+def sync_changelogs(pmt, store, query, since):
+    """
+    Fetch the changelogs of the tickets updated since the last sync of the query into the store.
+    A since timestamp before the synced window re-fetches the whole period.
+
+    :return: The number of fetched tickets.
+    """
+    query = normalize_query(query)
+    window = store.get_sync_window(query)
+    now = time.time()
+    if window is not None and window[0] <= since:
+        fetch_from, synced_since = window[1] - SYNC_OVERLAP_SECONDS, window[0]
+    else:
+        fetch_from, synced_since = since, since
+
+    # A relative date doesn't depend on the time zone of the Jira user's profile, unlike an absolute one
+    updated_filter = f'updated >= "-{math.ceil((now - fetch_from) / 60)}m"'
+    jql = f"({query}) AND {updated_filter}" if query else updated_filter
+
+    fetched = 0
+    for page in pmt.iter_changelog_pages(f"{jql} ORDER BY updated ASC", REPORT_PAGE_SIZE):
+        store.save_page(query, page)
+        fetched += len(page)
+
+    store.set_sync_window(query, synced_since, now)
+    return fetched
+
+
+def print_report(store, query, since):
+    """Print the per-status dwell-time percentiles and review turnaround per reviewer of a query's tickets."""
+    status_groups = get_status_groups()
+    durations_by_status = defaultdict(list)
+    review_durations_by_reviewer = defaultdict(list)
+
+    for status, duration, reviewer in store.iter_status_intervals(normalize_query(query), since):
+        if status is None:
+            continue
+        durations_by_status[status].append(duration)
+        if status_groups.get(status.lower()) == Config.IN_REVIEW_PROP_NAME:
+            review_durations_by_reviewer[reviewer or "(none)"].append(duration)
+
+    percentile_headers = "".join(f"{'p' + str(p):>9}" for p in PERCENTILES)
+
+    click.echo(f"\n{'Status':<28}{'Group':<14}{'Count':>7}{percentile_headers}")
+    for status, durations in sorted(durations_by_status.items(), key=lambda item: -len(item[1])):
+        durations.sort()
+        values = "".join(f"{_format_duration(percentile(durations, p)):>9}" for p in PERCENTILES)
+        group = status_groups.get(status.lower(), "-")
+        click.echo(f"{status[:27]:<28}{group:<14}{len(durations):>7}{values}")
+
+    if review_durations_by_reviewer:
+        click.echo(f"\n{'Reviewer':<42}{'Reviews':>7}{percentile_headers}")
+        for reviewer, durations in sorted(review_durations_by_reviewer.items(), key=lambda item: -len(item[1])):
+            durations.sort()
+            values = "".join(f"{_format_duration(percentile(durations, p)):>9}" for p in PERCENTILES)
+            click.echo(f"{reviewer[:41]:<42}{len(durations):>7}{values}")
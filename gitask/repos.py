@@ -0,0 +1,177 @@
+import glob
+import os
+import re
+import subprocess
+
+DEFAULT_REMOTE = "origin"
+# git@host:group/project.git, ssh://git@host:22/group/project.git, https://host/group/project.git
+REMOTE_URL_PATTERN = re.compile(r"^(?:[a-z+]+://(?:[^@/]+@)?(?P<host>[^/:]+)(?::\d*)?/"
+                                r"|[^@:/]+@(?P<scp_host>[^:]+):)(?P<project>.+?)(?:\.git)?/?$")
+GIT_CONFIG_SECTION_PATTERN = re.compile(r'^\[\s*(?P<section>[^\s\]"]+)(?:\s+"(?P<subsection>(?:[^"\\]|\\.)*)")?\s*\]')
+GIT_CONFIG_VALUE_PATTERN = re.compile(r"^(?P<key>[A-Za-z][A-Za-z0-9-]*)\s*(?:=\s*(?P<value>.*))?$")
+# Sections whose effect on the remote URLs only git resolves: includes and url.<base>.insteadOf rewrites
+GIT_RESOLVED_SECTIONS = {"include", "includeif", "url"}
+GIT_CONFIG_ESCAPES = {"n": "\n", "t": "\t", "b": "\b"}
+
+
+def find_git_dir(path):
+    """
+    Find the git directory of the repository containing a path, without running git.
+    A .git file (worktrees and submodules) is followed to the git directory it points to.
+
+    :param path: A path in the repository.
+    :return: The git directory, or None if the path isn't in a git repository.
+    """
+    path = os.path.abspath(path)
+    while True:
+        dot_git = os.path.join(path, ".git")
+        if os.path.isdir(dot_git):
+            return dot_git
+        if os.path.isfile(dot_git):
+            with open(dot_git, "r") as dot_git_file:
+                content = dot_git_file.read().strip()
+            if content.startswith("gitdir:"):
+                return os.path.normpath(os.path.join(path, content[len("gitdir:"):].strip()))
+
+        parent = os.path.dirname(path)
+        if parent == path:
+            return None
+        path = parent
+
+
+def parse_git_config_value(raw_value):
+    """
+    Unquote and unescape a git config value, dropping its trailing comment.
+    As in git, a # or ; outside double quotes starts a comment.
+    """
+    value = []
+    quoted = False
+    escaped = False
+    for char in raw_value:
+        if escaped:
+            value.append(GIT_CONFIG_ESCAPES.get(char, char))
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif char == '"':
+            quoted = not quoted
+        elif char in "#;" and not quoted:
+            break
+        else:
+            value.append(char)
+
+    return "".join(value).strip()
+
+
+def read_git_config(git_dir):
+    """
+    Read the config file of a git directory (or of the main repository, for a worktree).
+    Includes and url.<base>.insteadOf rewrites aren't applied, only kept as sections.
+
+    :return: A dict of (section, subsection) to a dict of lowercase key to value.
+    """
+    common_dir_path = os.path.join(git_dir, "commondir")
+    if os.path.isfile(common_dir_path):
+        with open(common_dir_path, "r") as common_dir_file:
+            git_dir = os.path.normpath(os.path.join(git_dir, common_dir_file.read().strip()))
+
+    config = {}
+    values = None
+    with open(os.path.join(git_dir, "config"), "r") as config_file:
+        for line in config_file:
+            line = line.strip()
+            if not line or line[0] in "#;":
+                continue
+
+            section_match = GIT_CONFIG_SECTION_PATTERN.match(line)
+            if section_match:
+                section_key = (section_match.group("section").lower(), section_match.group("subsection"))
+                values = config.setdefault(section_key, {})
+                continue
+
+            value_match = GIT_CONFIG_VALUE_PATTERN.match(line)
+            if value_match and values is not None:
+                values[value_match.group("key").lower()] = parse_git_config_value(value_match.group("value") or "")
+
+    return config
+
+
+def find_repos(patterns):
+    """
+    Expand repository paths and glob patterns to the root directories of git repositories.
+
+    :param patterns: Repository paths or glob patterns (e.g. ../services/*).
+    :return: A list of repository paths, in the order of the patterns, without duplicates.
+    """
+    repos = []
+    for pattern in patterns:
+        for path in sorted(glob.glob(os.path.expanduser(pattern))) or [pattern]:
+            path = os.path.abspath(path)
+            if not os.path.exists(os.path.join(path, ".git")):
+                if not glob.has_magic(pattern):
+                    raise ValueError(f"'{pattern}' is not the root of a git repository.")
+                continue
+            if path not in repos:
+                repos.append(path)
+
+    return repos
+
+
+def get_repo_branch(repo_path):
+    """Get the current branch of a repository, or HEAD if it's detached."""
+    git_dir = find_git_dir(repo_path)
+    if git_dir is None:
+        raise ValueError(f"'{repo_path}' is not in a git repository.")
+
+    with open(os.path.join(git_dir, "HEAD"), "r") as head_file:
+        head = head_file.read().strip()
+    return head[len("ref: refs/heads/"):] if head.startswith("ref: refs/heads/") else "HEAD"
+
+
+def parse_remote_url(remote_url):
+    """
+    Get the host and project path from a git remote URL (SSH, scp-like or HTTP).
+
+    :param remote_url: The remote URL.
+    :return: A tuple of the host and the project path (e.g. group/subgroup/project).
+    """
+    match = REMOTE_URL_PATTERN.match(remote_url.strip())
+    if match is None:
+        raise ValueError(f"Can't get the project from the remote URL '{remote_url}'.")
+    return (match.group("host") or match.group("scp_host")).lower(), match.group("project")
+
+
+def get_resolved_remote_url(repo_path, remote=DEFAULT_REMOTE):
+    """
+    Get the URL of a remote of the repository containing a path as git resolves it, with the includes
+    and url.<base>.insteadOf rewrites of every git config file applied. Costs running git.
+    """
+    result = subprocess.run(["git", "-C", repo_path, "remote", "get-url", remote], capture_output=True, text=True)
+    if result.returncode != 0:
+        raise ValueError(f"Can't get the '{remote}' remote of '{repo_path}': {result.stderr.strip()}")
+    return result.stdout.strip()
+
+
+def get_remote_url(repo_path, remote=DEFAULT_REMOTE):
+    """
+    Get the URL of a remote of the repository containing a path, from its git config file.
+    Git resolves it instead when the file has includes or URL rewrites, or when the URL isn't recognized.
+    """
+    git_dir = find_git_dir(repo_path)
+    if git_dir is None:
+        raise ValueError(f"'{repo_path}' is not in a git repository.")
+
+    git_config = read_git_config(git_dir)
+    remote_url = git_config.get(("remote", remote), {}).get("url")
+    needs_git = any(section in GIT_RESOLVED_SECTIONS for section, _ in git_config)
+    if needs_git or (remote_url and REMOTE_URL_PATTERN.match(remote_url.strip()) is None):
+        return get_resolved_remote_url(repo_path, remote)
+
+    if not remote_url:
+        raise ValueError(f"The repository of '{repo_path}' has no '{remote}' remote.")
+    return remote_url
+
+
+def get_repo_project(repo_path, remote=DEFAULT_REMOTE):
+    """Get the project path of a repository from the URL of its remote."""
+    return parse_remote_url(get_remote_url(repo_path, remote))[1]
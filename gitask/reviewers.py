@@ -0,0 +1,47 @@
+import random
+
+import click
+
+from gitask.cache import MetadataCache
+
+REVIEW_LOAD_TTL_SECONDS = 300
+
+
+def pick_pool_reviewer(vcs, pool):
+    """
+    Pick the member of a reviewer pool with the fewest open review requests, ties broken at random.
+
+    The counts are fetched for all members at once and cached for a few minutes. The picked reviewer's
+    cached count is incremented, so back-to-back submissions spread over the pool without refetching.
+
+    :param vcs: The version control system object.
+    :param pool: The reviewer group.
+    :return: The picked username.
+    """
+    cache = MetadataCache()
+    candidates = vcs.get_group_members(pool)
+    if not candidates:
+        raise ValueError(f"No reviewer candidates in the '{pool}' pool.")
+
+    loads = {}
+    for member in candidates:
+        cached_load = cache.get_review_load(member, REVIEW_LOAD_TTL_SECONDS)
+        if cached_load is not None:
+            loads[member] = cached_load["open_reviews"]
+
+    missing = [member for member in candidates if member not in loads]
+    if missing:
+        fetched = vcs.count_open_reviews(missing)
+        loads.update(fetched)
+        cache.set_review_loads({member: {"open_reviews": count} for member, count in fetched.items()})
+
+    candidates = [member for member in candidates if member in loads]
+    if not candidates:
+        raise ValueError(f"Failed to count the open reviews of the '{pool}' pool members.")
+
+    fewest = min(loads[member] for member in candidates)
+    reviewer = random.choice([member for member in candidates if loads[member] == fewest])
+
+    cache.set_review_loads({reviewer: {"open_reviews": fewest + 1}})
+    click.echo(f"Reviewer from the '{pool}' pool: {reviewer} ({fewest} open reviews)")
+    return reviewer
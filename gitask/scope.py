@@ -0,0 +1,83 @@
+import contextvars
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+_current_scope = contextvars.ContextVar("gitask_scope", default=None)
+
+
+class Scope:
+    """
+    The instances of gitask's singleton classes (Config, caches, backend clients...).
+
+    The CLI uses a single process-wide scope, while each Session owns its own scope, so sessions with
+    different configurations can coexist in one process. The active scope is tracked in a context variable,
+    so it follows the calling thread, and the tasks submitted to a ContextThreadPoolExecutor.
+    """
+
+    def __init__(self):
+        self.instances = {}
+        self.lock = threading.Lock()
+        self.class_locks = {}
+
+    def get_instance(self, cls, init):
+        """
+        Get the instance of a class in this scope, creating and initializing it on first use.
+
+        :param cls: The singleton class.
+        :param init: Initializes a new instance of the class.
+        :return: The instance.
+        """
+        instance = self.instances.get(cls)
+        if instance is not None:
+            return instance
+
+        with self.lock:
+            class_lock = self.class_locks.setdefault(cls, threading.Lock())
+
+        # One lock per class, so initializing an instance may get the instances of other classes
+        with class_lock:
+            instance = self.instances.get(cls)
+            if instance is None:
+                instance = object.__new__(cls)
+                init(instance)
+                self.instances[cls] = instance
+
+        return instance
+
+    def set_instance(self, cls, instance):
+        """Use a given instance of a class in this scope."""
+        self.instances[cls] = instance
+
+    def activate(self):
+        """
+        Make this scope the active scope of the current context.
+
+        :return: A token to pass to deactivate.
+        """
+        return _current_scope.set(self)
+
+    @staticmethod
+    def deactivate(token):
+        """Restore the scope that was active before the matching activate call."""
+        _current_scope.reset(token)
+
+
+PROCESS_SCOPE = Scope()
+
+
+def get_singleton(cls, init):
+    """
+    Get the instance of a singleton class in the active scope, or the process-wide instance.
+
+    :param cls: The singleton class.
+    :param init: Initializes a new instance of the class.
+    :return: The instance.
+    """
+    return (_current_scope.get() or PROCESS_SCOPE).get_instance(cls, init)
+
+
+class ContextThreadPoolExecutor(ThreadPoolExecutor):
+    """A thread pool running each task in a copy of the submitter's context, keeping its active scope."""
+
+    def submit(self, fn, /, *args, **kwargs):
+        return super().submit(contextvars.copy_context().run, fn, *args, **kwargs)
@@ -0,0 +1,195 @@
+import threading
+
+from gitask.cache import MetadataCache
+from gitask.config.config import Config
+from gitask.metrics import MetricsStore
+from gitask.pmt.pmt_factory import get_pmt
+from gitask.pmt.project_management_tool import PMToolInterface
+from gitask.scope import Scope
+from gitask.transport import Deadline
+from gitask.vcs.vcs_factory import get_vcs
+from gitask.vcs.version_control_tool import VCSInterface
+
+STATUS_GROUPS = (Config.TO_DO_PROP_NAME, Config.IN_PROGRESS_PROP_NAME, Config.IN_REVIEW_PROP_NAME,
+                 Config.DONE_PROP_NAME)
+
+
+class Session:
+    """
+    Embeddable gitask session, for driving gitask from long-running automation such as a release bot.
+
+    A session owns its configuration, metadata cache, backend clients and metrics, independent of the CLI's
+    and other sessions'. Its methods take explicit ticket keys and branches (the current-ticket script and the
+    current git branch are never used), can be called concurrently from many threads, each get their own time
+    budget, and raise GitaskError subclasses instead of exiting. Hooks are not run.
+
+    Example::
+
+        with Session({"pmt-type": "jira", "vcs-type": "gitlab", ...}) as session:
+            session.transition("ABC-123", "done")
+    """
+
+    def __init__(self, config_data=None, environ=None):
+        """
+        :param config_data: The configuration values, as in the config file. Defaults to the config file.
+        :param environ: The environment variables (tokens, URLs, cache directory) of a config_data session,
+                        defaults to the process environment.
+        """
+        self.scope = Scope()
+        if config_data is not None:
+            self.scope.set_instance(Config, Config.from_dict(config_data, environ))
+
+        self.lock = threading.Lock()
+        self.__pmt = None
+        self.__vcs = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __run(self, func, *args, **kwargs):
+        """Run an operation in the session scope, with its own time and retry budget."""
+        scope_token = self.scope.activate()
+        deadline_token = Deadline.start_operation()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            Deadline.end_operation(deadline_token)
+            Scope.deactivate(scope_token)
+
+    @property
+    def config(self) -> Config:
+        return self.__run(Config)
+
+    @property
+    def pmt(self) -> PMToolInterface:
+        """The project management tool backend of the session, created on first use."""
+        with self.lock:
+            if self.__pmt is None:
+                self.__pmt = self.__run(get_pmt)
+            return self.__pmt
+
+    @property
+    def vcs(self) -> VCSInterface:
+        """The version control system backend of the session, created on first use."""
+        with self.lock:
+            if self.__vcs is None:
+                self.__vcs = self.__run(get_vcs)
+            return self.__vcs
+
+    def get_ticket_status(self, issue_key):
+        """
+        :param issue_key: The key of the ticket.
+        :return: The current status of the ticket.
+        """
+        return self.__run(self.pmt.get_issue_status, issue_key)
+
+    def get_tickets_statuses(self, issue_keys):
+        """
+        Get the statuses of many tickets with batched searches.
+
+        :param issue_keys: The keys of the tickets.
+        :return: A dict of ticket key to status.
+        """
+        return self.__run(self.pmt.get_issues_statuses, list(issue_keys))
+
+    def transition(self, issue_key, status_group):
+        """
+        Move a ticket to a status group, with the first configured transition that is valid for its current status.
+
+        :param issue_key: The key of the ticket.
+        :param status_group: One of 'to-do', 'in-progress', 'in-review' and 'done'.
+        :return: The applied transition name.
+        :raises InvalidTransitionError: If none of the group's transitions is valid for the ticket.
+        """
+        if status_group not in STATUS_GROUPS:
+            raise ValueError(f"Unknown status group '{status_group}', expected one of {', '.join(STATUS_GROUPS)}")
+
+        return self.__run(self.__transition, issue_key, status_group)
+
+    def __transition(self, issue_key, status_group):
+        config = Config()
+        statuses = {
+            Config.TO_DO_PROP_NAME: config.to_do_statuses,
+            Config.IN_PROGRESS_PROP_NAME: config.in_progress_statuses,
+            Config.IN_REVIEW_PROP_NAME: config.in_review_statuses,
+            Config.DONE_PROP_NAME: config.done_statuses,
+        }[status_group]
+        if not statuses:
+            raise ValueError(f"No {status_group} statuses configured")
+
+        transition = self.pmt.find_valid_status_transition(issue_key, statuses)
+        self.pmt.update_ticket_status(issue_key, transition)
+        return transition
+
+    def find_open_pull_request(self, source_branch):
+        """
+        :param source_branch: The source branch of the pull request.
+        :return: The link of the branch's open pull request, or None.
+        """
+        return self.__run(self.vcs.find_open_pull_request, source_branch)
+
+    def get_pull_request_states(self, source_branches, updated_since):
+        """
+        Get the states of the pull requests of many branches with a single list query.
+
+        :param source_branches: The source branches of the pull requests.
+        :param updated_since: Only pull requests updated since this timestamp are listed.
+        :return: A dict of source branch to state (open, merged or closed), for the updated pull requests only.
+        """
+        return self.__run(self.vcs.get_pull_request_states, list(source_branches), updated_since)
+
+    def create_pull_request(self, source_branch, target_branch, title, reviewer, description=None):
+        """
+        Create a pull request, or get the open pull request of the source branch.
+
+        :param source_branch: The source branch.
+        :param target_branch: The target branch.
+        :param title: The title of the pull request.
+        :param reviewer: The reviewer username, or a list of reviewer usernames.
+        :param description: The description of the pull request (Markdown), or None.
+        :return: The pull request link.
+        """
+        return self.__run(self.__create_pull_request, source_branch, target_branch, title, reviewer, description)
+
+    def __create_pull_request(self, source_branch, target_branch, title, reviewer, description=None):
+        pr_link = self.vcs.create_pull_request(source_branch, target_branch,
+                                               title or f"Merge {source_branch} into {target_branch}", reviewer,
+                                               description)
+        MetadataCache().set_branch(source_branch, pull_request=pr_link)
+        return pr_link
+
+    def submit_to_review(self, issue_key, source_branch, reviewer, target_branch="master", title="", description=None):
+        """
+        Update the git branch and reviewer fields of a ticket, move it to In Review status
+        and create its pull request.
+
+        :param issue_key: The key of the ticket.
+        :param source_branch: The git branch of the ticket.
+        :param reviewer: The reviewer username, or a list of reviewer usernames (the first one is stored in the ticket).
+        :param target_branch: The target branch of the pull request.
+        :param title: The title of the pull request.
+        :param description: The description of the pull request (Markdown), or None.
+        :return: The pull request link.
+        """
+        return self.__run(self.__submit_to_review, issue_key, source_branch, reviewer, target_branch, title,
+                          description)
+
+    def __submit_to_review(self, issue_key, source_branch, reviewer, target_branch, title, description):
+        config = Config()
+        if config.git_branch_field:
+            self.pmt.update_git_branch(issue_key, config.git_branch_field, source_branch)
+
+        if config.reviewer_field:
+            main_reviewer = reviewer[0] if isinstance(reviewer, list) else reviewer
+            self.pmt.update_reviewer(issue_key, config.reviewer_field, self.pmt.get_user_by_username(main_reviewer))
+
+        self.__transition(issue_key, Config.IN_REVIEW_PROP_NAME)
+        MetadataCache().set_branch(source_branch, ticket=issue_key)
+        return self.__create_pull_request(source_branch, target_branch, title, reviewer, description)
+
+    def close(self):
+        """Flush the metrics recorded by the session."""
+        self.__run(lambda: MetricsStore().flush())
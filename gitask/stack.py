@@ -0,0 +1,64 @@
+import subprocess
+
+
+def _git_lines(*args):
+    return subprocess.check_output(["git", *args]).decode('utf-8').splitlines()
+
+
+def get_branch_stack(target_branch, current_branch):
+    """
+    Compute the stack of dependent branches that the current branch belongs to.
+
+    The stack is computed locally with two git invocations, whatever its size: one listing the local
+    branch tips, and one walking the first-parent history of all local branches that isn't in the target
+    branch. Each branch's parent is the nearest branch tip in its first-parent history, or the target branch.
+    The stack goes from the target branch up to the current branch, and on to its descendants
+    as long as they form a single chain.
+
+    :param target_branch: The branch the bottom of the stack is based on (e.g. master).
+    :param current_branch: A branch in the stack.
+    :return: A list of (branch, parent branch) tuples, from the bottom of the stack to its top.
+    """
+    branches_by_tip = {}
+    for line in _git_lines("for-each-ref", "--format=%(objectname) %(refname:short)", "refs/heads"):
+        tip, branch = line.split(" ", 1)
+        if branch != target_branch:
+            branches_by_tip.setdefault(tip, []).append(branch)
+
+    first_parents = {}
+    for line in _git_lines("rev-list", "--first-parent", "--parents", "--branches", "--not", target_branch):
+        commit, *parents = line.split()
+        first_parents[commit] = parents[0] if parents else None
+
+    parents = {}
+    for tip, branches in branches_by_tip.items():
+        if tip not in first_parents:
+            # Already merged into the target branch
+            continue
+
+        parent = target_branch
+        commit = first_parents[tip]
+        while commit in first_parents:
+            if commit in branches_by_tip:
+                parent = branches_by_tip[commit][0]
+                break
+            commit = first_parents[commit]
+
+        for branch in branches:
+            parents[branch] = parent
+
+    if current_branch not in parents:
+        raise ValueError(f"Branch '{current_branch}' has no commits ahead of '{target_branch}'")
+
+    stack = []
+    branch = current_branch
+    while branch != target_branch:
+        stack.insert(0, (branch, parents[branch]))
+        branch = parents[branch]
+
+    children = [child for child, parent in parents.items() if parent == current_branch]
+    while len(children) == 1:
+        stack.append((children[0], parents[children[0]]))
+        children = [child for child, parent in parents.items() if parent == stack[-1][0]]
+
+    return stack
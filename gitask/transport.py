@@ -0,0 +1,228 @@
+import contextvars
+import json
+import random
+import threading
+import time
+from concurrent.futures import Future, FIRST_COMPLETED, wait
+
+import requests
+
+from gitask.config.config import Config
+from gitask.errors import BackendTimeoutError
+from gitask.metrics import MetricsStore, OUTCOME_ERROR, OUTCOME_TIMEOUT
+from gitask.plan import KIND_READ, KIND_WRITE, Plan, PlannedResult
+from gitask.scope import get_singleton
+
+TRANSIENT_STATUS_CODES = {429, 500, 502, 503, 504}
+MAX_ATTEMPTS = 3
+BACKOFF_BASE_SECONDS = 0.2
+
+_operation_deadline = contextvars.ContextVar("gitask_deadline", default=None)
+
+
+class Deadline:
+    """
+    The time budget of the current command, shared by all of its remote calls.
+
+    Only time spent waiting on remote calls is charged, so local work such as hook scripts doesn't
+    consume the budget, and concurrent calls are charged once for their overlapping wall time.
+    """
+
+    def __new__(cls):
+        deadline = _operation_deadline.get()
+        if deadline is not None:
+            return deadline
+        return get_singleton(cls, Deadline.__init_deadline)
+
+    @staticmethod
+    def start_operation():
+        """
+        Give the operations run from the current context a fresh time and retry budget,
+        instead of sharing the budget of the whole process (e.g. for each operation of a long-lived Session).
+
+        :return: A token to pass to end_operation.
+        """
+        deadline = object.__new__(Deadline)
+        deadline.__init_deadline()
+        return _operation_deadline.set(deadline)
+
+    @staticmethod
+    def end_operation(token):
+        """Restore the budget that was used before the matching start_operation call."""
+        _operation_deadline.reset(token)
+
+    def __init_deadline(self):
+        config = Config()
+        self.budget = config.timeout
+        self.retries_left = config.retry_budget
+        self.spent = 0.0
+        self.in_flight = 0
+        self.in_flight_since = None
+        self.lock = threading.Lock()
+
+    def enter(self):
+        with self.lock:
+            if self.in_flight == 0:
+                self.in_flight_since = time.monotonic()
+            self.in_flight += 1
+
+    def exit(self):
+        with self.lock:
+            self.in_flight -= 1
+            if self.in_flight == 0:
+                self.spent += time.monotonic() - self.in_flight_since
+
+    def remaining(self):
+        """:return: The remaining seconds of the budget, or None if the command has no time budget."""
+        if not self.budget:
+            return None
+
+        with self.lock:
+            spent = self.spent
+            if self.in_flight:
+                spent += time.monotonic() - self.in_flight_since
+        return max(self.budget - spent, 0.0)
+
+    def take_retry(self):
+        """:return: True if the global retry budget allows one more retry or hedged request."""
+        with self.lock:
+            if self.retries_left <= 0:
+                return False
+            self.retries_left -= 1
+            return True
+
+
+def _start_call(func, args, kwargs):
+    """
+    Run the call in a daemon thread, so a stalled connection can be abandoned without blocking the process exit.
+    """
+    future = Future()
+
+    def run():
+        try:
+            future.set_result(func(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+
+    # Run in a copy of the caller's context, keeping its active scope and time budget
+    threading.Thread(target=contextvars.copy_context().run, args=(run,), daemon=True).start()
+    return future
+
+
+def _get_status_code(error):
+    """Get the HTTP status code of a failed call from the client library's exception, or None."""
+    for status_attr in ("status_code", "response_code", "status"):
+        status = getattr(error, status_attr, None)
+        if isinstance(status, int):
+            return status
+
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", None)
+
+
+def _is_transient(error):
+    """Check if a failed call may succeed when retried (connection errors, timeouts, throttling and 5xx)."""
+    if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+        return True
+
+    return _get_status_code(error) in TRANSIENT_STATUS_CODES
+
+
+def _get_result_size(result):
+    """Get the size of a raw response (bytes or a decoded JSON document), or 0 for client library objects."""
+    if isinstance(result, (bytes, str)):
+        return len(result)
+    if isinstance(result, (dict, list)):
+        try:
+            return len(json.dumps(result))
+        except (TypeError, ValueError):
+            return 0
+    return 0
+
+
+def _attempt(backend, operation, func, args, kwargs, hedge):
+    """
+    Run a single attempt of a remote call within the remaining time budget.
+    When hedging, a duplicate call is started if the first one is slower than the hedge threshold,
+    and the first one to complete wins.
+    """
+    deadline = Deadline()
+    remaining = deadline.remaining()
+    if remaining is not None and remaining <= 0:
+        raise BackendTimeoutError(backend, operation, deadline.budget)
+
+    hedge_after = Config().hedge_after if hedge else None
+    futures = [_start_call(func, args, kwargs)]
+
+    deadline.enter()
+    try:
+        if hedge_after and (remaining is None or hedge_after < remaining):
+            done, _ = wait(futures, timeout=hedge_after)
+            if not done and deadline.take_retry():
+                futures.append(_start_call(func, args, kwargs))
+
+        while futures:
+            done, _ = wait(futures, timeout=deadline.remaining(), return_when=FIRST_COMPLETED)
+            if not done:
+                raise BackendTimeoutError(backend, operation, deadline.budget)
+
+            future = done.pop()
+            futures.remove(future)
+            # A failed hedged duplicate doesn't fail the call while another one is still running
+            if future.exception() is None or not futures:
+                return future.result()
+    finally:
+        deadline.exit()
+
+
+def call_remote(backend, operation, func, *args, idempotent=False, **kwargs):
+    """
+    Call a remote backend within the command time budget.
+
+    Idempotent reads are retried on transient failures with exponential backoff, as long as the
+    global retry budget and time budget allow it, and are hedged when the 'hedge-after' threshold is configured.
+    Writes are attempted exactly once. The duration of every call, retries included, is recorded in the metrics store.
+    In plan mode, calls are recorded in the plan, and writes aren't performed.
+
+    :param backend: The backend name, used in error messages and metrics (e.g. Jira, GitLab).
+    :param operation: The operation name, used in error messages and metrics (e.g. transitions).
+    :param func: The client function performing the remote call.
+    :param idempotent: Whether the call can be safely retried and hedged.
+    :return: The result of the remote call.
+    :raises BackendTimeoutError: If the time budget is exhausted.
+    """
+    if Config().plan:
+        Plan().add(backend, operation, KIND_READ if idempotent else KIND_WRITE)
+        if not idempotent:
+            return PlannedResult(operation)
+
+    started_at = time.monotonic()
+    try:
+        result = _call_with_retries(backend, operation, func, args, kwargs, idempotent)
+    except BackendTimeoutError:
+        MetricsStore().record(backend, operation, time.monotonic() - started_at, OUTCOME_TIMEOUT)
+        raise
+    except Exception as e:
+        MetricsStore().record(backend, operation, time.monotonic() - started_at, OUTCOME_ERROR,
+                              status_code=_get_status_code(e))
+        raise
+
+    MetricsStore().record(backend, operation, time.monotonic() - started_at, size=_get_result_size(result))
+    return result
+
+
+def _call_with_retries(backend, operation, func, args, kwargs, idempotent):
+    attempts = MAX_ATTEMPTS if idempotent else 1
+
+    for attempt in range(attempts):
+        try:
+            return _attempt(backend, operation, func, args, kwargs, hedge=idempotent)
+        except BackendTimeoutError:
+            raise
+        except Exception as e:
+            if attempt == attempts - 1 or not _is_transient(e) or not Deadline().take_retry():
+                raise
+
+        backoff = BACKOFF_BASE_SECONDS * (2 ** attempt) * random.uniform(0.5, 1.5)
+        remaining = Deadline().remaining()
+        time.sleep(backoff if remaining is None else min(backoff, remaining))
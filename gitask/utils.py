@@ -1,11 +1,18 @@
 import json
+import math
 import os
+import re
+import shlex
 import subprocess
 import sys
 
 import click
 
+from gitask.cache import MetadataCache
 from gitask.config.config import Config
+from gitask.scope import get_singleton
+
+BRANCH_SUMMARY_MAX_LENGTH = 50
 
 
 def save_json_to_file(file_path, data):
@@ -16,13 +23,8 @@ def save_json_to_file(file_path, data):
 
 
 class Utils:
-    _instance = None
-
     def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super(Utils, cls).__new__(cls)
-            cls._instance.__init__()
-        return cls._instance
+        return get_singleton(cls, Utils.__init__)
 
 
     def __init__(self):
@@ -35,17 +37,72 @@ class Utils:
         return subprocess.check_output("git rev-parse --abbrev-ref HEAD", shell=True).strip().decode('utf-8')
 
 
+    @staticmethod
+    def checkout_new_git_branch(branch):
+        """Create a git branch from HEAD and check it out, or check it out if it already exists."""
+        exists = subprocess.run(["git", "rev-parse", "--verify", "--quiet", f"refs/heads/{branch}"],
+                                stdout=subprocess.DEVNULL).returncode == 0
+        if exists:
+            subprocess.check_call(["git", "checkout", branch])
+        else:
+            subprocess.check_call(["git", "checkout", "-b", branch])
+
+
+    def get_ticket_branch_name(self, issue_key, summary):
+        """
+        Build the branch name of a ticket from the configured branch template.
+
+        :param issue_key: The key of the ticket.
+        :param summary: The summary of the ticket, slugified in the branch name.
+        :return: The branch name.
+        """
+        slug = re.sub(r"[^a-z0-9]+", "-", summary.lower()).strip("-")[:BRANCH_SUMMARY_MAX_LENGTH].rstrip("-")
+        return self.config.branch_template.format(key=issue_key, summary=slug)
+
+
     def get_current_ticket(self):
         """Get the current ticket using the configured script."""
+        return self.get_branch_ticket(self.get_current_git_branch())
+
+
+    def get_branch_ticket(self, branch, use_cache=True):
+        """
+        Get the ticket of a git branch using the configured script.
+        The script resolves the ticket of the checked-out branch. With 'current-ticket-accepts-branch',
+        it gets the branch name as its first argument and in the GITASK_BRANCH environment variable instead,
+        so the tickets of branches that aren't checked out can be resolved too.
+        The ticket resolved for a branch is cached, so the script runs at most once per branch and cache TTL.
+
+        :param branch: The git branch name.
+        :param use_cache: Whether to use the cached ticket, or always run the script.
+        :return: The ticket key.
+        """
         current_ticket_script = self.config.current_ticket_script
 
         if current_ticket_script is None:
             raise ValueError("No current ticket script defined in the configuration.")
 
-        return subprocess.check_output(current_ticket_script, shell=True).strip().decode('utf-8')
+        cache = MetadataCache()
+        cached_branch = cache.get_branch(branch)
+        if use_cache and cached_branch and cached_branch.get("ticket"):
+            return cached_branch["ticket"]
+
+        accepts_branch = self.config.current_ticket_accepts_branch
+        if not accepts_branch and branch != self.get_current_git_branch():
+            # The script would resolve the checked-out branch's ticket instead
+            raise ValueError(f"Can't resolve the ticket of '{branch}', which isn't checked out. Set "
+                             f"'{Config.CURRENT_TICKET_ACCEPTS_BRANCH_PROP_NAME}' once the current ticket script "
+                             f"resolves the branch given as its first argument.")
 
+        command = f"{current_ticket_script} {shlex.quote(branch)}" if accepts_branch else current_ticket_script
+        env = dict(os.environ, GITASK_BRANCH=branch)
+        ticket = subprocess.check_output(command, shell=True, env=env).strip().decode('utf-8')
+        cache.set_branch(branch, ticket=ticket)
+        return ticket
 
-    def create_pull_request(self, vcs_object, title, reviewer, cur_branch=None, target_branch="master"):
+
+    def create_pull_request(self, vcs_object, title, reviewer, cur_branch=None, target_branch="master",
+                            description=None):
         """
         Create a pull request.
 
@@ -54,6 +111,7 @@ class Utils:
         :param reviewer: The reviewer for the pull request.
         :param cur_branch: The current branch name.
         :param target_branch: The target branch name.
+        :param description: The pull request description, or None.
         :return The pull request link.
         """
         if cur_branch is None:
@@ -62,11 +120,36 @@ class Utils:
         if title == "":
             title = f"Merge {cur_branch} into {target_branch}"
 
-        pr_link = vcs_object.create_pull_request(cur_branch, target_branch, title, reviewer)
+        pr_link = vcs_object.create_pull_request(cur_branch, target_branch, title, reviewer, description)
+        MetadataCache().set_branch(cur_branch, pull_request=pr_link)
         click.echo(f"Successfully created pull request: {pr_link}")
         return pr_link
 
-    def run_hook_script(self, script_path, command_params):
+    def create_or_update_pull_request(self, vcs_object, title, reviewer, cur_branch, target_branch,
+                                      get_description=None):
+        """
+        Retarget the open pull request of a branch, or create one if there is none.
+
+        :param vcs_object: The version control system object.
+        :param title: The pull request title, used only when creating it.
+        :param reviewer: The reviewer for the pull request, used only when creating it.
+        :param cur_branch: The source branch name.
+        :param target_branch: The target branch name.
+        :param get_description: Builds the pull request description, called only when creating it.
+        :return The pull request link.
+        """
+        pr_link = vcs_object.update_pull_request_target(cur_branch, target_branch)
+        if pr_link is None:
+            # Let the VCS skip its own open pull request lookup
+            MetadataCache().set_branch(cur_branch, pull_request=None)
+            description = get_description() if get_description else None
+            return self.create_pull_request(vcs_object, title, reviewer, cur_branch, target_branch, description)
+
+        MetadataCache().set_branch(cur_branch, pull_request=pr_link)
+        click.echo(f"Successfully updated pull request: {pr_link}")
+        return pr_link
+
+    def run_hook_script(self, script_path, command_params, issue_key=None):
         """
         Executes the given script with Gitask config auth info.
         Supports .py and .sh files.
@@ -75,11 +158,13 @@ class Utils:
         Args:
             script_path (str): Path to the hook script
             command_params (dict): Dictionary of command parameters to pass to the hook script.
+            issue_key (str): The ticket the command acts on, defaults to the current ticket.
         """
         if not script_path or not os.path.exists(script_path):
             raise FileNotFoundError(f"Hook script not found: {script_path}")
 
-        issue_key = self.get_current_ticket()
+        if issue_key is None:
+            issue_key = self.get_current_ticket()
         args = [
             f"--pmt-url={self.config.pmt_url}",
             f"--pmt-token={self.config.pmt_token}",
@@ -109,3 +194,35 @@ class Utils:
 
 def split_and_strip(value: str, sep: str = ",") -> list[str]:
     return [s.strip() for s in value.split(sep)]
+
+
+def percentile(sorted_values, percentile):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(math.ceil(percentile / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def get_status_groups():
+    """
+    Map status names to the configured status groups. The groups are configured by transition names,
+    so the target statuses of the transitions seen in the metadata cache are mapped as well.
+    """
+    config = Config()
+    groups = {
+        Config.TO_DO_PROP_NAME: config.to_do_statuses or [],
+        Config.IN_PROGRESS_PROP_NAME: config.in_progress_statuses or [],
+        Config.IN_REVIEW_PROP_NAME: config.in_review_statuses or [],
+        Config.DONE_PROP_NAME: config.done_statuses or [],
+    }
+
+    group_by_name = {name.lower(): group for group, names in groups.items() for name in names}
+    status_groups = dict(group_by_name)
+    for cached_issue in MetadataCache().get_all_issues().values():
+        for transition in cached_issue.get("transitions", []):
+            group = group_by_name.get(transition["name"].lower())
+            if group is not None and transition.get("to"):
+                status_groups[transition["to"].lower()] = group
+
+    return status_groups
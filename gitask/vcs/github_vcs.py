@@ -1,15 +1,27 @@
-import sys
+import copy
+from datetime import datetime
 
 import click
+import requests
 from github import Github, GithubException
 
+from gitask.cache import MetadataCache
 from gitask.config.config import Config
+from gitask.errors import BackendError
+from gitask.pmt.github_pmt import get_github_api_url, get_github_graphql_url, get_http_error_message
+from gitask.scope import ContextThreadPoolExecutor, get_singleton
+from gitask.transport import call_remote, Deadline
 from gitask.vcs.version_control_tool import VCSInterface
 
+GITHUB_BACKEND = "GitHub"
+RESOLVE_MAX_WORKERS = 8
+PULLS_PER_PAGE = 100
+
 
 def handle_github_errors(func):
     """
-    Decorator to handle GitHub errors and print meaningful error messages.
+    Decorator to turn GitHub errors, from the client library or from raw API requests,
+    into BackendError with meaningful error messages.
 
     :param func: The function to wrap.
     :return: The wrapped function.
@@ -18,8 +30,11 @@ def handle_github_errors(func):
         try:
             return func(*args, **kwargs)
         except GithubException as e:
-            click.echo(f"GitHub Error: {e.data.get('message', str(e))}")
-            sys.exit(1)
+            message = e.data.get('message', str(e)) if isinstance(e.data, dict) else str(e)
+            raise BackendError(GITHUB_BACKEND, f"GitHub Error: {message}", e.status) from e
+        except requests.HTTPError as e:
+            raise BackendError(GITHUB_BACKEND, f"GitHub Error: {get_http_error_message(e)}",
+                               e.response.status_code if e.response is not None else None) from e
 
     return wrapper
 
@@ -28,19 +43,25 @@ class GithubVcs(VCSInterface):
     """
     GithubVcs class implements the VCSInterface for GitHub.
     """
-    _instance = None
 
     def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super(GithubVcs, cls).__new__(cls)
-            cls._instance.__init_github_client()
-        return cls._instance
+        return get_singleton(cls, GithubVcs.__init_github_client)
 
     @handle_github_errors
     def __init_github_client(self):
         config = Config()
-        self.github_client = Github(config.git_token)
-        self.github_repo = self.github_client.get_repo(config.git_proj)
+        # Retries are handled by call_remote, within the command time budget
+        self.api_url = get_github_api_url(config.git_url)
+        self.github_client = Github(config.git_token, base_url=self.api_url, timeout=config.timeout or None,
+                                    retry=None)
+        # A lazy repository doesn't cost a request, requests address it by name
+        self.github_repo = self.github_client.get_repo(config.git_proj, lazy=True)
+        # Logins already known to exist, e.g. resolved from CODEOWNERS, aren't looked up again
+        self.known_logins = set()
+        self.current_user_login = None
+        # ETags of the pull requests list pages, for conditional requests that don't count against the rate limit
+        self.pulls_etags = {}
+        self.pulls_pages = {}
 
     @handle_github_errors
     def __get_user_by_name(self, name):
@@ -53,7 +74,7 @@ class GithubVcs(VCSInterface):
         """
         # First try exact username match
         try:
-            user = self.github_client.get_user(name)
+            user = call_remote(GITHUB_BACKEND, "get_user", self.github_client.get_user, name, idempotent=True)
             return user
         except GithubException.UnknownObjectException:
             raise ValueError(f"No GitHub user found matching '{name}'")
@@ -61,42 +82,261 @@ class GithubVcs(VCSInterface):
             raise ValueError(f"Failed to get user by name: {name}")
 
     @handle_github_errors
-    def __get_current_user(self):
-        """Get the current GitHub user."""
-        return self.github_client.get_user()
+    def __get_current_user_login(self):
+        """Get the login of the current GitHub user."""
+        if self.current_user_login is None:
+            self.current_user_login = call_remote(GITHUB_BACKEND, "get_user",
+                                                  lambda: self.github_client.get_user().login, idempotent=True)
+        return self.current_user_login
+
+    def __get_reviewer_login(self, name):
+        if name in self.known_logins:
+            return name
+        return self.__get_user_by_name(name).login
 
     @handle_github_errors
-    def create_pull_request(self, source_branch, target_branch, title, reviewer):
+    def create_pull_request(self, source_branch, target_branch, title, reviewer, description=None):
         """
         Create a pull request in GitHub.
 
         :param source_branch: The source branch for the pull request.
         :param target_branch: The target branch for the pull request.
         :param title: The title of the pull request.
-        :param reviewer: The reviewer for the pull request.
+        :param reviewer: The reviewer username for the pull request, or a list of reviewer usernames.
+        :param description: The description of the pull request (Markdown), or None.
         :return: The created pull request link.
         """
-        # Check if PR already exists
-        existing_prs = self.github_repo.get_pulls(state='open', head=source_branch)
-        if existing_prs.totalCount > 0:
-            pr_url = existing_prs[0].html_url
+        # Check if PR already exists. A prefetched "no open PR" is trusted, GitHub rejects duplicates anyway.
+        cached_branch = MetadataCache().get_branch(source_branch)
+        if cached_branch is not None and "pull_request" in cached_branch and cached_branch["pull_request"] is None:
+            pr_url = None
+        else:
+            pr_url = self.find_open_pull_request(source_branch)
+
+        if pr_url is not None:
             click.echo(pr_url)
             raise GithubException(422, {"message": "Pull request already exists"})
 
         # Create new PR
-        pr = self.github_repo.create_pull(
+        pr = call_remote(
+            GITHUB_BACKEND, "create_pull", self.github_repo.create_pull,
             title=title,
+            body=description or "",
             head=source_branch,
             base=target_branch
         )
 
         # Set assignee and reviewer
         try:
-            pr.add_to_assignees(self.__get_current_user().login)
-            reviewer_user = self.__get_user_by_name(reviewer)
-            pr.create_review_request(reviewers=[reviewer_user.login])
+            call_remote(GITHUB_BACKEND, "add_to_assignees", pr.add_to_assignees, self.__get_current_user_login())
+            reviewers = reviewer if isinstance(reviewer, list) else [reviewer]
+            call_remote(GITHUB_BACKEND, "create_review_request", pr.create_review_request,
+                        reviewers=[self.__get_reviewer_login(name) for name in reviewers])
         except GithubException as e:
             click.echo(pr.html_url)
             raise e
 
         return pr.html_url
+
+    def __get_open_pull_request(self, source_branch):
+        """Get the open pull request object of a source branch, or None."""
+        head = f"{self.github_repo.full_name.split('/')[0]}:{source_branch}"
+        existing_prs = call_remote(GITHUB_BACKEND, "get_pulls",
+                                   lambda: self.github_repo.get_pulls(state='open', head=head).get_page(0),
+                                   idempotent=True)
+        return existing_prs[0] if existing_prs else None
+
+    @handle_github_errors
+    def find_open_pull_request(self, source_branch):
+        """
+        Find the open pull request of a source branch in GitHub.
+
+        :param source_branch: The source branch of the pull request.
+        :return: The pull request link, or None if there is no open pull request.
+        """
+        pr = self.__get_open_pull_request(source_branch)
+        return pr.html_url if pr is not None else None
+
+    @handle_github_errors
+    def update_pull_request_target(self, source_branch, target_branch):
+        """
+        Retarget the open pull request of a source branch in GitHub.
+
+        :param source_branch: The source branch of the pull request.
+        :param target_branch: The new base branch of the pull request.
+        :return: The pull request link, or None if there is no open pull request.
+        """
+        pr = self.__get_open_pull_request(source_branch)
+        if pr is None:
+            return None
+
+        if pr.base.ref != target_branch:
+            call_remote(GITHUB_BACKEND, "edit", pr.edit, base=target_branch)
+
+        return pr.html_url
+
+    def __resolve_code_owner(self, owner):
+        """Resolve a single CODEOWNERS owner to logins: a user, the members of an org team, or an email."""
+        name = owner.lstrip("@")
+        if not owner.startswith("@"):
+            users = call_remote(GITHUB_BACKEND, "search_users",
+                                lambda: self.github_client.search_users(f"{name} in:email").get_page(0),
+                                idempotent=True)
+            return [user.login for user in users[:1]]
+
+        if "/" in name:
+            org, team_slug = name.split("/", 1)
+            return call_remote(GITHUB_BACKEND, "get_team_members",
+                               lambda: [member.login for member in
+                                        self.github_client.get_organization(org).get_team_by_slug(team_slug)
+                                        .get_members()],
+                               idempotent=True)
+
+        return [name]
+
+    @handle_github_errors
+    def resolve_code_owners(self, owners):
+        """
+        Resolve CODEOWNERS owners (users, org teams and emails) to GitHub logins, concurrently.
+
+        :param owners: The owners, as written in the CODEOWNERS file.
+        :return: A list of logins, without the current user.
+        """
+        with ContextThreadPoolExecutor(max_workers=RESOLVE_MAX_WORKERS) as executor:
+            resolved = list(executor.map(self.__resolve_code_owner, owners))
+
+        current_login = self.__get_current_user_login()
+        logins = []
+        for names in resolved:
+            logins.extend(name for name in names if name != current_login and name not in logins)
+
+        # Team members and email matches come from GitHub itself, plain @user owners are still looked up
+        self.known_logins.update(name for owner, names in zip(owners, resolved)
+                                 if "/" in owner or not owner.startswith("@") for name in names)
+        return logins
+
+    def __get_pulls_page(self, page):
+        """
+        Get a page of the repository's pull requests, most recently updated first.
+        The request is conditional: an unchanged page is served from memory.
+        """
+        headers = {"Authorization": f"Bearer {Config().git_token}", "Accept": "application/vnd.github+json"}
+        if page in self.pulls_etags:
+            headers["If-None-Match"] = self.pulls_etags[page]
+
+        params = {"state": "all", "sort": "updated", "direction": "desc", "per_page": PULLS_PER_PAGE, "page": page}
+        response = requests.get(f"{self.api_url}/repos/{self.github_repo.full_name}/pulls", headers=headers,
+                                params=params, timeout=Deadline().remaining())
+        if response.status_code == 304:
+            return self.pulls_pages[page]
+
+        response.raise_for_status()
+        self.pulls_etags[page] = response.headers.get("ETag")
+        self.pulls_pages[page] = response.json()
+        return self.pulls_pages[page]
+
+    @handle_github_errors
+    def get_pull_request_states(self, source_branches, updated_since):
+        """
+        Get the states of the pull requests of many source branches, from the repository's pull requests list
+        sorted by update time, fetched with conditional requests until pull requests older than the timestamp.
+
+        :param source_branches: The source branches of the pull requests.
+        :param updated_since: Only pull requests updated since this timestamp are listed.
+        :return: A dict of source branch to state (open, merged or closed), for the updated pull requests only.
+        """
+        source_branches = set(source_branches)
+        states = {}
+        page = 1
+        while True:
+            pulls = call_remote(GITHUB_BACKEND, "get_pulls", self.__get_pulls_page, page, idempotent=True)
+            for pull in pulls:
+                updated_at = datetime.strptime(pull["updated_at"], "%Y-%m-%dT%H:%M:%S%z").timestamp()
+                if updated_at < updated_since:
+                    return states
+
+                branch = pull["head"]["ref"]
+                if branch in source_branches and branch not in states:
+                    if pull["state"] == "open":
+                        states[branch] = "open"
+                    else:
+                        states[branch] = "merged" if pull.get("merged_at") else "closed"
+
+            if len(pulls) < PULLS_PER_PAGE:
+                return states
+            page += 1
+
+    @handle_github_errors
+    def list_my_open_pull_requests(self):
+        """
+        List the open pull requests of the repository authored by the current user.
+
+        :return: A dict of source branch to pull request link.
+        """
+        login = self.__get_current_user_login()
+        pulls = call_remote(GITHUB_BACKEND, "get_pulls",
+                            lambda: list(self.github_repo.get_pulls(state="open")), idempotent=True)
+        return {pull.head.ref: pull.html_url for pull in pulls if pull.user.login == login}
+
+    @handle_github_errors
+    def get_group_members(self, group):
+        """
+        List the members of a GitHub organization team.
+
+        :param group: The team, as org/team-slug.
+        :return: A list of logins, without the current user.
+        """
+        org, _, team_slug = group.lstrip("@").partition("/")
+        if not team_slug:
+            raise ValueError(f"Invalid GitHub team '{group}', expected org/team-slug.")
+
+        members = call_remote(GITHUB_BACKEND, "get_team_members",
+                              lambda: list(self.github_client.get_organization(org).get_team_by_slug(team_slug)
+                                           .get_members()), idempotent=True)
+        logins = [member.login for member in members]
+        self.known_logins.update(logins)
+        current_login = self.__get_current_user_login()
+        return [login for login in logins if login != current_login]
+
+    def __graphql_request(self, query):
+        response = requests.post(get_github_graphql_url(self.api_url), json={"query": query},
+                                 headers={"Authorization": f"Bearer {Config().git_token}"},
+                                 timeout=Deadline().remaining())
+        response.raise_for_status()
+        return response.json()
+
+    @handle_github_errors
+    def count_open_reviews(self, usernames):
+        """
+        Count the open pull requests awaiting the review of each user, across the repositories of the project's owner,
+        with a single aggregated GraphQL search query.
+        The user: qualifier scopes the search to an organization's as well as to a user's repositories.
+
+        :param usernames: The logins.
+        :return: A dict of login to number of open review requests.
+        """
+        owner = self.github_repo.full_name.split("/", 1)[0]
+        aliases = " ".join(f'u{index}: search(query: "is:pr is:open user:{owner} review-requested:{login}", '
+                           f'type: ISSUE) {{ issueCount }}' for index, login in enumerate(usernames))
+        result = call_remote(GITHUB_BACKEND, "graphql", self.__graphql_request, f"query {{ {aliases} }}",
+                             idempotent=True)
+
+        data = result.get("data") or {}
+        if "errors" in result and not data:
+            raise ValueError(f"GitHub GraphQL error: {result['errors'][0].get('message')}")
+        return {login: data[f"u{index}"]["issueCount"] for index, login in enumerate(usernames)
+                if data.get(f"u{index}") is not None}
+
+    def for_project(self, project):
+        """
+        Get a GitHub VCS object for another repository, sharing the client and the known logins.
+
+        :param project: The repository name (e.g. owner/repository).
+        :return: The GithubVcs object of the repository.
+        """
+        project_vcs = copy.copy(self)
+        # A lazy repository doesn't cost a request, a missing repository fails its first call instead
+        project_vcs.github_repo = self.github_client.get_repo(project, lazy=True)
+        project_vcs.pulls_etags = {}
+        project_vcs.pulls_pages = {}
+        return project_vcs
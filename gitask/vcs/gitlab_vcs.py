@@ -1,16 +1,27 @@
+import copy
 import json
-import sys
+from datetime import datetime, timezone
 
 import click
 import gitlab
 
+from gitask.cache import MetadataCache
 from gitask.config.config import Config
+from gitask.errors import BackendError
+from gitask.scope import ContextThreadPoolExecutor, get_singleton
+from gitask.transport import call_remote
 from gitask.vcs.version_control_tool import VCSInterface
 
+GITLAB_BACKEND = "GitLab"
+RESOLVE_MAX_WORKERS = 8
+MERGE_REQUEST_STATES = {"opened": "open", "merged": "merged", "closed": "closed", "locked": "open"}
+# Project ids don't change when projects are renamed or moved
+PROJECT_ID_TTL_SECONDS = 30 * 86400
+
 
 def handle_gitlab_errors(func):
     """
-    Decorator to handle GitLab errors and print meaningful error messages.
+    Decorator to turn GitLab errors into BackendError with meaningful error messages.
 
     :param func: The function to wrap.
     :return: The wrapped function.
@@ -23,8 +34,7 @@ def handle_gitlab_errors(func):
             if len(error_message) == 1:
                 error_message = error_message[0]
 
-            click.echo(error_message)
-            sys.exit(1)
+            raise BackendError(GITLAB_BACKEND, str(error_message), e.response_code) from e
 
     return wrapper
 
@@ -33,27 +43,48 @@ class GitlabVcs(VCSInterface):
     """
     GitlabVcs class implements the VCSInterface for GitLab.
     """
-    _instance = None
 
     def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super(GitlabVcs, cls).__new__(cls)
-            cls._instance.__init_gitlab_client()
-        return cls._instance
+        return get_singleton(cls, GitlabVcs.__init_gitlab_client)
 
 
     @handle_gitlab_errors
     def __init_gitlab_client(self):
         config = Config()
-        self.gitlab_client = gitlab.Gitlab(config.git_url, private_token=config.git_token)
-        self.gitlab_client.auth()
-        self.gitlab_project = self.gitlab_client.projects.get(config.git_proj)
+        # Retries are handled by call_remote, within the command time budget
+        self.gitlab_client = gitlab.Gitlab(config.git_url, private_token=config.git_token,
+                                           timeout=config.timeout or None, retry_transient_errors=False)
+        call_remote(GITLAB_BACKEND, "auth", self.gitlab_client.auth, idempotent=True)
+        self.user_ids = {}
+        self.gitlab_project = self.__get_project(config.git_proj)
+
+
+    def __get_project(self, path):
+        """
+        Get a project by path. Its id is cached, so that later invocations get the project lazily, without a request.
+
+        :param path: The project path (e.g. group/project).
+        :return: The GitLab project.
+        """
+        cache = MetadataCache()
+        project_key = f"{self.gitlab_client.url}/{path}"
+        cached_project = cache.get_project(project_key, PROJECT_ID_TTL_SECONDS)
+        if cached_project and cached_project.get("id"):
+            return self.gitlab_client.projects.get(cached_project["id"], lazy=True)
+
+        project = call_remote(GITLAB_BACKEND, "projects.get", self.gitlab_client.projects.get, path, idempotent=True)
+        cache.set_project(project_key, id=project.id)
+        return project
 
 
     @handle_gitlab_errors
     def __get_user_id_by_name(self, name):
-        users = self.gitlab_client.users.list(search=name)
+        if name in self.user_ids:
+            return self.user_ids[name]
+
+        users = call_remote(GITLAB_BACKEND, "users.list", self.gitlab_client.users.list, search=name, idempotent=True)
         if users:
+            self.user_ids[name] = users[0].id
             return users[0].id
         else:
             raise ValueError(f"User with name '{name}' not found.")
@@ -65,32 +96,200 @@ class GitlabVcs(VCSInterface):
 
 
     @handle_gitlab_errors
-    def create_pull_request(self, source_branch, target_branch, title, reviewer):
+    def create_pull_request(self, source_branch, target_branch, title, reviewer, description=None):
         """
         Create a merge request in GitLab.
 
         :param source_branch: The source branch for the merge request.
         :param target_branch: The target branch for the merge request.
         :param title: The title of the merge request.
-        :param reviewer: The reviewer for the merge request.
+        :param reviewer: The reviewer username for the merge request, or a list of reviewer usernames.
+        :param description: The description of the merge request (Markdown), or None.
         :return: The created merge request link.
         """
+        reviewers = reviewer if isinstance(reviewer, list) else [reviewer]
         mr_data = {
             'source_branch': source_branch,
             'target_branch': target_branch,
             'title': title,
-            'reviewer_ids': [self.__get_user_id_by_name(reviewer)],
+            'reviewer_ids': [self.__get_user_id_by_name(name) for name in reviewers],
             'assignee_id': self.__get_current_user_id()
         }
+        if description:
+            mr_data['description'] = description
 
         try:
-            merge_request = self.gitlab_project.mergerequests.create(mr_data)
+            merge_request = call_remote(GITLAB_BACKEND, "mergerequests.create",
+                                        self.gitlab_project.mergerequests.create, mr_data)
         except gitlab.exceptions.GitlabError as e:
             try:
-                mrs = self.gitlab_project.mergerequests.list(source_branch=source_branch, state="opened")
+                mrs = call_remote(GITLAB_BACKEND, "mergerequests.list", self.gitlab_project.mergerequests.list,
+                                  source_branch=source_branch, state="opened", idempotent=True)
                 click.echo(mrs[0].web_url)
                 raise e
             except (json.JSONDecodeError, TypeError):
                 raise e
 
         return merge_request.web_url
+
+
+    @handle_gitlab_errors
+    def find_open_pull_request(self, source_branch):
+        """
+        Find the open merge request of a source branch in GitLab.
+
+        :param source_branch: The source branch of the merge request.
+        :return: The merge request link, or None if there is no open merge request.
+        """
+        mrs = call_remote(GITLAB_BACKEND, "mergerequests.list", self.gitlab_project.mergerequests.list,
+                          source_branch=source_branch, state="opened", per_page=1, get_all=False, idempotent=True)
+        if mrs:
+            return mrs[0].web_url
+
+        return None
+
+
+    @handle_gitlab_errors
+    def update_pull_request_target(self, source_branch, target_branch):
+        """
+        Retarget the open merge request of a source branch in GitLab.
+
+        :param source_branch: The source branch of the merge request.
+        :param target_branch: The new target branch of the merge request.
+        :return: The merge request link, or None if there is no open merge request.
+        """
+        mrs = call_remote(GITLAB_BACKEND, "mergerequests.list", self.gitlab_project.mergerequests.list,
+                          source_branch=source_branch, state="opened", per_page=1, get_all=False, idempotent=True)
+        if not mrs:
+            return None
+
+        merge_request = mrs[0]
+        if merge_request.target_branch != target_branch:
+            merge_request.target_branch = target_branch
+            call_remote(GITLAB_BACKEND, "mergerequests.save", merge_request.save)
+
+        return merge_request.web_url
+
+
+    def __resolve_code_owner(self, owner):
+        """Resolve a single CODEOWNERS owner to usernames: an email, a user, or the direct members of a group."""
+        if not owner.startswith("@"):
+            users = call_remote(GITLAB_BACKEND, "users.list", self.gitlab_client.users.list, search=owner,
+                                idempotent=True)[:1]
+        else:
+            users = call_remote(GITLAB_BACKEND, "users.list", self.gitlab_client.users.list, username=owner[1:],
+                                idempotent=True)
+            if not users:
+                group = self.gitlab_client.groups.get(owner[1:], lazy=True)
+                users = call_remote(GITLAB_BACKEND, "groups.members.list", group.members.list, get_all=True,
+                                    idempotent=True)
+
+        # Keep the ids, so creating the merge request doesn't look the reviewers up again
+        for user in users:
+            self.user_ids[user.username] = user.id
+        return [user.username for user in users]
+
+    @handle_gitlab_errors
+    def resolve_code_owners(self, owners):
+        """
+        Resolve CODEOWNERS owners (users, groups and emails) to GitLab usernames, concurrently.
+
+        :param owners: The owners, as written in the CODEOWNERS file.
+        :return: A list of usernames, without the current user.
+        """
+        with ContextThreadPoolExecutor(max_workers=RESOLVE_MAX_WORKERS) as executor:
+            resolved = list(executor.map(self.__resolve_code_owner, owners))
+
+        current_username = self.gitlab_client.user.username
+        usernames = []
+        for names in resolved:
+            usernames.extend(name for name in names if name != current_username and name not in usernames)
+
+        return usernames
+
+
+    @handle_gitlab_errors
+    def get_pull_request_states(self, source_branches, updated_since):
+        """
+        Get the states of the merge requests of many source branches, from a single list of the project's
+        merge requests updated since a timestamp.
+
+        :param source_branches: The source branches of the merge requests.
+        :param updated_since: Only merge requests updated since this timestamp are listed.
+        :return: A dict of source branch to state (open, merged or closed), for the updated merge requests only.
+        """
+        updated_after = datetime.fromtimestamp(updated_since, timezone.utc).isoformat()
+        mrs = call_remote(GITLAB_BACKEND, "mergerequests.list", self.gitlab_project.mergerequests.list,
+                          state="all", updated_after=updated_after, order_by="updated_at", sort="desc",
+                          get_all=True, idempotent=True)
+
+        source_branches = set(source_branches)
+        states = {}
+        for mr in mrs:
+            # Most recently updated first: an older merge request of the same branch doesn't override the newest
+            if mr.source_branch in source_branches and mr.source_branch not in states:
+                states[mr.source_branch] = MERGE_REQUEST_STATES.get(mr.state, mr.state)
+        return states
+
+    @handle_gitlab_errors
+    def list_my_open_pull_requests(self):
+        """
+        List the open merge requests of the project authored by the current user.
+
+        :return: A dict of source branch to merge request link.
+        """
+        mrs = call_remote(GITLAB_BACKEND, "mergerequests.list", self.gitlab_project.mergerequests.list,
+                          state="opened", author_id=self.__get_current_user_id(), get_all=True, idempotent=True)
+        return {mr.source_branch: mr.web_url for mr in mrs}
+
+    @handle_gitlab_errors
+    def get_group_members(self, group):
+        """
+        List the members of a GitLab group, including inherited members.
+
+        :param group: The group path.
+        :return: A list of usernames, without the current user.
+        """
+        gitlab_group = self.gitlab_client.groups.get(group.lstrip("@"), lazy=True)
+        members = call_remote(GITLAB_BACKEND, "groups.members_all.list", gitlab_group.members_all.list,
+                              get_all=True, idempotent=True)
+        for member in members:
+            self.user_ids[member.username] = member.id
+        current_username = self.gitlab_client.user.username
+        return [member.username for member in members
+                if member.state == "active" and member.username != current_username]
+
+    def __count_open_reviews(self, username):
+        # A single-item page is enough, the total count comes in the response headers
+        mrs = call_remote(GITLAB_BACKEND, "mergerequests.list", self.gitlab_client.mergerequests.list,
+                          state="opened", scope="all", reviewer_username=username, per_page=1, iterator=True,
+                          idempotent=True)
+        return mrs.total if mrs.total is not None else len(list(mrs))
+
+    @handle_gitlab_errors
+    def count_open_reviews(self, usernames):
+        """
+        Count the open merge requests awaiting the review of each user, across the GitLab instance.
+        Each user's count costs a single-item request, and the users are counted concurrently.
+
+        :param usernames: The usernames.
+        :return: A dict of username to number of open review requests.
+        """
+        with ContextThreadPoolExecutor(max_workers=RESOLVE_MAX_WORKERS) as executor:
+            counts = executor.map(self.__count_open_reviews, usernames)
+            return dict(zip(usernames, counts))
+
+
+    def for_project(self, project):
+        """
+        Get a GitLab VCS object for another project, sharing the client and the user ids lookups.
+
+        :param project: The project path (e.g. group/project).
+        :return: The GitlabVcs object of the project.
+        """
+        project_vcs = copy.copy(self)
+        cached_project = MetadataCache().get_project(f"{self.gitlab_client.url}/{project}", PROJECT_ID_TTL_SECONDS)
+        # A lazy project doesn't cost a request, a missing project fails its first call instead
+        project_id = cached_project.get("id") if cached_project else None
+        project_vcs.gitlab_project = self.gitlab_client.projects.get(project_id or project, lazy=True)
+        return project_vcs
@@ -7,14 +7,99 @@ class VCSInterface(ABC):
     """
 
     @abstractmethod
-    def create_pull_request(self, source_branch, target_branch, title, reviewer):
+    def create_pull_request(self, source_branch, target_branch, title, reviewer, description=None):
         """
         Create a pull request.
 
         :param source_branch: The source branch for the pull request.
         :param target_branch: The target branch for the pull request.
         :param title: The title of the pull request.
-        :param reviewer: The reviewer for the pull request.
+        :param reviewer: The reviewer username for the pull request, or a list of reviewer usernames.
+        :param description: The description of the pull request (Markdown), or None.
         :return: The created pull request link.
         """
         pass
+
+    @abstractmethod
+    def find_open_pull_request(self, source_branch):
+        """
+        Find the open pull request of a source branch.
+
+        :param source_branch: The source branch of the pull request.
+        :return: The pull request link, or None if there is no open pull request.
+        """
+        pass
+
+    @abstractmethod
+    def update_pull_request_target(self, source_branch, target_branch):
+        """
+        Retarget the open pull request of a source branch.
+
+        :param source_branch: The source branch of the pull request.
+        :param target_branch: The new target branch of the pull request.
+        :return: The pull request link, or None if there is no open pull request.
+        """
+        pass
+
+    @abstractmethod
+    def resolve_code_owners(self, owners):
+        """
+        Resolve CODEOWNERS owners (users, groups or teams, and emails) to reviewer usernames.
+        The current user is excluded, since authors can't review their own pull requests.
+
+        :param owners: The owners, as written in the CODEOWNERS file (e.g. @user, @group/team, user@example.com).
+        :return: A list of usernames.
+        """
+        pass
+
+    @abstractmethod
+    def get_pull_request_states(self, source_branches, updated_since):
+        """
+        Get the states of the pull requests of many source branches with a single list query
+        of the pull requests updated since a timestamp.
+
+        :param source_branches: The source branches of the pull requests.
+        :param updated_since: Only pull requests updated since this timestamp are listed.
+        :return: A dict of source branch to state (open, merged or closed), for the updated pull requests only.
+        """
+        pass
+
+    @abstractmethod
+    def list_my_open_pull_requests(self):
+        """
+        List the open pull requests authored by the current user.
+
+        :return: A dict of source branch to pull request link.
+        """
+        pass
+
+    @abstractmethod
+    def get_group_members(self, group):
+        """
+        List the members of a reviewer group.
+
+        :param group: The group (a GitLab group path, or a GitHub org/team slug).
+        :return: A list of usernames, without the current user.
+        """
+        pass
+
+    @abstractmethod
+    def count_open_reviews(self, usernames):
+        """
+        Count the open pull requests awaiting the review of each user.
+
+        :param usernames: The usernames.
+        :return: A dict of username to number of open review requests.
+        """
+        pass
+
+    @abstractmethod
+    def for_project(self, project):
+        """
+        Get a VCS object for another project of the same server, sharing this object's client and user lookups.
+        The project isn't fetched, so getting it doesn't cost a request.
+
+        :param project: The project path (e.g. group/project or owner/repository).
+        :return: The VCS object of the project.
+        """
+        pass
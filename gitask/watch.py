@@ -0,0 +1,158 @@
+import fcntl
+import json
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+import click
+
+from gitask.config.config import Config
+from gitask.errors import GitaskError, InvalidTransitionError
+from gitask.transport import Deadline
+
+WATCH_LIST_FILE_NAME = "watch.json"
+WATCH_LIST_LOCK_FILE_NAME = "watch-list.lock"
+WATCHER_LOCK_FILE_NAME = "watch.lock"
+MIN_POLL_INTERVAL_SECONDS = 15
+MAX_POLL_INTERVAL_SECONDS = 300
+# Margin for clock skew between the local machine and the VCS server
+POLL_OVERLAP_SECONDS = 60
+
+MERGED_STATE = "merged"
+CLOSED_STATE = "closed"
+
+
+class WatchList:
+    """
+    Pull requests waiting to be merged, persisted in the cache directory so that watching survives
+    restarts and sleep: the next poll lists every pull request updated since the last successful poll.
+    """
+
+    def __init__(self, path, data):
+        self.path = path
+        self.pull_requests = data.get("pull_requests", {})
+        self.polled_at = data.get("polled_at")
+
+    @staticmethod
+    @contextmanager
+    def edit():
+        """Read the watch list and save it back on exit, holding a lock against concurrent edits."""
+        cache_dir = Config().cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+        path = os.path.join(cache_dir, WATCH_LIST_FILE_NAME)
+
+        with open(os.path.join(cache_dir, WATCH_LIST_LOCK_FILE_NAME), "w") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                with open(path, "r") as watch_file:
+                    data = json.load(watch_file)
+            except (FileNotFoundError, json.JSONDecodeError):
+                data = {}
+
+            watch_list = WatchList(path, data)
+            yield watch_list
+            watch_list.__save()
+
+    def __save(self):
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path), prefix=".watch-")
+        with os.fdopen(fd, "w") as tmp_file:
+            json.dump({"pull_requests": self.pull_requests, "polled_at": self.polled_at}, tmp_file)
+        os.replace(tmp_path, self.path)
+
+    def add(self, branch, issue_key, pull_request):
+        """Watch the pull request of a branch, to move its ticket to done when it's merged."""
+        self.pull_requests[branch] = {"ticket": issue_key, "pull_request": pull_request, "added_at": time.time()}
+
+    def updated_since(self):
+        """:return: The timestamp since which pull request updates haven't been seen yet."""
+        if self.polled_at is None:
+            return min(entry["added_at"] for entry in self.pull_requests.values()) - POLL_OVERLAP_SECONDS
+        # Pull requests added since are open when added, so their merge is an update after the last poll
+        return self.polled_at - POLL_OVERLAP_SECONDS
+
+
+def run_watcher(vcs, on_merged, until_branch=None, once=False):
+    """
+    Poll the watched pull requests until none is left, calling on_merged for each merged one.
+
+    A single watcher process polls all watched pull requests, with one list query per poll whatever their number.
+    The polling interval starts short, doubles while nothing happens to the watched pull requests or polls fail,
+    and is reset as soon as one of them is updated. A failed poll or transition keeps the pull requests watched,
+    and the next poll covers the same window again.
+
+    :param vcs: The version control system object.
+    :param on_merged: Called with the branch and its watch entry when a pull request is merged.
+    :param until_branch: Stop once this branch isn't watched anymore, instead of when none is left.
+    :param once: Poll only once.
+    :return: False if another watcher process is already running, True otherwise.
+    """
+    cache_dir = Config().cache_dir
+    os.makedirs(cache_dir, exist_ok=True)
+
+    with open(os.path.join(cache_dir, WATCHER_LOCK_FILE_NAME), "w") as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+
+        interval = MIN_POLL_INTERVAL_SECONDS
+        while True:
+            # Re-read the list every poll: other commands may have added pull requests to it
+            with WatchList.edit() as watch_list:
+                pull_requests = dict(watch_list.pull_requests)
+                updated_since = watch_list.updated_since() if pull_requests else None
+
+            if not pull_requests or (until_branch is not None and until_branch not in pull_requests):
+                return True
+
+            polled_at = time.time()
+            failed = False
+            resolved = {}
+            # Each poll gets its own time and retry budget, the watcher outlives the command's one
+            deadline_token = Deadline.start_operation()
+            try:
+                try:
+                    states = vcs.get_pull_request_states(list(pull_requests), updated_since)
+                except (GitaskError, OSError) as e:
+                    # e.g. the network isn't back yet after a sleep, the next poll retries the same window
+                    click.echo(f"Failed to poll the watched pull requests, retrying later: {e}", err=True)
+                    states = {}
+                    failed = True
+
+                for branch, state in states.items():
+                    entry = pull_requests[branch]
+                    if state == MERGED_STATE:
+                        click.echo(f"{branch}: pull request merged ({entry['pull_request']}).")
+                        try:
+                            on_merged(branch, entry)
+                        except InvalidTransitionError as e:
+                            # e.g. already moved to done by hand, retrying wouldn't help
+                            click.echo(f"{branch}: {entry['ticket']} not moved to done: {e}", err=True)
+                        except (GitaskError, OSError) as e:
+                            # Still watched, the merge is seen again by the next poll of the same window
+                            click.echo(f"{branch}: failed to move {entry['ticket']} to done, retrying later: {e}",
+                                       err=True)
+                            failed = True
+                            continue
+                        resolved[branch] = entry
+                    elif state == CLOSED_STATE:
+                        click.echo(f"{branch}: pull request closed without merging, no longer watched.")
+                        resolved[branch] = entry
+            finally:
+                Deadline.end_operation(deadline_token)
+
+            with WatchList.edit() as watch_list:
+                for branch in resolved:
+                    watch_list.pull_requests.pop(branch, None)
+                if not failed:
+                    watch_list.polled_at = polled_at
+
+            if once:
+                return True
+
+            if states and not failed:
+                interval = MIN_POLL_INTERVAL_SECONDS
+            else:
+                interval = min(interval * 2, MAX_POLL_INTERVAL_SECONDS)
+            time.sleep(interval)
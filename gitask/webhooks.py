@@ -0,0 +1,307 @@
+import contextvars
+import hashlib
+import hmac
+import json
+import queue
+import subprocess
+import threading
+import time
+from collections import OrderedDict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import click
+
+from gitask.config.config import Config
+from gitask.errors import GitaskError
+from gitask.scope import ContextThreadPoolExecutor
+from gitask.transport import Deadline
+from gitask.utils import Utils
+
+SEEN_DELIVERIES_LIMIT = 10000
+MAX_BODY_SIZE = 25 * 1024 * 1024
+
+GITLAB_MR_ACTIONS = {"open": Config.IN_REVIEW_PROP_NAME, "reopen": Config.IN_REVIEW_PROP_NAME,
+                     "merge": Config.DONE_PROP_NAME}
+GITHUB_PR_ACTIONS = {"opened": Config.IN_REVIEW_PROP_NAME, "reopened": Config.IN_REVIEW_PROP_NAME,
+                     "ready_for_review": Config.IN_REVIEW_PROP_NAME}
+
+
+def _log(message):
+    click.echo(f"[{time.strftime('%H:%M:%S')}] {message}")
+
+
+class WebhookEvent:
+    """A pull request event mapped to the status group its ticket should move to."""
+
+    def __init__(self, delivery_id, branch, status_group, description):
+        self.delivery_id = delivery_id
+        self.branch = branch
+        self.status_group = status_group
+        self.description = description
+
+
+def _get_header(headers, name):
+    """Get a header case-insensitively, from a dict of recorded headers or an HTTP message."""
+    for key, value in headers.items():
+        if key.lower() == name.lower():
+            return value
+    return None
+
+
+def verify_signature(headers, body, secret):
+    """
+    Verify that a delivery was sent by the VCS: GitLab sends the secret token as is,
+    GitHub sends an HMAC-SHA256 signature of the body.
+
+    :return: True if the delivery is authentic.
+    """
+    gitlab_token = _get_header(headers, "X-Gitlab-Token")
+    if gitlab_token is not None:
+        return hmac.compare_digest(gitlab_token.encode('utf-8'), secret.encode('utf-8'))
+
+    github_signature = _get_header(headers, "X-Hub-Signature-256")
+    if github_signature is not None:
+        expected = "sha256=" + hmac.new(secret.encode('utf-8'), body, hashlib.sha256).hexdigest()
+        return hmac.compare_digest(github_signature.encode('utf-8'), expected.encode('utf-8'))
+
+    return False
+
+
+def parse_event(headers, body):
+    """
+    Map a GitLab merge request or GitHub pull_request delivery to a ticket transition.
+
+    :param headers: The delivery headers.
+    :param body: The raw delivery body.
+    :return: A WebhookEvent, or None if the event doesn't move tickets.
+    """
+    payload = json.loads(body)
+
+    if _get_header(headers, "X-Gitlab-Event") is not None:
+        if payload.get("object_kind") != "merge_request":
+            return None
+        attributes = payload["object_attributes"]
+        action = attributes.get("action")
+        status_group = GITLAB_MR_ACTIONS.get(action)
+        if status_group is None:
+            return None
+        delivery_id = (_get_header(headers, "X-Gitlab-Event-UUID") or _get_header(headers, "Idempotency-Key")
+                       or f"{attributes['id']}:{action}:{attributes.get('updated_at')}")
+        return WebhookEvent(delivery_id, attributes["source_branch"], status_group,
+                            f"merge request !{attributes.get('iid')} {action}")
+
+    if _get_header(headers, "X-GitHub-Event") == "pull_request":
+        pull_request = payload["pull_request"]
+        action = payload.get("action")
+        if action == "closed":
+            status_group = Config.DONE_PROP_NAME if pull_request.get("merged") else None
+            action = "merged" if status_group else action
+        elif pull_request.get("draft"):
+            status_group = None
+        else:
+            status_group = GITHUB_PR_ACTIONS.get(action)
+        if status_group is None:
+            return None
+        delivery_id = _get_header(headers, "X-GitHub-Delivery") or f"{pull_request['id']}:{action}"
+        return WebhookEvent(delivery_id, pull_request["head"]["ref"], status_group,
+                            f"pull request #{pull_request.get('number')} {action}")
+
+    return None
+
+
+class TicketWorkerPool:
+    """
+    Bounded worker pool processing the events of each ticket in order.
+
+    Events of a ticket that is being processed are queued behind it, and since only the latest status matters,
+    a burst of queued events of a ticket (e.g. opened then merged) is collapsed into its last event.
+    """
+
+    def __init__(self, handler, max_workers):
+        self.handler = handler
+        self.executor = ContextThreadPoolExecutor(max_workers=max_workers)
+        self.pending = {}
+        self.lock = threading.Lock()
+
+    def submit(self, issue_key, event):
+        with self.lock:
+            if issue_key in self.pending:
+                self.pending[issue_key].append(event)
+                return
+            self.pending[issue_key] = deque()
+
+        self.executor.submit(self.__run, issue_key, event)
+
+    def __run(self, issue_key, event):
+        while True:
+            # Each event gets its own time and retry budget, the server outlives the command's one
+            deadline_token = Deadline.start_operation()
+            try:
+                self.handler(issue_key, event)
+            except Exception as e:
+                _log(f"{issue_key}: failed to handle {event.description}: {e}")
+            finally:
+                Deadline.end_operation(deadline_token)
+
+            with self.lock:
+                queued = self.pending[issue_key]
+                if not queued:
+                    del self.pending[issue_key]
+                    return
+                skipped = len(queued) - 1
+                event = queued[-1]
+                queued.clear()
+
+            if skipped:
+                _log(f"{issue_key}: skipped {skipped} superseded events")
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
+
+
+class WebhookProcessor:
+    """
+    Verifies, deduplicates and queues webhook deliveries, and applies their ticket transitions asynchronously.
+
+    Deliveries are acknowledged as soon as they are queued. A dispatcher thread resolves the ticket of each
+    event's branch and hands it to a TicketWorkerPool, so transitions run concurrently across tickets
+    but in order for each ticket.
+    """
+
+    def __init__(self, pmt, secret, max_workers, dry_run=False):
+        """
+        :param pmt: The project management tool object, unused in dry run.
+        :param secret: The webhook secret token.
+        :param max_workers: The maximum number of tickets transitioned concurrently.
+        :param dry_run: Flag to only log the transitions.
+        """
+        self.pmt = pmt
+        self.secret = secret
+        self.dry_run = dry_run
+        self.events = queue.Queue()
+        self.seen_deliveries = OrderedDict()
+        self.seen_lock = threading.Lock()
+        self.workers = TicketWorkerPool(self.__transition, max_workers)
+        # The dispatcher runs in a copy of the creator's context, so it keeps its active scope as the workers do
+        self.dispatcher = threading.Thread(target=contextvars.copy_context().run, args=(self.__dispatch,), daemon=True)
+        self.dispatcher.start()
+
+    def handle_delivery(self, headers, body):
+        """
+        Handle a webhook delivery.
+
+        :param headers: The delivery headers.
+        :param body: The raw delivery body.
+        :return: The HTTP status code of the response.
+        """
+        if not verify_signature(headers, body, self.secret):
+            return 401
+
+        try:
+            event = parse_event(headers, body)
+        except (ValueError, KeyError, TypeError, AttributeError):
+            return 400
+        if event is None:
+            return 200
+
+        with self.seen_lock:
+            if event.delivery_id in self.seen_deliveries:
+                return 200
+            self.seen_deliveries[event.delivery_id] = True
+            if len(self.seen_deliveries) > SEEN_DELIVERIES_LIMIT:
+                self.seen_deliveries.popitem(last=False)
+
+        self.events.put(event)
+        return 202
+
+    def __dispatch(self):
+        utils = Utils()
+        while True:
+            event = self.events.get()
+            if event is None:
+                return
+            try:
+                issue_key = utils.get_branch_ticket(event.branch)
+                if issue_key:
+                    self.workers.submit(issue_key, event)
+            except (subprocess.CalledProcessError, ValueError) as e:
+                _log(f"{event.branch}: no ticket for {event.description}: {e}")
+            except Exception as e:
+                # An unexpected error (e.g. writing the cache) must not stop the dispatcher, later events still count
+                _log(f"{event.branch}: failed to dispatch {event.description}: {e}")
+
+    def __transition(self, issue_key, event):
+        config = Config()
+        statuses = {
+            Config.IN_REVIEW_PROP_NAME: config.in_review_statuses,
+            Config.DONE_PROP_NAME: config.done_statuses,
+        }[event.status_group]
+        if not statuses:
+            _log(f"{issue_key}: no {event.status_group} statuses configured, ignoring {event.description}")
+            return
+
+        if self.dry_run:
+            _log(f"{issue_key}: {event.description}, would move to {event.status_group}")
+            return
+
+        try:
+            transition = self.pmt.find_valid_status_transition(issue_key, statuses)
+        except GitaskError as e:
+            _log(f"{issue_key}: {event.description}, not moved to {event.status_group}: {e}")
+            return
+
+        self.pmt.update_ticket_status(issue_key, transition)
+        _log(f"{issue_key}: {event.description}, '{transition}' transition succeeded.")
+
+    def close(self):
+        """Stop accepting events and wait for the queued ones to be processed."""
+        self.events.put(None)
+        self.dispatcher.join()
+        self.workers.shutdown()
+
+
+def replay_deliveries(processor, paths):
+    """
+    Feed recorded deliveries to a processor, e.g. to test the mapping without a VCS.
+    Each file holds a {"headers": {...}, "body": {...}} JSON document.
+    """
+    for path in paths:
+        with open(path, "r") as delivery_file:
+            delivery = json.load(delivery_file)
+
+        body = delivery["body"]
+        if not isinstance(body, str):
+            body = json.dumps(body)
+        status = processor.handle_delivery(delivery["headers"], body.encode('utf-8'))
+        _log(f"{path}: {status}")
+
+
+def serve(processor, host, port):
+    """Serve the webhook deliveries over HTTP until interrupted."""
+
+    class WebhookRequestHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            if length > MAX_BODY_SIZE:
+                self.send_response(413)
+                self.end_headers()
+                return
+
+            status = processor.handle_delivery(self.headers, self.rfile.read(length))
+            self.send_response(status)
+            self.end_headers()
+
+        def log_message(self, format, *args):
+            # Only the processed events are logged
+            pass
+
+    server = ThreadingHTTPServer((host, port), WebhookRequestHandler)
+    server.daemon_threads = True
+    _log(f"Listening for webhooks on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        processor.close()
@@ -0,0 +1,27 @@
+import pytest
+
+from gitask.config.config import Config
+from gitask.scope import Scope
+
+BASE_CONFIG = {
+    Config.PMT_TYPE_PROP_NAME: "jira",
+    Config.VCS_TYPE_PROP_NAME: "gitlab",
+    Config.GIT_PROJECT_PROP_NAME: "group/project",
+    # Resolves PROJ-7 from a branch named PROJ-7-description
+    Config.CURRENT_TICKET_PROP_NAME: "sh -c 'echo \"$0\" | cut -d- -f1,2'",
+    Config.CURRENT_TICKET_ACCEPTS_BRANCH_PROP_NAME: True,
+    Config.TO_DO_PROP_NAME: ["To Do"],
+    Config.IN_PROGRESS_PROP_NAME: ["In Progress"],
+    Config.IN_REVIEW_PROP_NAME: ["In Review"],
+    Config.DONE_PROP_NAME: ["Done"],
+}
+
+
+@pytest.fixture
+def config(tmp_path):
+    """Activate a scope with a test configuration and an empty metadata cache, independent of the user's ones."""
+    scope = Scope()
+    scope.set_instance(Config, Config.from_dict(BASE_CONFIG, {Config.CACHE_DIR_ENV_VAR: str(tmp_path / "cache")}))
+    token = scope.activate()
+    yield Config()
+    Scope.deactivate(token)
@@ -0,0 +1,52 @@
+import pytest
+
+from gitask.cascade import get_cascade_levels, parse_cascade
+
+
+def test_parse_cascade():
+    assert parse_cascade("subtasks") == (True, [])
+    assert parse_cascade("links:blocks") == (False, ["blocks"])
+    assert parse_cascade(" subtasks , links:is blocked by,links:relates ") == (True, ["is blocked by", "relates"])
+
+
+@pytest.mark.parametrize("value", ["links:", "children", "subtasks,epics"])
+def test_parse_cascade_rejects_unknown_items(value):
+    with pytest.raises(ValueError):
+        parse_cascade(value)
+
+
+def test_children_close_before_their_parents(config):
+    graph = {
+        "PROJ-1": {"status": "In Progress", "children": ["PROJ-2", "PROJ-3"]},
+        "PROJ-2": {"status": "In Review", "children": ["PROJ-4"]},
+        "PROJ-3": {"status": "To Do", "children": []},
+        "PROJ-4": {"status": "In Progress", "children": []},
+    }
+    assert get_cascade_levels(graph, "PROJ-1") == [["PROJ-4"], ["PROJ-2", "PROJ-3"], ["PROJ-1"]]
+
+
+def test_shared_child_closes_with_its_deepest_parent(config):
+    graph = {
+        "PROJ-1": {"status": "In Progress", "children": ["PROJ-2", "PROJ-3"]},
+        "PROJ-2": {"status": "In Progress", "children": ["PROJ-3"]},
+        "PROJ-3": {"status": "In Progress", "children": []},
+    }
+    assert get_cascade_levels(graph, "PROJ-1") == [["PROJ-3"], ["PROJ-2"], ["PROJ-1"]]
+
+
+def test_done_and_unfetched_issues_are_left_out(config):
+    graph = {
+        "PROJ-1": {"status": "In Progress", "children": ["PROJ-2", "PROJ-3", "OTHER-9"]},
+        "PROJ-2": {"status": "done", "children": []},
+        "PROJ-3": {"status": "To Do", "children": []},
+    }
+    assert get_cascade_levels(graph, "PROJ-1") == [["PROJ-3"], ["PROJ-1"]]
+
+
+def test_cycles_terminate(config):
+    graph = {
+        "PROJ-1": {"status": "In Progress", "children": ["PROJ-2"]},
+        "PROJ-2": {"status": "In Progress", "children": ["PROJ-1"]},
+    }
+    levels = get_cascade_levels(graph, "PROJ-1")
+    assert sorted(key for level in levels for key in level) == ["PROJ-1", "PROJ-2"]
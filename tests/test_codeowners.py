@@ -0,0 +1,90 @@
+import pickle
+
+from gitask.codeowners import CodeOwners
+
+GITHUB_CODEOWNERS = """
+# Default owners
+*                   @org/core
+*.js                @web-lead
+/docs/              @docs-team
+docs/*.md           @writer
+build/logs/         @ops
+/src/api/**/auth.py @security
+My\\ Folder/         @spacey
+README.md           @writer # inline comment
+"""
+
+GITLAB_CODEOWNERS = """
+[Backend] @backend-lead
+/server/
+!/server/generated/
+
+^[Frontend][2] @frontend-lead
+*.ts
+/server/templates/ @designer
+"""
+
+
+def test_last_matching_rule_wins():
+    code_owners = CodeOwners.parse(GITHUB_CODEOWNERS)
+    assert code_owners.get_path_owners("app/main.py") == ["@org/core"]
+    assert code_owners.get_path_owners("web/index.js") == ["@web-lead"]
+    assert code_owners.get_path_owners("README.md") == ["@writer"]
+
+
+def test_anchored_directory_and_glob_levels():
+    code_owners = CodeOwners.parse(GITHUB_CODEOWNERS)
+    assert code_owners.get_path_owners("docs/guide/intro.txt") == ["@docs-team"]
+    # docs/*.md only owns the files directly in docs
+    assert code_owners.get_path_owners("docs/index.md") == ["@writer"]
+    assert code_owners.get_path_owners("docs/guide/index.md") == ["@docs-team"]
+    assert code_owners.get_path_owners("other/docs/index.md") == ["@org/core"]
+
+
+def test_double_star_and_middle_slash_patterns():
+    code_owners = CodeOwners.parse(GITHUB_CODEOWNERS)
+    assert code_owners.get_path_owners("src/api/auth.py") == ["@security"]
+    assert code_owners.get_path_owners("src/api/v2/users/auth.py") == ["@security"]
+    # A middle slash anchors the pattern to the repository root
+    assert code_owners.get_path_owners("build/logs/today.log") == ["@ops"]
+    assert code_owners.get_path_owners("sub/build/logs/today.log") == ["@org/core"]
+
+
+def test_escaped_spaces():
+    code_owners = CodeOwners.parse(GITHUB_CODEOWNERS)
+    assert code_owners.get_path_owners("My Folder/file.txt") == ["@spacey"]
+
+
+def test_gitlab_sections_are_combined():
+    code_owners = CodeOwners.parse(GITLAB_CODEOWNERS)
+    assert code_owners.get_path_owners("server/app.ts") == ["@frontend-lead", "@backend-lead"]
+    assert code_owners.get_path_owners("server/main.py") == ["@backend-lead"]
+    assert code_owners.get_path_owners("server/templates/page.html") == ["@designer", "@backend-lead"]
+
+
+def test_gitlab_exclusion():
+    code_owners = CodeOwners.parse(GITLAB_CODEOWNERS)
+    assert code_owners.get_path_owners("server/generated/schema.py") == []
+    assert code_owners.get_path_owners("server/generated/schema.ts") == ["@frontend-lead"]
+
+
+def test_get_owners_orders_by_owned_paths():
+    code_owners = CodeOwners.parse(GITHUB_CODEOWNERS)
+    owners = code_owners.get_owners(["a.js", "b.js", "docs/index.md", "c.js"])
+    assert owners == ["@web-lead", "@writer"]
+
+
+def test_indexed_matching_agrees_with_every_rule():
+    code_owners = CodeOwners.parse(GITHUB_CODEOWNERS)
+    paths = ["app/main.py", "web/index.js", "docs/a/b.md", "src/api/v2/auth.py", "build/logs/x", "README.md",
+             "My Folder/x", "lib/README.md/notes.txt"]
+    for path in paths:
+        expected = next((rule.owners for rule in reversed(code_owners.rules) if rule.matches(path)), [])
+        assert code_owners.get_path_owners(path) == expected, path
+
+
+def test_matcher_survives_pickling():
+    code_owners = CodeOwners.parse(GITHUB_CODEOWNERS)
+    code_owners.get_path_owners("web/index.js")
+    restored = pickle.loads(pickle.dumps(code_owners))
+    assert restored.get_path_owners("web/index.js") == ["@web-lead"]
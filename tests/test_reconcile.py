@@ -0,0 +1,87 @@
+import json
+import os
+import time
+
+import pytest
+
+from gitask import reconcile
+from gitask.cache import MetadataCache
+from gitask.config.config import Config
+from gitask.errors import InvalidTransitionError
+from gitask.reconcile import plan_status_changes
+
+EXISTING_BRANCHES = {"main", "PROJ-1-open", "PROJ-2-merged", "PROJ-3-no-pull-request", "PROJ-5-closed",
+                     "PROJ-8-reopened", "PROJ-9-blocked"}
+PULL_REQUEST_STATES = {"PROJ-1-open": "open", "PROJ-2-merged": "merged", "PROJ-5-closed": "closed",
+                       "PROJ-7-deleted-merged": "merged", "PROJ-8-reopened": "open", "PROJ-9-blocked": "open"}
+STATUSES = {"PROJ-1": "In Progress", "PROJ-2": "In Review", "PROJ-4": "In Progress", "PROJ-5": "In Progress",
+            "PROJ-7": "In Review", "PROJ-8": "Done", "PROJ-9": "In Progress"}
+
+
+class FakeVcs:
+    def __init__(self):
+        self.requested_branches = None
+
+    def get_pull_request_states(self, branches, since):
+        self.requested_branches = branches
+        return {branch: state for branch, state in PULL_REQUEST_STATES.items() if branch in branches}
+
+
+class FakePmt:
+    def get_issues_statuses(self, issue_keys):
+        return {key: STATUSES[key] for key in issue_keys}
+
+    def find_valid_status_transition(self, issue_key, statuses):
+        if issue_key == "PROJ-9":
+            raise InvalidTransitionError(issue_key, STATUSES[issue_key])
+        return statuses[0]
+
+
+@pytest.fixture
+def cached_branches(config, monkeypatch):
+    """Branches deleted since they were cached: a recent one without a pull request, a recent merged one, an old one."""
+    now = time.time()
+    branches = {
+        "PROJ-4-abandoned": {"ticket": "PROJ-4", MetadataCache.FETCHED_AT_KEY: now},
+        "PROJ-7-deleted-merged": {"ticket": "PROJ-7", "pull_request": "7", MetadataCache.FETCHED_AT_KEY: now},
+        "PROJ-6-expired": {"ticket": "PROJ-6", MetadataCache.FETCHED_AT_KEY: now - 90 * 86400},
+    }
+    os.makedirs(config.cache_dir)
+    with open(os.path.join(config.cache_dir, MetadataCache.CACHE_FILE_NAME), "w") as cache_file:
+        json.dump({MetadataCache.BRANCHES_SECTION: branches}, cache_file)
+
+    monkeypatch.setattr(reconcile, "get_branches", lambda: set(EXISTING_BRANCHES))
+
+
+def test_plan_status_changes(cached_branches):
+    changes, errors, deleted_branches = plan_status_changes(FakePmt(), FakeVcs(), lookback_days=30)
+
+    planned = {change.issue_key: (change.target_group, change.transition) for change in changes}
+    assert planned == {
+        "PROJ-1": (Config.IN_REVIEW_PROP_NAME, "In Review"),
+        "PROJ-2": (Config.DONE_PROP_NAME, "Done"),
+        "PROJ-4": (Config.TO_DO_PROP_NAME, "To Do"),
+        "PROJ-7": (Config.DONE_PROP_NAME, "Done"),
+    }
+    assert [issue_key for issue_key, _ in errors] == ["PROJ-9"]
+    assert deleted_branches == {"PROJ-4-abandoned": "PROJ-4", "PROJ-7-deleted-merged": "PROJ-7"}
+
+
+def test_only_branches_with_pull_requests_are_resolved(cached_branches):
+    vcs = FakeVcs()
+    plan_status_changes(FakePmt(), vcs, lookback_days=30)
+
+    assert "PROJ-6-expired" not in vcs.requested_branches
+    cached = MetadataCache().get_all_branches()
+    # Resolved tickets are cached, a branch without a pull request isn't resolved
+    assert cached["PROJ-1-open"]["ticket"] == "PROJ-1"
+    assert "PROJ-3-no-pull-request" not in cached
+    assert "main" not in cached
+
+
+def test_expired_deleted_branches_are_pruned(cached_branches):
+    plan_status_changes(FakePmt(), FakeVcs(), lookback_days=30)
+
+    cached = MetadataCache().get_all_branches()
+    assert "PROJ-6-expired" not in cached
+    assert "PROJ-4-abandoned" in cached
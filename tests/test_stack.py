@@ -0,0 +1,68 @@
+import os
+import subprocess
+
+import pytest
+
+from gitask.stack import get_branch_stack
+
+
+def git(*args):
+    subprocess.check_call(["git", *args], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def commit_on(branch, message):
+    git("checkout", "-q", branch)
+    git("commit", "-q", "--allow-empty", "-m", message)
+
+
+@pytest.fixture
+def repo(tmp_path, monkeypatch):
+    """
+    A repository with the branches:
+    main <- a <- b <- c, a <- d, and merged, which has no commits ahead of main.
+    """
+    monkeypatch.chdir(tmp_path)
+    # Independent of the user's git config, e.g. commit signing
+    monkeypatch.setenv("GIT_CONFIG_GLOBAL", os.devnull)
+    for name in ("AUTHOR", "COMMITTER"):
+        monkeypatch.setenv(f"GIT_{name}_NAME", "Test")
+        monkeypatch.setenv(f"GIT_{name}_EMAIL", "test@example.com")
+
+    git("init", "-q", "-b", "main")
+    git("commit", "-q", "--allow-empty", "-m", "initial")
+    git("branch", "merged")
+    git("branch", "a")
+    commit_on("a", "a1")
+    commit_on("a", "a2")
+    git("branch", "b")
+    git("branch", "d")
+    commit_on("b", "b1")
+    git("branch", "c")
+    commit_on("c", "c1")
+    commit_on("d", "d1")
+    return tmp_path
+
+
+def test_stack_continues_up_a_single_chain(repo):
+    assert get_branch_stack("main", "b") == [("a", "main"), ("b", "a"), ("c", "b")]
+
+
+def test_stack_from_the_top(repo):
+    assert get_branch_stack("main", "c") == [("a", "main"), ("b", "a"), ("c", "b")]
+
+
+def test_stack_stops_below_a_fork(repo):
+    assert get_branch_stack("main", "a") == [("a", "main")]
+    assert get_branch_stack("main", "d") == [("a", "main"), ("d", "a")]
+
+
+def test_branch_without_commits_ahead(repo):
+    with pytest.raises(ValueError):
+        get_branch_stack("main", "merged")
+
+
+def test_branches_at_the_same_tip_share_their_parent(repo):
+    git("branch", "c-copy", "c")
+    stack = get_branch_stack("main", "c-copy")
+    assert stack[:2] == [("a", "main"), ("b", "a")]
+    assert stack[-1] == ("c-copy", "b")
@@ -0,0 +1,155 @@
+import json
+import os
+import threading
+
+from gitask.config.config import Config
+from gitask.webhooks import TicketWorkerPool, WebhookEvent, WebhookProcessor, parse_event, verify_signature
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures", "webhooks")
+SECRET = "test-secret"
+
+
+def load_delivery(name):
+    """Load a recorded delivery as its headers and raw body, as replay_deliveries sends them."""
+    with open(os.path.join(FIXTURES_DIR, f"{name}.json"), "r") as delivery_file:
+        delivery = json.load(delivery_file)
+    return delivery["headers"], json.dumps(delivery["body"]).encode('utf-8')
+
+
+class FakePmt:
+    """Records the transitions, every ticket can move to any status."""
+
+    def __init__(self):
+        self.transitions = []
+        self.lock = threading.Lock()
+
+    def find_valid_status_transition(self, issue_key, statuses):
+        return statuses[0]
+
+    def update_ticket_status(self, issue_key, status):
+        with self.lock:
+            self.transitions.append((issue_key, status))
+
+
+def test_verify_signature_gitlab_token():
+    headers, body = load_delivery("gitlab_merge_request_merged")
+    assert verify_signature(headers, body, SECRET)
+    assert not verify_signature(headers, body, "other-secret")
+
+
+def test_verify_signature_github_hmac():
+    headers, body = load_delivery("github_pull_request_opened")
+    assert verify_signature(headers, body, SECRET)
+    assert not verify_signature(headers, body + b" ", SECRET)
+    assert not verify_signature(headers, body, "other-secret")
+
+
+def test_verify_signature_unsigned():
+    headers, body = load_delivery("github_pull_request_opened")
+    del headers["X-Hub-Signature-256"]
+    assert not verify_signature(headers, body, SECRET)
+
+
+def test_parse_event_gitlab_merge():
+    headers, body = load_delivery("gitlab_merge_request_merged")
+    event = parse_event(headers, body)
+    assert event.delivery_id == "3e1c8a0e-5b7a-4f4c-9d43-2f0f2b6f3b11"
+    assert event.branch == "PROJ-7-login-redirect"
+    assert event.status_group == Config.DONE_PROP_NAME
+    assert event.description == "merge request !17 merge"
+
+
+def test_parse_event_github_opened():
+    headers, body = load_delivery("github_pull_request_opened")
+    event = parse_event(headers, body)
+    assert event.delivery_id == "72d3162e-cc78-11e3-81ab-4c9367dc0958"
+    assert event.branch == "PROJ-8-export-button"
+    assert event.status_group == Config.IN_REVIEW_PROP_NAME
+
+
+def test_parse_event_github_draft_and_unmerged_close_are_ignored():
+    headers, body = load_delivery("github_pull_request_opened")
+    payload = json.loads(body)
+    payload["pull_request"]["draft"] = True
+    assert parse_event(headers, json.dumps(payload)) is None
+
+    payload["action"] = "closed"
+    assert parse_event(headers, json.dumps(payload)) is None
+
+    payload["pull_request"]["merged"] = True
+    assert parse_event(headers, json.dumps(payload)).status_group == Config.DONE_PROP_NAME
+
+
+def test_handle_delivery_transitions_tickets(config):
+    pmt = FakePmt()
+    processor = WebhookProcessor(pmt, SECRET, max_workers=2)
+    try:
+        assert processor.handle_delivery(*load_delivery("gitlab_merge_request_merged")) == 202
+        assert processor.handle_delivery(*load_delivery("github_pull_request_opened")) == 202
+    finally:
+        processor.close()
+
+    assert sorted(pmt.transitions) == [("PROJ-7", "Done"), ("PROJ-8", "In Review")]
+
+
+def test_handle_delivery_rejects_and_deduplicates(config):
+    pmt = FakePmt()
+    processor = WebhookProcessor(pmt, SECRET, max_workers=1)
+    headers, body = load_delivery("github_pull_request_opened")
+    try:
+        assert processor.handle_delivery(headers, body + b" ") == 401
+        assert processor.handle_delivery(dict(headers, **{"X-Gitlab-Token": SECRET}), b"not json") == 400
+        assert processor.handle_delivery(headers, body) == 202
+        # A redelivery is acknowledged without transitioning the ticket again
+        assert processor.handle_delivery(headers, body) == 200
+    finally:
+        processor.close()
+
+    assert pmt.transitions == [("PROJ-8", "In Review")]
+
+
+def test_handle_delivery_dry_run(config):
+    processor = WebhookProcessor(None, SECRET, max_workers=1, dry_run=True)
+    try:
+        assert processor.handle_delivery(*load_delivery("gitlab_merge_request_merged")) == 202
+    finally:
+        processor.close()
+
+
+def test_worker_pool_collapses_queued_events():
+    started = threading.Event()
+    release = threading.Event()
+    handled = []
+
+    def handler(issue_key, event):
+        handled.append((issue_key, event.description))
+        if event.description == "first":
+            started.set()
+            release.wait(5)
+
+    pool = TicketWorkerPool(handler, max_workers=2)
+    pool.submit("PROJ-1", WebhookEvent("1", "PROJ-1-a", Config.IN_REVIEW_PROP_NAME, "first"))
+    assert started.wait(5)
+    # Queued behind the event being handled, only the last one is handled
+    for description in ("second", "third", "last"):
+        pool.submit("PROJ-1", WebhookEvent(description, "PROJ-1-a", Config.DONE_PROP_NAME, description))
+    release.set()
+    pool.shutdown()
+
+    assert handled == [("PROJ-1", "first"), ("PROJ-1", "last")]
+
+
+def test_worker_pool_keeps_handling_after_a_failure():
+    handled = []
+
+    def handler(issue_key, event):
+        handled.append(issue_key)
+        if issue_key == "PROJ-1":
+            raise RuntimeError("transition failed")
+
+    pool = TicketWorkerPool(handler, max_workers=1)
+    pool.submit("PROJ-1", WebhookEvent("1", "PROJ-1-a", Config.DONE_PROP_NAME, "merged"))
+    pool.submit("PROJ-2", WebhookEvent("2", "PROJ-2-b", Config.DONE_PROP_NAME, "merged"))
+    pool.shutdown()
+
+    assert handled == ["PROJ-1", "PROJ-2"]